@@ -1,86 +1,949 @@
 # adb_client.py
 import subprocess
+import asyncio
+import base64
+import hashlib
+import io
 import os
 import time
 import re
+import struct
+import threading
+import PIL.Image
+import config
+import tracing
 
 # Cihazdaki geçici dosya yolları
-DEVICE_TEMP_SS_PATH = "/sdcard/ai_audit_screenshot.png"
 DEVICE_TEMP_XML_PATH = "/sdcard/ai_audit_layout.xml"
 
 
+DEFAULT_SCREEN_SIZE = (1080, 2400)
+
+
+def _parse_screen_size(output):
+    """'wm size' çıktısından (width, height) okur; override varsa o geçerlidir."""
+    match = re.search(r"Override size: (\d+)x(\d+)", output) or \
+        re.search(r"Physical size: (\d+)x(\d+)", output)
+    if match:
+        return int(match.group(1)), int(match.group(2))
+    return None
+
+
+def _parse_density(output):
+    """'wm density' çıktısından dpi okur; override varsa o geçerlidir."""
+    match = re.search(r"Override density: (\d+)", output) or \
+        re.search(r"Physical density: (\d+)", output)
+    if match:
+        return int(match.group(1))
+    return None
+
+
 def _get_screen_dimensions():
     """Cihazın fiziksel ekran boyutlarını 'adb shell wm size' ile alır."""
     try:
         result = subprocess.run(
-            ["adb", "shell", "wm", "size"],
+            config.ADB_COMMAND + ["shell", "wm", "size"],
             capture_output=True,
             text=True,
             check=True,
         )
-        output = result.stdout.strip()
-        match = re.search(r"Physical size: (\\d+)x(\\d+)", output)
-        if match:
-            width, height = int(match.group(1)), int(match.group(2))
-            print(f"[ADB] Ekran boyutu: {width}x{height}")
-            return width, height
+        size = _parse_screen_size(result.stdout)
+        if size:
+            print(f"[ADB] Ekran boyutu: {size[0]}x{size[1]}")
+            return size
         else:
             print("[ADB] Ekran boyutu alınamadı, varsayılan 1080x2400 kullanılıyor.")
-            return 1080, 2400
+            return DEFAULT_SCREEN_SIZE
     except Exception as e:
         print(f"[ADB] Ekran boyutu okunurken hata: {e}, varsayılan 1080x2400 kullanılıyor.")
-        return 1080, 2400
+        return DEFAULT_SCREEN_SIZE
 
 
-def take_screenshot(part_index=0, output_dir="."):
+def get_screen_density():
+    """Cihazın ekran yoğunluğunu (dpi) 'adb shell wm density' ile alır. Alınamazsa None."""
+    try:
+        result = subprocess.run(
+            config.ADB_COMMAND + ["shell", "wm", "density"],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        density = _parse_density(result.stdout)
+        if density:
+            print(f"[ADB] Ekran yoğunluğu: {density}dpi")
+            return density
+    except Exception as e:
+        print(f"[ADB] Ekran yoğunluğu okunurken hata: {e}")
+    return None
+
+
+def list_devices():
+    """'adb devices' çıktısından kullanıma hazır (state == 'device') cihaz serilerini döndürür."""
+    try:
+        result = subprocess.run(config.ADB_COMMAND + ["devices"], capture_output=True, text=True, check=True)
+    except Exception as e:
+        print(f"[ADB] Cihaz listesi alınamadı: {e}")
+        return []
+    serials = []
+    for line in result.stdout.splitlines()[1:]:
+        parts = line.split()
+        # 'offline' / 'unauthorized' cihazlar atlanır
+        if len(parts) >= 2 and parts[1] == "device":
+            serials.append(parts[0])
+    return serials
+
+
+# screencap ham çıktısındaki piksel formatları (android.graphics.PixelFormat)
+# format -> (PIL mode, raw decoder mode, byte/piksel)
+_RAW_PIXEL_FORMATS = {
+    1: ("RGBA", "RGBA", 4),    # RGBA_8888
+    2: ("RGB", "RGBX", 4),     # RGBX_8888
+    4: ("RGB", "BGR;16", 2),   # RGB_565
+    5: ("RGBA", "BGRA", 4),    # BGRA_8888
+}
+
+
+def _decode_raw_framebuffer(data):
     """
-    ADB ile ekran görüntüsü alır ve local'e çeker.
+    'screencap' (-p olmadan) çıktısını PIL görüntüsüne çevirir.
+    Başlık: width, height, format (uint32 LE) + Android 9+'da colorspace (uint32) -> 12 veya 16 byte.
+    Piksel verisi kopyalanmadan doğrudan buffer üzerinden eşlenir (frombuffer).
     """
-    local_filename = os.path.join(output_dir, f"app_screenshot_part_{part_index}.png")
+    if len(data) < 12:
+        raise ValueError(f"Ham framebuffer çok kısa ({len(data)} byte)")
+    width, height, pixel_format = struct.unpack_from("<III", data, 0)
+    if pixel_format not in _RAW_PIXEL_FORMATS:
+        raise ValueError(f"Desteklenmeyen piksel formatı: {pixel_format}")
+    mode, raw_mode, bpp = _RAW_PIXEL_FORMATS[pixel_format]
+    pixel_bytes = width * height * bpp
+    header_size = len(data) - pixel_bytes
+    if header_size not in (12, 16):
+        raise ValueError(f"Beklenmeyen framebuffer boyutu: {len(data)} byte ({width}x{height}, format={pixel_format})")
+    buffer = memoryview(data)[header_size:]
+    return PIL.Image.frombuffer(mode, (width, height), buffer, "raw", raw_mode, 0, 1)
+
+
+def _decode_png(png_bytes):
+    image = PIL.Image.open(io.BytesIO(png_bytes))
+    image.load()
+    return image
+
+
+def capture_screenshot(mode=None, log=True):
+    """
+    Ekran görüntüsünü 'adb exec-out screencap' ile doğrudan belleğe akıtır.
+    Cihazda /sdcard'a yazma + ayrı 'adb pull' yoktur (tek process, disk I/O yok).
+    mode:
+      - 'png': cihaz PNG encode eder (-p), daha az veri taşınır
+      - 'raw': cihaz hiç encode etmez, ham RGBA framebuffer okunur (orta segment cihazlarda çok daha hızlı)
+      Varsayılan config.ADB_CAPTURE_MODE.
+    Returns: {"image": PIL.Image, "png": bytes veya None, "latency_ms": float} veya None
+    """
+    mode = mode or config.ADB_CAPTURE_MODE
     try:
-        print(f"[ADB] Ekran görüntüsü alınıyor -> {local_filename}")
-        subprocess.run(["adb", "shell", "screencap", "-p", DEVICE_TEMP_SS_PATH], check=True)
-        subprocess.run(["adb", "pull", DEVICE_TEMP_SS_PATH, local_filename], check=True)
-        return local_filename
+        start = time.perf_counter()
+        if mode == "raw":
+            result = subprocess.run(config.ADB_COMMAND + ["exec-out", "screencap"], capture_output=True, check=True)
+            png_bytes = None
+            image = _decode_raw_framebuffer(result.stdout)
+        else:
+            result = subprocess.run(config.ADB_COMMAND + ["exec-out", "screencap", "-p"], capture_output=True, check=True)
+            png_bytes = result.stdout
+            image = _decode_png(png_bytes)
+        latency_ms = (time.perf_counter() - start) * 1000.0
+        if log:
+            print(f"[ADB] Ekran görüntüsü belleğe alındı ({mode}): {image.width}x{image.height} ({latency_ms:.0f} ms)")
+        return {"image": image, "png": png_bytes, "latency_ms": latency_ms}
     except Exception as e:
         print(f"[ADB] Ekran görüntüsü alınamadı: {e}")
         return None
 
 
-def dump_layout_xml(output_dir="."):
+def save_screenshot(capture, part_index=0, output_dir="."):
+    """
+    Belleğe alınmış ekran görüntüsünü diske yazar.
+    PNG modunda byte'lar yeniden encode edilmeden yazılır; ham modda PNG encode'u
+    cihaz yerine host'ta (hızlı sıkıştırma ile) yapılır.
+    """
+    local_filename = os.path.join(output_dir, f"app_screenshot_part_{part_index}.png")
+    if capture.get("png"):
+        with open(local_filename, "wb") as f:
+            f.write(capture["png"])
+    else:
+        capture["image"].convert("RGB").save(local_filename, format="PNG", compress_level=1)
+    return local_filename
+
+
+def take_screenshot(part_index=0, output_dir="."):
+    """
+    ADB ile ekran görüntüsü alır ve local'e yazar.
+    """
+    capture = capture_screenshot()
+    if not capture:
+        return None
+    local_filename = save_screenshot(capture, part_index, output_dir)
+    print(f"[ADB] Ekran görüntüsü kaydedildi -> {local_filename}")
+    return local_filename
+
+
+def dump_layout_xml(output_dir=".", filename="app_layout_dump.xml"):
     """
     ADB ile UIAutomator XML dump alır ve local'e çeker.
     """
-    local_xml = os.path.join(output_dir, "app_layout_dump.xml")
+    local_xml = os.path.join(output_dir, filename)
     try:
         print("[ADB] UIAutomator layout XML dump alınıyor...")
-        subprocess.run(["adb", "shell", "uiautomator", "dump", DEVICE_TEMP_XML_PATH], check=True)
-        subprocess.run(["adb", "pull", DEVICE_TEMP_XML_PATH, local_xml], check=True)
+        subprocess.run(config.ADB_COMMAND + ["shell", "uiautomator", "dump", DEVICE_TEMP_XML_PATH], check=True)
+        subprocess.run(config.ADB_COMMAND + ["pull", DEVICE_TEMP_XML_PATH, local_xml], check=True)
         return local_xml
     except Exception as e:
         print(f"[ADB] XML dump alınamadı: {e}")
         return None
 
 
-def scroll_down(crop_top=0, crop_bottom=0):
+def _extract_hierarchy(output):
+    """'uiautomator dump /dev/tty' çıktısından XML kısmını ayıklar (sondaki 'dumped to' satırı hariç)."""
+    text = output.decode("utf-8", errors="replace")
+    start = text.find("<?xml")
+    if start < 0:
+        start = text.find("<hierarchy")
+    end = text.rfind("</hierarchy>")
+    if start < 0 or end < 0:
+        return None
+    return text[start:end + len("</hierarchy>")]
+
+
+class LayoutDump:
+    """
+    Arka planda çalışan UIAutomator dump'ı.
+
+    Dump 'adb exec-out uiautomator dump /dev/tty' ile doğrudan stdout'a akıtılır (/sdcard'a
+    yazma ve 'adb pull' yok). Ayrı bir adb process'inde çalıştığı için aynı anda ekran
+    görüntüsü alınabilir; sonuç ancak result() çağrıldığında beklenir.
+    Stream desteklemeyen cihazlarda fallback (klasik dump) kullanılır.
+    result() / cancel() farklı thread'lerden çağrılabilir; ilk result() çağrısının sonucu saklanır.
+    """
+
+    def __init__(self, adb_args, fallback=None):
+        self.fallback = fallback
+        self.start = time.perf_counter()
+        self._path = None
+        self._done = False
+        self._lock = threading.Lock()
+        try:
+            self._proc = subprocess.Popen(
+                adb_args + ["exec-out", "uiautomator", "dump", "/dev/tty"],
+                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            )
+        except Exception as e:
+            print(f"[ADB] UIAutomator dump başlatılamadı: {e}")
+            self._proc = None
+
+    def cancel(self):
+        """Sonucu artık gerekmeyen dump'ı durdurur."""
+        with self._lock:
+            self._cancel()
+
+    def _cancel(self):
+        if not self._done:
+            self._done = True
+            if self._proc and self._proc.poll() is None:
+                self._proc.kill()
+            if self._proc:
+                self._proc.communicate()
+
+    def result(self, output_dir=".", timeout=None, filename="app_layout_dump.xml"):
+        """Dump bitene kadar bekler ve XML'i diske yazar. Returns: dosya yolu veya None"""
+        with self._lock:
+            if self._done:
+                return self._path
+            with tracing.span("adb.layout_dump") as span:
+                path = self._result(output_dir, timeout, filename)
+                # Dump başlangıcından bu yana geçen süre (span'in kendisi sadece bekleme süresidir)
+                span.set(dump_ms=round((time.perf_counter() - self.start) * 1000.0, 1), ok=bool(path))
+                if path:
+                    span.add(bytes=os.path.getsize(path))
+                return path
+
+    def _result(self, output_dir, timeout, filename):
+        if self._done:
+            return self._path
+        self._done = True
+        timeout = config.ADB_DUMP_TIMEOUT if timeout is None else timeout
+        xml_text = None
+        if self._proc:
+            try:
+                output, _ = self._proc.communicate(timeout=timeout)
+                xml_text = _extract_hierarchy(output)
+            except subprocess.TimeoutExpired:
+                self._proc.kill()
+                self._proc.communicate()
+                print(f"[ADB] UIAutomator dump {timeout:.0f} sn içinde bitmedi.")
+        if xml_text:
+            self._path = os.path.join(output_dir, filename)
+            with open(self._path, "w", encoding="utf-8") as f:
+                f.write(xml_text)
+            print(f"[ADB] UIAutomator layout XML dump alındı (stream, {(time.perf_counter() - self.start) * 1000:.0f} ms)")
+        elif self.fallback:
+            # Doğrudan parçanın dosyasına yazılır; ortak bir ara dosya, karşılaştırması süren
+            # (veya fallback arayan) başka bir parçanın XML'i ile karışabilirdi
+            print("[ADB] Stream dump alınamadı, klasik dump deneniyor...")
+            self._path = self.fallback(output_dir, filename)
+        return self._path
+
+
+def start_layout_dump():
+    """UIAutomator dump'ını arka planda başlatır. Returns: LayoutDump"""
+    print("[ADB] UIAutomator layout XML dump başlatıldı (arka planda)...")
+    return LayoutDump(list(config.ADB_COMMAND), fallback=dump_layout_xml)
+
+
+def _frame_signature(image, crop_top=0, crop_bottom=0):
+    """
+    Kararlılık kontrolü için kare imzası: status/nav bar kırpılır, gri tonlamalı küçük
+    bir kopya 16 seviyeye indirgenip hash'lenir (saat, anti-aliasing gibi küçük farklara dayanıklı).
+    """
+    top = max(0, crop_top)
+    bottom = max(top + 1, image.height - max(0, crop_bottom))
+    image = image.crop((0, top, image.width, bottom))
+    # İnce bantlarda (bkz. DeviceSession.capture_settle_band) dikey çözünürlük birkaç satıra düşmesin
+    height = max(min(16, image.height), round(image.height * config.SCROLL_SETTLE_THUMB_WIDTH / image.width))
+    thumb = image.convert("L").resize((config.SCROLL_SETTLE_THUMB_WIDTH, height), PIL.Image.BILINEAR)
+    return hashlib.blake2b(thumb.point(lambda v: v >> 4).tobytes(), digest_size=16).digest()
+
+
+class _SettleWatch:
+    """
+    wait_for_stable_frame / wait_for_stable_frame_async'in ortak durumu: art arda aynı
+    imzaya sahip kareleri sayar, süre aşımını izler ve sonucu loglar.
+    """
+
+    def __init__(self, crop_top=0, crop_bottom=0, timeout=None, interval=None, stable_frames=None):
+        self.crop_top = crop_top
+        self.crop_bottom = crop_bottom
+        self.timeout = config.SCROLL_SETTLE_TIMEOUT if timeout is None else timeout
+        self.interval = config.SCROLL_SETTLE_INTERVAL if interval is None else interval
+        self.stable_frames = stable_frames or config.SCROLL_SETTLE_FRAMES
+        self.start = time.perf_counter()
+        self.deadline = self.start + self.timeout
+        self.last_signature = None
+        self.streak = 0
+        self.frames = 0
+
+    def fallback_delay(self):
+        """Kare alınamadığında eski davranış: sabit bekleme (en fazla 1 sn)."""
+        return max(0.0, min(1.0, self.deadline - time.perf_counter()))
+
+    def observe(self, image):
+        """Returns: True (durağan), False (zaman aşımı) veya None (beklemeye devam)"""
+        self.frames += 1
+        signature = _frame_signature(image, self.crop_top, self.crop_bottom)
+        self.streak = self.streak + 1 if signature == self.last_signature else 1
+        self.last_signature = signature
+        elapsed = time.perf_counter() - self.start
+        if self.streak >= self.stable_frames:
+            print(f"[ADB] Ekran {elapsed:.2f} sn'de durağanlaştı ({self.frames} kare).")
+            return True
+        if time.perf_counter() >= self.deadline:
+            print(f"[ADB] UYARI: Ekran {self.timeout:.1f} sn içinde durağanlaşmadı ({self.frames} kare), devam ediliyor.")
+            return False
+        return None
+
+
+def wait_for_stable_frame(capture_frame, crop_top=0, crop_bottom=0, timeout=None, interval=None,
+                          stable_frames=None):
     """
-    Basit bir 'scroll down' hareketi uygular.
-    crop_top / crop_bottom, status/nav bar kırpmalarını hesaba katmak için kullanılabilir.
+    Scroll sonrası sabit bir süre beklemek yerine UI durulana kadar art arda kare alır.
+    Art arda 'stable_frames' kare aynı imzaya sahip olunca döner; 'timeout' içinde
+    durulmazsa (animasyon, video vb.) yine de devam edilir.
+    capture_frame: PIL.Image (veya hata durumunda None) döndüren fonksiyon.
+    Returns: True (durağan) / False (zaman aşımı veya kare alınamadı)
     """
-    width, height = _get_screen_dimensions()
+    watch = _SettleWatch(crop_top, crop_bottom, timeout, interval, stable_frames)
+    while True:
+        image = capture_frame()
+        if image is None:
+            time.sleep(watch.fallback_delay())
+            return False
+        stable = watch.observe(image)
+        if stable is not None:
+            return stable
+        time.sleep(watch.interval)
+
 
+async def wait_for_stable_frame_async(capture_frame, crop_top=0, crop_bottom=0, timeout=None, interval=None,
+                                      stable_frames=None):
+    """wait_for_stable_frame'in async sürümü; capture_frame bir coroutine fonksiyonudur."""
+    watch = _SettleWatch(crop_top, crop_bottom, timeout, interval, stable_frames)
+    while True:
+        image = await capture_frame()
+        if image is None:
+            await asyncio.sleep(watch.fallback_delay())
+            return False
+        stable = watch.observe(image)
+        if stable is not None:
+            return stable
+        await asyncio.sleep(watch.interval)
+
+
+def _scroll_swipe_args(width, height):
+    """Ekranın ortasından %20 yüksekliğe (yukarı doğru) kaydıran 'input swipe' argümanları."""
     start_x = width // 2
     start_y = height // 2
     end_y = int(height * 0.2)  # yukarı doğru kaydır
+    return ["input", "swipe", str(start_x), str(start_y), str(start_x), str(end_y), "600"]
 
-    try:
-        print("[ADB] Scroll hareketi gönderiliyor...")
-        subprocess.run(
-            ["adb", "shell", "input", "swipe", str(start_x), str(start_y), str(start_x), str(end_y), "600"],
-            check=True,
-        )
-        time.sleep(1.0)
+
+def scroll_down(crop_top=0, crop_bottom=0):
+    """
+    Basit bir 'scroll down' hareketi uygular ve ekran durulana kadar bekler.
+    crop_top / crop_bottom: durağanlık kontrolünde yok sayılacak status/nav bar yükseklikleri.
+    Swipe ve durağanlık kareleri kısa ömürlü bir DeviceSession üzerinden gönderilir
+    (kare başına yeni adb process'i açılmaz).
+    """
+    with DeviceSession() as session:
+        if not session.is_open:
+            print("[ADB] Scroll hareketi başarısız: cihaz oturumu açılamadı.")
+            return False
+        return session.scroll_down(crop_top, crop_bottom)
+
+
+_SESSION_PROPS_COMMAND = "wm size; echo '|'; wm density; echo '|'; getprop ro.build.version.sdk"
+
+
+def _parse_session_props(props):
+    """Oturum açılışındaki 'wm size | wm density | sdk' çıktısı -> (screen_size, density, sdk)"""
+    size_out, density_out, sdk_out = (props.split("|") + ["", "", ""])[:3]
+    sdk = int(sdk_out.strip()) if sdk_out.strip().isdigit() else None
+    return _parse_screen_size(size_out) or DEFAULT_SCREEN_SIZE, _parse_density(density_out), sdk
+
+
+def _raw_header_size(sdk):
+    return 16 if (sdk or 0) >= 28 else 12
+
+
+def _settle_band_plan(raw_header, sdk, crop_top=0, crop_bottom=0):
+    """
+    capture_settle_band için cihazda çalışacak 'dd' komutu ve çıktısını banda çeviren fonksiyon.
+    Returns: (komut, decode) veya desteklenmeyen formatta None
+    """
+    width, height, pixel_format = raw_header
+    if pixel_format not in _RAW_PIXEL_FORMATS:
+        return None
+    mode, raw_mode, bpp = _RAW_PIXEL_FORMATS[pixel_format]
+    content = max(1, height - max(0, crop_top) - max(0, crop_bottom))
+    rows = max(1, min(config.SCROLL_SETTLE_BAND_ROWS, content))
+    first_row = max(0, crop_top) + (content - rows) // 2
+    row_bytes = width * bpp
+    header_size = _raw_header_size(sdk)
+
+    def decode(output):
+        band = base64.b64decode(output or "")[header_size:header_size + rows * row_bytes]
+        if len(band) < rows * row_bytes:
+            return None
+        return PIL.Image.frombuffer(mode, (width, rows), band, "raw", raw_mode, 0, 1)
+
+    # dd bloğu = bir satır; başlık yüzünden bir satır fazla okunup başlık kadar kaydırılır
+    return f"screencap | dd bs={row_bytes} skip={first_row} count={rows + 1} 2>/dev/null | base64", decode
+
+
+# Framebuffer boyutu/formatı oturum başına bir kez, sadece başlık okunarak öğrenilir
+_RAW_HEADER_COMMAND = "screencap | dd bs=16 count=1 2>/dev/null | base64"
+
+
+def _parse_raw_header(output):
+    header = base64.b64decode(output or "")
+    return struct.unpack_from("<III", header) if len(header) >= 12 else None
+
+
+class DeviceSession:
+    """
+    Tek bir cihaza açık tutulan uzun ömürlü 'adb shell' oturumu.
+
+    Her yardımcı fonksiyonun yeni bir 'adb' process'i başlatması yerine komutlar
+    (input swipe, screencap, uiautomator dump, wm ...) aynı shell üzerinden sırayla
+    gönderilir. Seri numarası, ekran boyutu, yoğunluk ve SDK seviyesi oturum açılırken
+    tek seferde okunup cache'lenir.
+
+    Kullanım:
+        with DeviceSession() as device:
+            device.capture_screenshot()
+            device.scroll_down()
+    """
+
+    def __init__(self, serial=None):
+        self.serial = serial
+        self.screen_size = None
+        self.density = None
+        self.sdk = None
+        self._raw_header = None  # Ham framebuffer (width, height, format); bant okuması için
+        self._proc = None
+        self._lock = threading.Lock()
+        self._counter = 0
+
+    def _adb(self, *args):
+        return config.ADB_COMMAND + (["-s", self.serial] if self.serial else []) + list(args)
+
+    def open(self):
+        """Shell'i başlatır ve cihaz özelliklerini cache'ler. Başarısızsa False."""
+        try:
+            if not self.serial:
+                result = subprocess.run(self._adb("get-serialno"), capture_output=True, text=True, check=True)
+                self.serial = result.stdout.strip() or None
+            # stdin bir pipe olduğu için pty açılmaz; çıktı binary-güvenlidir
+            self._proc = subprocess.Popen(
+                self._adb("shell"), stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+            )
+            props = self.run(_SESSION_PROPS_COMMAND)
+            if props is None:
+                self.close()
+                return False
+            self.screen_size, self.density, self.sdk = _parse_session_props(props)
+            print(f"[ADB] Oturum açıldı: seri={self.serial}, ekran={self.screen_size[0]}x{self.screen_size[1]}, "
+                  f"yoğunluk={self.density}dpi, sdk={self.sdk}")
+            return True
+        except Exception as e:
+            print(f"[ADB] Cihaz oturumu açılamadı: {e}")
+            self.close()
+            return False
+
+    def close(self):
+        if self._proc:
+            try:
+                self._proc.stdin.write(b"exit\n")
+                self._proc.stdin.flush()
+                self._proc.wait(timeout=2)
+            except Exception:
+                self._proc.kill()
+            self._proc = None
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def is_open(self):
+        return self._proc is not None and self._proc.poll() is None
+
+    def is_healthy(self):
+        """Oturum açık ve cihaz komutlara yanıt veriyor mu?"""
+        output = self.run("echo ok")
+        return output is not None and output.strip() == "ok"
+
+    def _send(self, command):
+        self._counter += 1
+        marker = f"__AI_AUDIT_DONE_{self._counter}__".encode()
+        # Komutun çıktısı satır sonuyla bitmese de marker kendi satırında olsun diye 'echo'
+        self._proc.stdin.write(command.encode() + b"; __rc=$?; echo; echo " + marker + b" $__rc\n")
+        self._proc.stdin.flush()
+        return marker
+
+    def _read_until_marker(self, marker):
+        lines = []
+        while True:
+            line = self._proc.stdout.readline()
+            if not line:
+                raise EOFError("adb shell oturumu kapandı")
+            if line.startswith(marker):
+                rc = int(line[len(marker):].strip() or 0)
+                return b"".join(lines)[:-1], rc  # Son 'echo'nun eklediği satır sonu
+
+            lines.append(line)
+
+    def run(self, command):
+        """Komutu oturumda çalıştırır, stdout'u (metin) döndürür. Hata durumunda None."""
+        if not self.is_open:
+            return None
+        with self._lock:
+            try:
+                marker = self._send(command)
+                output, rc = self._read_until_marker(marker)
+            except Exception as e:
+                print(f"[ADB] Oturum komutu başarısız ({command}): {e}")
+                self.close()
+                return None
+        if rc != 0:
+            print(f"[ADB] Komut hata kodu döndürdü ({rc}): {command}")
+            return None
+        return output.decode("utf-8", errors="replace")
+
+    def capture_screenshot(self, mode=None, log=True):
+        """
+        Oturum üzerinden ekran görüntüsü alır (yeni process yok).
+        Ham modda çıktı uzunluğu başlıktan bilindiği için tam olarak okunur;
+        PNG modunda uzunluk bilinmediğinden cihazda base64 ile sarılır.
+        Returns: capture_screenshot() ile aynı sözlük veya None
+        """
+        mode = mode or config.ADB_CAPTURE_MODE
+        if not self.is_open:
+            return None
+        with self._lock:
+            try:
+                start = time.perf_counter()
+                if mode == "raw":
+                    marker = self._send("screencap")
+                    header_size = _raw_header_size(self.sdk)
+                    header = self._proc.stdout.read(12)
+                    if header.startswith(b"\n__AI_AUDIT") or len(header) < 12:
+                        raise IOError("screencap çıktı üretmedi")
+                    width, height, pixel_format = struct.unpack("<III", header)
+                    self._raw_header = (width, height, pixel_format)
+                    bpp = _RAW_PIXEL_FORMATS.get(pixel_format, (None, None, 4))[2]
+                    rest = self._proc.stdout.read(header_size - 12 + width * height * bpp)
+                    _, rc = self._read_until_marker(marker)
+                    png_bytes = None
+                    image = _decode_raw_framebuffer(header + rest)
+                else:
+                    marker = self._send("screencap -p | base64")
+                    output, rc = self._read_until_marker(marker)
+                    png_bytes = base64.b64decode(output)
+                    image = _decode_png(png_bytes)
+                latency_ms = (time.perf_counter() - start) * 1000.0
+            except Exception as e:
+                print(f"[ADB] Oturumdan ekran görüntüsü alınamadı: {e}")
+                self.close()
+                return None
+        if log:
+            print(f"[ADB] Ekran görüntüsü belleğe alındı ({mode}, oturum): {image.width}x{image.height} ({latency_ms:.0f} ms)")
+        return {"image": image, "png": png_bytes, "latency_ms": latency_ms}
+
+    def capture_settle_band(self, crop_top=0, crop_bottom=0):
+        """
+        Durağanlık kontrolü için içerik alanının ortasından ince bir satır bandı okur.
+        Tam framebuffer (~10 MB) yerine screencap çıktısı cihazda 'dd' ile kesilir; sadece
+        SCROLL_SETTLE_BAND_ROWS satır (birkaç yüz KB) taşınır ve decode edilir.
+        Returns: PIL.Image (bant) veya None
+        """
+        if self._raw_header is None:
+            self._raw_header = _parse_raw_header(self.run(_RAW_HEADER_COMMAND))
+            if self._raw_header is None:
+                return None
+        plan = _settle_band_plan(self._raw_header, self.sdk, crop_top, crop_bottom)
+        if plan is None:
+            return None
+        command, decode = plan
+        return decode(self.run(command))
+
+    def wait_for_stable_screen(self, crop_top=0, crop_bottom=0):
+        """Ekran durulana kadar bekler (bkz. wait_for_stable_frame); kareler capture_settle_band ile alınır."""
+        return wait_for_stable_frame(lambda: self.capture_settle_band(crop_top, crop_bottom))
+
+    def start_layout_dump(self):
+        """
+        UIAutomator dump'ını ayrı bir exec-out process'inde başlatır; oturum (shell) bu sırada
+        ekran görüntüsü için serbest kalır. Returns: LayoutDump
+        """
+        print("[ADB] UIAutomator layout XML dump başlatıldı (arka planda)...")
+        return LayoutDump(self._adb(), fallback=self.dump_layout_xml)
+
+    def dump_layout_xml(self, output_dir=".", filename="app_layout_dump.xml"):
+        """UIAutomator dump'ını oturum üzerinden alır ve local'e yazar (adb pull yok)."""
+        local_xml = os.path.join(output_dir, filename)
+        print("[ADB] UIAutomator layout XML dump alınıyor (oturum)...")
+        xml_text = self.run(f"uiautomator dump {DEVICE_TEMP_XML_PATH} >/dev/null && cat {DEVICE_TEMP_XML_PATH}")
+        if not xml_text or "<hierarchy" not in xml_text:
+            print("[ADB] XML dump alınamadı.")
+            return None
+        with open(local_xml, "w", encoding="utf-8") as f:
+            f.write(xml_text[xml_text.index("<"):])
+        return local_xml
+
+    def scroll_down(self, crop_top=0, crop_bottom=0):
+        """Cache'lenmiş ekran boyutuyla kaydırır ('wm size' tekrar çağrılmaz) ve ekran durulana kadar bekler."""
+        width, height = self.screen_size or DEFAULT_SCREEN_SIZE
+        print("[ADB] Scroll hareketi gönderiliyor (oturum)...")
+        if self.run(" ".join(_scroll_swipe_args(width, height))) is None:
+            print("[ADB] Scroll hareketi başarısız.")
+            return False
+        self.wait_for_stable_screen(crop_top, crop_bottom)
+        return True
+
+
+class AsyncLayoutDump:
+    """
+    LayoutDump'ın asyncio sürümü: 'exec-out uiautomator dump /dev/tty' bir asyncio subprocess'i
+    olarak arka planda okunur. Event loop içinde oluşturulmalıdır; fallback bir coroutine
+    fonksiyonudur (örn. AsyncDeviceSession.dump_layout_xml).
+    """
+
+    def __init__(self, adb_args, fallback=None):
+        self.fallback = fallback
+        self.start = time.perf_counter()
+        self._path = None
+        self._done = False
+        self._lock = asyncio.Lock()
+        self._task = asyncio.create_task(self._read(adb_args))
+
+    async def _read(self, adb_args):
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                *adb_args, "exec-out", "uiautomator", "dump", "/dev/tty",
+                stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL,
+            )
+        except Exception as e:
+            print(f"[ADB] UIAutomator dump başlatılamadı: {e}")
+            return None
+        try:
+            output, _ = await proc.communicate()
+            return _extract_hierarchy(output)
+        finally:
+            # İptal / zaman aşımında process açık kalmasın
+            if proc.returncode is None:
+                proc.kill()
+                await proc.wait()
+
+    def cancel(self):
+        """Sonucu artık gerekmeyen dump'ı durdurur."""
+        if not self._done:
+            self._done = True
+            self._task.cancel()
+
+    async def result(self, output_dir=".", timeout=None, filename="app_layout_dump.xml"):
+        """Dump bitene kadar bekler ve XML'i diske yazar. Returns: dosya yolu veya None"""
+        async with self._lock:
+            if self._done:
+                return self._path
+            with tracing.span("adb.layout_dump") as span:
+                path = await self._result(output_dir, timeout, filename)
+                span.set(dump_ms=round((time.perf_counter() - self.start) * 1000.0, 1), ok=bool(path))
+                if path:
+                    span.add(bytes=os.path.getsize(path))
+                return path
+
+    async def _result(self, output_dir, timeout, filename):
+        self._done = True
+        timeout = config.ADB_DUMP_TIMEOUT if timeout is None else timeout
+        xml_text = None
+        try:
+            xml_text = await asyncio.wait_for(self._task, timeout)
+        except asyncio.TimeoutError:
+            print(f"[ADB] UIAutomator dump {timeout:.0f} sn içinde bitmedi.")
+        if xml_text:
+            self._path = os.path.join(output_dir, filename)
+            with open(self._path, "w", encoding="utf-8") as f:
+                f.write(xml_text)
+            print(f"[ADB] UIAutomator layout XML dump alındı (stream, {(time.perf_counter() - self.start) * 1000:.0f} ms)")
+        elif self.fallback:
+            print("[ADB] Stream dump alınamadı, klasik dump deneniyor...")
+            self._path = await self.fallback(output_dir, filename)
+        return self._path
+
+
+class AsyncDeviceSession:
+    """
+    DeviceSession'ın asyncio sürümü: 'adb shell' bir asyncio subprocess'idir, komutlar aynı
+    marker protokolüyle gönderilir ve çıktı beklenirken event loop bloklanmaz. Aynı anda tek
+    komut çalışır (asyncio.Lock); bir komut yarıda iptal edilirse akış senkronu bozulacağı
+    için oturum kapatılır.
+
+    Kullanım:
+        async with AsyncDeviceSession(serial) as device:
+            await device.capture_screenshot()
+            await device.scroll_down()
+    """
+
+    # UIAutomator XML'i tek satır olabilir; readline sınırı buna göre geniş tutulur
+    _STREAM_LIMIT = 32 * 1024 * 1024
+
+    def __init__(self, serial=None):
+        self.serial = serial
+        self.screen_size = None
+        self.density = None
+        self.sdk = None
+        self._raw_header = None
+        self._proc = None
+        self._lock = asyncio.Lock()
+        self._counter = 0
+
+    def _adb(self, *args):
+        return config.ADB_COMMAND + (["-s", self.serial] if self.serial else []) + list(args)
+
+    async def open(self):
+        """Shell'i başlatır ve cihaz özelliklerini cache'ler. Başarısızsa False."""
+        try:
+            if not self.serial:
+                proc = await asyncio.create_subprocess_exec(
+                    *self._adb("get-serialno"), stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.DEVNULL
+                )
+                output, _ = await proc.communicate()
+                if proc.returncode != 0:
+                    raise RuntimeError(f"get-serialno hata kodu {proc.returncode}")
+                self.serial = output.decode().strip() or None
+            self._proc = await asyncio.create_subprocess_exec(
+                *self._adb("shell"), stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.DEVNULL, limit=self._STREAM_LIMIT,
+            )
+            props = await self.run(_SESSION_PROPS_COMMAND)
+            if props is None:
+                await self.close()
+                return False
+            self.screen_size, self.density, self.sdk = _parse_session_props(props)
+            print(f"[ADB] Oturum açıldı (async): seri={self.serial}, ekran={self.screen_size[0]}x{self.screen_size[1]}, "
+                  f"yoğunluk={self.density}dpi, sdk={self.sdk}")
+            return True
+        except Exception as e:
+            print(f"[ADB] Cihaz oturumu açılamadı: {e}")
+            await self.close()
+            return False
+
+    async def close(self):
+        proc, self._proc = self._proc, None
+        if proc and proc.returncode is None:
+            try:
+                proc.stdin.write(b"exit\n")
+                await proc.stdin.drain()
+                await asyncio.wait_for(proc.wait(), 2)
+            except asyncio.CancelledError:
+                proc.kill()
+                raise
+            except Exception:
+                proc.kill()
+                await proc.wait()
+
+    def _kill(self):
+        """İptal edilen komut sonrası: shell akışı artık güvenilir değil."""
+        if self._proc and self._proc.returncode is None:
+            self._proc.kill()
+        self._proc = None
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    @property
+    def is_open(self):
+        return self._proc is not None and self._proc.returncode is None
+
+    async def is_healthy(self):
+        output = await self.run("echo ok")
+        return output is not None and output.strip() == "ok"
+
+    async def _send(self, command):
+        self._counter += 1
+        marker = f"__AI_AUDIT_DONE_{self._counter}__".encode()
+        self._proc.stdin.write(command.encode() + b"; __rc=$?; echo; echo " + marker + b" $__rc\n")
+        await self._proc.stdin.drain()
+        return marker
+
+    async def _read_until_marker(self, marker):
+        lines = []
+        while True:
+            line = await self._proc.stdout.readline()
+            if not line:
+                raise EOFError("adb shell oturumu kapandı")
+            if line.startswith(marker):
+                rc = int(line[len(marker):].strip() or 0)
+                return b"".join(lines)[:-1], rc
+            lines.append(line)
+
+    async def _exchange(self, command, read):
+        """Komutu gönderir ve read(marker) ile yanıtı okur; iptal edilirse oturumu kapatır."""
+        async with self._lock:
+            if not self.is_open:
+                raise EOFError("adb shell oturumu açık değil")
+            try:
+                return await read(await self._send(command))
+            except asyncio.CancelledError:
+                self._kill()
+                raise
+            except Exception:
+                await self.close()
+                raise
+
+    async def run(self, command):
+        """Komutu oturumda çalıştırır, stdout'u (metin) döndürür. Hata durumunda None."""
+        if not self.is_open:
+            return None
+        try:
+            output, rc = await self._exchange(command, self._read_until_marker)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"[ADB] Oturum komutu başarısız ({command}): {e}")
+            return None
+        if rc != 0:
+            print(f"[ADB] Komut hata kodu döndürdü ({rc}): {command}")
+            return None
+        return output.decode("utf-8", errors="replace")
+
+    async def _read_raw_frame(self, marker):
+        header = await self._proc.stdout.readexactly(12)
+        if header.startswith(b"\n__AI_AUDIT"):
+            raise IOError("screencap çıktı üretmedi")
+        width, height, pixel_format = struct.unpack("<III", header)
+        self._raw_header = (width, height, pixel_format)
+        bpp = _RAW_PIXEL_FORMATS.get(pixel_format, (None, None, 4))[2]
+        rest = await self._proc.stdout.readexactly(_raw_header_size(self.sdk) - 12 + width * height * bpp)
+        await self._read_until_marker(marker)
+        return header + rest
+
+    async def capture_screenshot(self, mode=None, log=True):
+        """DeviceSession.capture_screenshot'ın async sürümü; decode işlemi thread'de yapılır."""
+        mode = mode or config.ADB_CAPTURE_MODE
+        if not self.is_open:
+            return None
+        try:
+            start = time.perf_counter()
+            if mode == "raw":
+                data = await self._exchange("screencap", self._read_raw_frame)
+                png_bytes = None
+                image = await asyncio.to_thread(_decode_raw_framebuffer, data)
+            else:
+                output, _ = await self._exchange("screencap -p | base64", self._read_until_marker)
+                png_bytes = base64.b64decode(output)
+                image = await asyncio.to_thread(_decode_png, png_bytes)
+            latency_ms = (time.perf_counter() - start) * 1000.0
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"[ADB] Oturumdan ekran görüntüsü alınamadı: {e}")
+            return None
+        if log:
+            print(f"[ADB] Ekran görüntüsü belleğe alındı ({mode}, oturum): {image.width}x{image.height} ({latency_ms:.0f} ms)")
+        return {"image": image, "png": png_bytes, "latency_ms": latency_ms}
+
+    async def capture_settle_band(self, crop_top=0, crop_bottom=0):
+        """DeviceSession.capture_settle_band'in async sürümü."""
+        if self._raw_header is None:
+            self._raw_header = _parse_raw_header(await self.run(_RAW_HEADER_COMMAND))
+            if self._raw_header is None:
+                return None
+        plan = _settle_band_plan(self._raw_header, self.sdk, crop_top, crop_bottom)
+        if plan is None:
+            return None
+        command, decode = plan
+        return decode(await self.run(command))
+
+    async def wait_for_stable_screen(self, crop_top=0, crop_bottom=0):
+        return await wait_for_stable_frame_async(lambda: self.capture_settle_band(crop_top, crop_bottom))
+
+    def start_layout_dump(self):
+        """UIAutomator dump'ını ayrı bir exec-out process'inde başlatır. Returns: AsyncLayoutDump"""
+        print("[ADB] UIAutomator layout XML dump başlatıldı (arka planda)...")
+        return AsyncLayoutDump(self._adb(), fallback=self.dump_layout_xml)
+
+    async def dump_layout_xml(self, output_dir=".", filename="app_layout_dump.xml"):
+        local_xml = os.path.join(output_dir, filename)
+        print("[ADB] UIAutomator layout XML dump alınıyor (oturum)...")
+        xml_text = await self.run(f"uiautomator dump {DEVICE_TEMP_XML_PATH} >/dev/null && cat {DEVICE_TEMP_XML_PATH}")
+        if not xml_text or "<hierarchy" not in xml_text:
+            print("[ADB] XML dump alınamadı.")
+            return None
+        with open(local_xml, "w", encoding="utf-8") as f:
+            f.write(xml_text[xml_text.index("<"):])
+        return local_xml
+
+    async def scroll_down(self, crop_top=0, crop_bottom=0):
+        width, height = self.screen_size or DEFAULT_SCREEN_SIZE
+        print("[ADB] Scroll hareketi gönderiliyor (oturum)...")
+        if await self.run(" ".join(_scroll_swipe_args(width, height))) is None:
+            print("[ADB] Scroll hareketi başarısız.")
+            return False
+        await self.wait_for_stable_screen(crop_top, crop_bottom)
         return True
-    except Exception as e:
-        print(f"[ADB] Scroll hareketi başarısız: {e}")
-        return False
\ No newline at end of file
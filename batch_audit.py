@@ -0,0 +1,270 @@
+# batch_audit.py
+"""
+Manifest ile çok sayıda ekranın tek seferde denetlenmesi (örn. gece regresyonu).
+
+Her ekran ayrı bir run_audit_process çağrısıdır; ekranlar eşzamanlı çalışır:
+  - Manuel ekranlar (app_parts verilmiş) BATCH_CONCURRENCY thread'lik havuzda,
+  - ADB ekranları cihaz havuzunda (device_pool), her cihazda sırayla; cihaz oturumları
+    ekranlar arasında açık kalır, setup_commands ile her ekran önce açılır.
+Figma HTTP session'ı ve disk cache'i (aynı dosyanın node / render'ları) tüm ekranlarca paylaşılır.
+
+Çıktılar tek bir workspace altında toplanır:
+    <workspace>/<ekran adı>/report.json, report.html, ara dosyalar, checkpoint.jsonl
+    <workspace>/summary.json   (tüm ekranların özeti)
+Batch yarıda kalırsa '--resume <batch_id>' ile raporu yazılmış ekranlar atlanır, yarım kalan
+ekranlar da parça checkpoint'lerinden devam eder.
+
+Manifest (JSON):
+    {
+      "defaults": {"app_analysis_mode": "xml", "app_crop_top": 80},
+      "screens": [
+        {"name": "login", "figma_link": "https://www.figma.com/design/KEY/App?node-id=1-2",
+         "app_parts": ["shots/login.png"]},
+        {"name": "home", "figma_file_key": "KEY", "figma_node_ids": ["10:5", "10:9"],
+         "device_serial": "emulator-5554", "setup_commands": ["am start -W -n com.app/.HomeActivity"]},
+        {"name": "legacy", "figma_parts": ["figma/legacy.png"], "app_parts": ["shots/legacy.xml"]}
+      ]
+    }
+app_parts verilmeyen ekranlar Otomatik (ADB) modda çalışır. Göreli yollar manifest dosyasına göredir.
+
+Kullanım:
+    python batch_audit.py nightly.json --concurrency 8
+    python batch_audit.py nightly.json --resume 20240101-020000-ab12cd34
+"""
+import argparse
+import concurrent.futures
+import json
+import os
+import re
+import sys
+import time
+
+import config
+import device_pool
+import figma_client
+import report_generator
+import run_audit
+import workspace
+
+# Manifest'te ekran bazında verilebilecek run_audit_process argümanları
+_AUDIT_KEYS = (
+    "app_analysis_mode", "figma_crop_top", "figma_crop_bottom", "app_crop_top", "app_crop_bottom",
+    "stitch_app_page",
+)
+_SCREEN_KEYS = _AUDIT_KEYS + (
+    "name", "figma_link", "figma_file_key", "figma_node_ids", "figma_parts", "app_parts",
+    "device_serial", "setup_commands",
+)
+
+
+def _resolve_paths(paths, base_dir):
+    if isinstance(paths, str):
+        paths = [paths]
+    return [path if os.path.isabs(path) else os.path.join(base_dir, path) for path in paths]
+
+
+def _screen_job(screen, index, base_dir):
+    """Manifest girdisini doğrular ve çalıştırılabilir işe çevirir."""
+    label = f"Manifest ekran #{index} ({screen.get('name', '?')})"
+    unknown = set(screen) - set(_SCREEN_KEYS)
+    if unknown:
+        raise ValueError(f"{label}: bilinmeyen alan(lar): {', '.join(sorted(unknown))}")
+
+    audit_kwargs = {key: screen[key] for key in _AUDIT_KEYS if key in screen}
+    if screen.get("figma_link"):
+        file_key, node_id = figma_client.parse_figma_link(screen["figma_link"])
+        if not (file_key and node_id):
+            raise ValueError(f"{label}: geçersiz Figma linki: {screen['figma_link']}")
+        audit_kwargs.update(figma_file_key=file_key, figma_node_ids=[node_id])
+    elif screen.get("figma_file_key") and screen.get("figma_node_ids"):
+        node_ids = screen["figma_node_ids"]
+        audit_kwargs.update(figma_file_key=screen["figma_file_key"],
+                            figma_node_ids=[node_ids] if isinstance(node_ids, str) else list(node_ids))
+    elif screen.get("figma_parts"):
+        audit_kwargs["figma_parts"] = _resolve_paths(screen["figma_parts"], base_dir)
+    else:
+        raise ValueError(f"{label}: 'figma_link', 'figma_file_key' + 'figma_node_ids' veya 'figma_parts' gerekli.")
+
+    use_adb = not screen.get("app_parts")
+    if not use_adb:
+        audit_kwargs["app_parts"] = _resolve_paths(screen["app_parts"], base_dir)
+
+    name = re.sub(r"[^A-Za-z0-9_.-]", "_", str(screen.get("name") or f"screen_{index}")).strip(".") or f"screen_{index}"
+    return {
+        "name": name,
+        "use_adb": use_adb,
+        "device_serial": screen.get("device_serial"),
+        "setup_commands": screen.get("setup_commands") or [],
+        "audit_kwargs": audit_kwargs,
+    }
+
+
+def load_manifest(path):
+    """
+    Manifest'i okur; 'defaults' her ekrana uygulanır.
+    Returns: iş listesi (ekran adları benzersizleştirilir). Hatalı girdide ValueError.
+    """
+    with open(path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    if isinstance(manifest, list):
+        manifest = {"screens": manifest}
+    defaults = manifest.get("defaults") or {}
+    base_dir = os.path.dirname(os.path.abspath(path))
+
+    jobs = []
+    seen = {}
+    for index, entry in enumerate(manifest.get("screens") or []):
+        job = _screen_job(dict(defaults, **entry), index, base_dir)
+        count = seen.get(job["name"], 0)
+        seen[job["name"]] = count + 1
+        if count:
+            job["name"] = f"{job['name']}_{count + 1}"
+        jobs.append(job)
+    if not jobs:
+        raise ValueError("Manifest'te denetlenecek ekran yok ('screens').")
+    return jobs
+
+
+def _screen_summary(job, report=None, error=None, output_dir=None):
+    """summary.json'daki tek ekran satırı."""
+    row = {"name": job["name"], "mode": "adb" if job["use_adb"] else "manual", "output_dir": output_dir}
+    if error is not None:
+        row.update(status="failed", error=str(error))
+        return row
+    summary = report.get("summary", {})
+    if not report.get("parts") and not report.get("error"):
+        report["error"] = "Hiçbir parça denetlenemedi."
+    row.update(
+        status="error" if report.get("error") else ("issues" if summary.get("error_count", 0) else "ok"),
+        parts=len(report.get("parts", [])),
+        error_count=summary.get("error_count", 0),
+        warning_count=summary.get("warning_count", 0),
+        overall_match_pct=summary.get("overall_match_pct", 0.0),
+        duration_s=round(report.get("trace", {}).get("total_ms", 0.0) / 1000.0, 1),
+    )
+    if report.get("error"):
+        row["error"] = report["error"]
+    if report.get("device_serial"):
+        row["device_serial"] = report["device_serial"]
+    return row
+
+
+def _write_screen_report(report, output_dir, write_html=True):
+    with open(os.path.join(output_dir, "report.json"), "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=1, default=str)
+    if write_html:
+        report_generator.create_html_report(report, os.path.join(output_dir, "report.html"), open_browser=False)
+
+
+def run_batch(jobs, ws, concurrency=None, resume=False, write_html=True):
+    """
+    Ekranları eşzamanlı denetler, her ekranın raporunu kendi klasörüne ve toplu özeti
+    summary.json'a yazar. Returns: özet sözlüğü
+    """
+    concurrency = max(1, concurrency or config.BATCH_CONCURRENCY)
+    started = time.perf_counter()
+    rows = {}
+    pool = None
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="batch")
+    futures = {}
+    try:
+        if any(job["use_adb"] for job in jobs):
+            pool = device_pool.DevicePool()
+            if not pool.start():
+                print("[Batch] UYARI: Sağlıklı cihaz yok, ADB ekranları başarısız sayılacak.")
+
+        for job in jobs:
+            output_dir = os.path.dirname(ws.path(job["name"], "report.json"))
+            report_path = os.path.join(output_dir, "report.json")
+            if resume and os.path.exists(report_path):
+                with open(report_path, encoding="utf-8") as f:
+                    row = _screen_summary(job, json.load(f), output_dir=output_dir)
+                # Hata ile biten ekranlar tekrar denetlenir (tamamlanan parçaları checkpoint'ten gelir)
+                if row["status"] != "error":
+                    rows[job["name"]] = row
+                    print(f"[Batch] '{job['name']}' daha önce tamamlanmış, atlanıyor.")
+                    continue
+            kwargs = dict(job["audit_kwargs"], output_dir=output_dir, resume=resume)
+            if job["use_adb"]:
+                future = pool.submit_audit(serial=job["device_serial"], setup_commands=job["setup_commands"], **kwargs)
+            else:
+                future = executor.submit(run_audit.run_audit_process, **kwargs)
+            futures[future] = (job, output_dir)
+
+        print(f"[Batch] {len(futures)} ekran denetleniyor (eşzamanlı: {concurrency} manuel"
+              + (f", {len(pool.devices)} cihaz" if pool else "") + ")...")
+        for done_count, future in enumerate(concurrent.futures.as_completed(futures), 1):
+            job, output_dir = futures[future]
+            try:
+                report = future.result()
+            except Exception as e:
+                print(f"[Batch] ({done_count}/{len(futures)}) '{job['name']}' BAŞARISIZ: {e}")
+                rows[job["name"]] = _screen_summary(job, error=e, output_dir=output_dir)
+                continue
+            _write_screen_report(report, output_dir, write_html)
+            rows[job["name"]] = _screen_summary(job, report, output_dir=output_dir)
+            print(f"[Batch] ({done_count}/{len(futures)}) '{job['name']}' tamamlandı: {rows[job['name']]['status']}")
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+        if pool:
+            pool.shutdown()
+
+    screens = [rows[job["name"]] for job in jobs if job["name"] in rows]
+    statuses = [row["status"] for row in screens]
+    summary = {
+        "batch_id": ws.run_id,
+        "duration_s": round(time.perf_counter() - started, 1),
+        "screens": len(jobs),
+        "ok": statuses.count("ok"),
+        "issues": statuses.count("issues"),
+        "failed": statuses.count("failed") + statuses.count("error"),
+        "error_count": sum(row.get("error_count", 0) for row in screens),
+        "warning_count": sum(row.get("warning_count", 0) for row in screens),
+        "results": screens,
+    }
+    with open(ws.path("summary.json"), "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2, ensure_ascii=False)
+    return summary
+
+
+def print_summary(summary):
+    print("\n" + "-" * 72)
+    print(f"{'Ekran':<28} {'Durum':<8} {'Parça':>5} {'Hata':>5} {'Uyarı':>6} {'Uyum %':>7} {'Süre':>7}")
+    for row in summary["results"]:
+        print(f"{row['name'][:28]:<28} {row['status']:<8} {row.get('parts', '-'):>5} {row.get('error_count', '-'):>5} "
+              f"{row.get('warning_count', '-'):>6} {row.get('overall_match_pct', '-'):>7} {row.get('duration_s', '-'):>7}")
+    print("-" * 72)
+    print(f"[Batch] {summary['screens']} ekran, {summary['duration_s']} sn: {summary['ok']} başarılı, "
+          f"{summary['issues']} hatalı, {summary['failed']} başarısız. (batch_id: {summary['batch_id']})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manifest ile toplu tasarım denetimi")
+    parser.add_argument("manifest", help="Ekranları tanımlayan JSON manifest")
+    parser.add_argument("--concurrency", type=int, default=config.BATCH_CONCURRENCY,
+                        help="Aynı anda denetlenecek manuel ekran sayısı (ADB ekranları cihaz sayısı kadar paralel).")
+    parser.add_argument("--workspace", choices=["disk", "memory"], default=config.WORKSPACE_BACKEND)
+    parser.add_argument("--resume", metavar="BATCH_ID", help="Yarıda kalan batch'e devam et.")
+    parser.add_argument("--no-html", action="store_true", help="Ekran başına HTML rapor üretme (sadece report.json).")
+    args = parser.parse_args()
+
+    try:
+        jobs = load_manifest(args.manifest)
+    except (OSError, ValueError) as e:
+        print(f"HATA: Manifest okunamadı: {e}")
+        sys.exit(2)
+
+    ws = workspace.reopen(args.resume, args.workspace) if args.resume else workspace.create(args.workspace)
+    try:
+        summary = run_batch(jobs, ws, args.concurrency, resume=bool(args.resume), write_html=not args.no_html)
+    finally:
+        ws.release()
+        figma_client.close_shared_session()
+    print_summary(summary)
+    print(f"[Batch] Özet: {ws.path('summary.json')}")
+    # CI için: hata bulunan veya başarısız ekran varsa sıfırdan farklı çıkış kodu
+    sys.exit(0 if summary["issues"] == 0 and summary["failed"] == 0 else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+# bench_comparator.py
+"""
+comparator.compare_layouts (XML) ve compare_layouts_ai (AI-JSON) için tekrarlanabilir benchmark.
+
+Sentetik Figma/App bileşen çiftleri üretir (kontrollü scale, offset, jitter ve metin gürültüsü ile),
+XML modu için büyük UIAutomator dump'ları yazar ve her boyut için:
+  - eşleştirme süresi (s)
+  - tepe bellek kullanımı (tracemalloc, MB)
+  - eşleştirme precision / recall
+raporlar. Matcher değişiklikleri bu sayılarla objektif olarak kıyaslanabilir.
+
+Örnek:
+    python bench_comparator.py --sizes 10 100 1000 --mode ai xml
+    python bench_comparator.py --sizes 10000 --no-memory --json bench.json
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from xml.sax.saxutils import quoteattr
+
+import comparator
+
+FIGMA_WIDTH = 360
+COLUMNS = 3
+ROW_HEIGHT = 56
+WORDS = ["hesap", "fatura", "paket", "internet", "dakika", "kampanya", "detay", "odeme",
+         "tarife", "destek", "ayarlar", "profil", "bildirim", "hediye", "kalan", "yenile"]
+COMPONENT_TYPES = ["Text", "Text", "Button", "Icon"]
+
+
+def _noisy_text(rng, text, noise):
+    """Metnin karakterlerini 'noise' olasılığıyla bozar (OCR / AI okuma hatası simülasyonu)."""
+    if not noise: return text
+    chars = list(text)
+    for k, ch in enumerate(chars):
+        if ch.isalnum() and rng.random() < noise:
+            chars[k] = rng.choice("abcdefghijklmnopqrstuvwxyz0123456789")
+    return "".join(chars)
+
+
+def generate_screen(n, scale=3.0, offset=(0, 40), jitter=4.0, text_noise=0.02,
+                    missing_pct=0.05, extra_pct=0.05, seed=0):
+    """
+    N bileşenli sentetik bir ekran çifti üretir.
+    Returns: (figma_list, app_list, figma_width, app_width, truth)
+    truth: {figma_index: app_node} -> gerçek eşleşmeler (precision/recall için)
+    """
+    rng = random.Random(seed)
+    col_w = FIGMA_WIDTH / COLUMNS
+    figma_list, app_list = [], []
+
+    for i in range(n):
+        ctype = rng.choice(COMPONENT_TYPES)
+        row, col = divmod(i, COLUMNS)
+        w = rng.randint(24, int(col_w) - 8) if ctype != "Icon" else 24
+        h = rng.randint(18, 44) if ctype != "Icon" else 24
+        x = col * col_w + rng.randint(0, int(col_w) - w)
+        y = row * ROW_HEIGHT + rng.randint(0, ROW_HEIGHT - h)
+        text = ""
+        if ctype in ("Text", "Button"):
+            text = f"{rng.choice(WORDS)} {rng.choice(WORDS)} {i}"
+
+        figma_list.append({
+            "name": f"comp_{i}",
+            "type": ctype,
+            "bounds": {"x": x, "y": y, "w": w, "h": h},
+            "text_content": text,
+            "estimated_color": "#333333",
+        })
+
+        if rng.random() < missing_pct:
+            continue  # App tarafında eksik bileşen
+
+        app_list.append({
+            "name": f"app_{i}",
+            "type": ctype,
+            "bench_id": i,
+            "bounds": {
+                "x": round(x * scale + offset[0] + rng.gauss(0, jitter)),
+                "y": round(y * scale + offset[1] + rng.gauss(0, jitter)),
+                "w": max(1, round(w * scale + rng.gauss(0, jitter))),
+                "h": max(1, round(h * scale + rng.gauss(0, jitter))),
+            },
+            "text_content": _noisy_text(rng, text, text_noise),
+            "estimated_color": "#333333",
+        })
+
+    # App tarafında Figma'da olmayan fazladan bileşenler (distractor)
+    screen_h = (n // COLUMNS + 1) * ROW_HEIGHT * scale
+    for k in range(int(n * extra_pct)):
+        app_list.append({
+            "name": f"extra_{k}",
+            "type": rng.choice(COMPONENT_TYPES),
+            "bench_id": None,
+            "bounds": {"x": rng.randint(0, int(FIGMA_WIDTH * scale) - 60), "y": rng.randint(0, int(screen_h)),
+                       "w": rng.randint(20, 200), "h": rng.randint(20, 120)},
+            "text_content": "",
+        })
+
+    rng.shuffle(app_list)
+    truth = {node["bench_id"]: node for node in app_list if node.get("bench_id") is not None}
+    return figma_list, app_list, FIGMA_WIDTH, round(FIGMA_WIDTH * scale), truth
+
+
+def write_uiautomator_xml(app_list, path, app_width, filler_per_node=2):
+    """
+    App bileşenlerinden büyük bir UIAutomator dump'ı üretir.
+    Gerçek dump'lar gibi iç içe layout düğümleri ve görünmez düğümler de içerir.
+    bench_id, eşleşme doğruluğunu ölçebilmek için resource-id içine yazılır.
+    """
+    max_y = max((n["bounds"]["y"] + n["bounds"]["h"] for n in app_list), default=0)
+    lines = ['<?xml version=\'1.0\' encoding=\'UTF-8\' standalone=\'yes\' ?>',
+             '<hierarchy rotation="0">',
+             f'<node index="0" text="" resource-id="" class="android.widget.FrameLayout" '
+             f'package="com.bench.app" visible-to-user="true" bounds="[0,0][{app_width},{max_y}]">']
+    for idx, node in enumerate(app_list):
+        b = node["bounds"]
+        x1, y1 = b["x"], b["y"]
+        x2, y2 = x1 + b["w"], y1 + b["h"]
+        # Dolgu: görünmez wrapper düğümleri (parse maliyetini gerçekçi kılar)
+        for k in range(filler_per_node):
+            lines.append(f'<node index="{k}" text="" resource-id="" class="android.view.View" '
+                         f'package="com.bench.app" visible-to-user="false" bounds="[{x1},{y1}][{x2},{y2}]" />')
+        rid = f"bench:id/{node['bench_id']}" if node.get("bench_id") is not None else ""
+        cls = "android.widget.TextView" if node.get("text_content") else "android.widget.ImageView"
+        lines.append(f'<node index="{idx}" text={quoteattr(node.get("text_content") or "")} '
+                     f'resource-id="{rid}" class="{cls}" package="com.bench.app" '
+                     f'visible-to-user="true" bounds="[{x1},{y1}][{x2},{y2}]" />')
+    lines.append('</node>')
+    lines.append('</hierarchy>')
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines))
+    return os.path.getsize(path)
+
+
+def _app_bench_id(node):
+    if "bench_id" in node:
+        return node["bench_id"]
+    rid = node.get("resource_id") or ""
+    if rid.startswith("bench:id/"):
+        return int(rid.split("/", 1)[1])
+    return None
+
+
+def _run_once(mode, figma_list, app_source, figma_width, app_width):
+    """
+    Public API'yi çalıştırır; doğruluk ölçümü için _find_matches'in döndürdüğü çiftleri yakalar.
+    """
+    captured = {}
+    original = comparator._find_matches
+
+    def _spy(*args, **kwargs):
+        out = original(*args, **kwargs)
+        captured["pairs"] = out[0]
+        return out
+
+    comparator._find_matches = _spy
+    try:
+        start = time.perf_counter()
+        if mode == "xml":
+            comparator.compare_layouts(figma_list, app_source, figma_width, app_width, 18)
+        else:
+            comparator.compare_layouts_ai(figma_list, app_source, figma_width, app_width, 18)
+        elapsed = time.perf_counter() - start
+    finally:
+        comparator._find_matches = original
+    return elapsed, captured.get("pairs", [])
+
+
+def _precision_recall(pairs, figma_list, truth):
+    correct = 0
+    for f_comp, a_node in pairs:
+        f_idx = int(f_comp["name"].split("_", 1)[1])
+        if _app_bench_id(a_node) == f_idx:
+            correct += 1
+    precision = correct / len(pairs) if pairs else 0.0
+    recall = correct / len(truth) if truth else 0.0
+    return round(precision, 4), round(recall, 4)
+
+
+def run_benchmark(sizes, modes, scale, offset, jitter, text_noise, repeat, measure_memory, seed, workdir):
+    rows = []
+    for n in sizes:
+        figma_list, app_list, figma_width, app_width, truth = generate_screen(
+            n, scale=scale, offset=offset, jitter=jitter, text_noise=text_noise, seed=seed
+        )
+        for mode in modes:
+            app_source = app_list
+            xml_bytes = None
+            if mode == "xml":
+                app_source = os.path.join(workdir, f"bench_dump_{n}.xml")
+                xml_bytes = write_uiautomator_xml(app_list, app_source, app_width)
+
+            times = []
+            pairs = []
+            for _ in range(repeat):
+                elapsed, pairs = _run_once(mode, figma_list, app_source, figma_width, app_width)
+                times.append(elapsed)
+
+            peak_mb = None
+            if measure_memory:
+                tracemalloc.start()
+                _run_once(mode, figma_list, app_source, figma_width, app_width)
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                peak_mb = round(peak / (1024 * 1024), 2)
+
+            precision, recall = _precision_recall(pairs, figma_list, truth)
+            rows.append({
+                "size": n,
+                "mode": mode,
+                "app_nodes": len(app_list),
+                "xml_bytes": xml_bytes,
+                "time_s": round(min(times), 4),
+                "peak_mem_mb": peak_mb,
+                "precision": precision,
+                "recall": recall,
+            })
+    return rows
+
+
+def _print_table(rows):
+    header = f"{'size':>7} {'mode':>4} {'app':>7} {'xml_kb':>8} {'time_s':>10} {'mem_mb':>8} {'prec':>7} {'recall':>7}"
+    print(header)
+    print("-" * len(header))
+    for r in rows:
+        xml_kb = f"{r['xml_bytes'] / 1024:.0f}" if r["xml_bytes"] else "-"
+        mem = f"{r['peak_mem_mb']:.2f}" if r["peak_mem_mb"] is not None else "-"
+        print(f"{r['size']:>7} {r['mode']:>4} {r['app_nodes']:>7} {xml_kb:>8} {r['time_s']:>10.4f} "
+              f"{mem:>8} {r['precision']:>7.3f} {r['recall']:>7.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Comparator benchmark (sentetik yoğun ekranlar)")
+    parser.add_argument("--sizes", nargs="+", type=int, default=[10, 100, 1000, 10000],
+                        help="Bileşen sayıları (varsayılan: 10 100 1000 10000)")
+    parser.add_argument("--mode", nargs="+", choices=["ai", "xml"], default=["ai", "xml"],
+                        help="compare_layouts_ai (ai) ve/veya compare_layouts (xml)")
+    parser.add_argument("--scale", type=float, default=3.0, help="Figma -> App ölçeği")
+    parser.add_argument("--offset-x", type=int, default=0)
+    parser.add_argument("--offset-y", type=int, default=40)
+    parser.add_argument("--jitter", type=float, default=4.0, help="App bounds gauss gürültüsü (px)")
+    parser.add_argument("--text-noise", type=float, default=0.02, help="Karakter bozulma olasılığı")
+    parser.add_argument("--repeat", type=int, default=1, help="Zamanlama tekrarı (en iyisi raporlanır)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-memory", action="store_true", help="tracemalloc ölçümünü atla (büyük boyutlar için)")
+    parser.add_argument("--keep-xml", help="Üretilen XML dump'larını bu klasöre yaz")
+    parser.add_argument("--json", help="Sonuçları bu JSON dosyasına da yaz")
+    args = parser.parse_args()
+
+    def _run(workdir):
+        return run_benchmark(
+            sizes=args.sizes, modes=args.mode, scale=args.scale, offset=(args.offset_x, args.offset_y),
+            jitter=args.jitter, text_noise=args.text_noise, repeat=max(1, args.repeat),
+            measure_memory=not args.no_memory, seed=args.seed, workdir=workdir,
+        )
+
+    # Comparator debug çıktıları tabloyu boğmasın
+    import contextlib
+    import io
+    with contextlib.redirect_stdout(io.StringIO()):
+        if args.keep_xml:
+            os.makedirs(args.keep_xml, exist_ok=True)
+            rows = _run(args.keep_xml)
+        else:
+            with tempfile.TemporaryDirectory() as tmp:
+                rows = _run(tmp)
+
+    _print_table(rows)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(rows, f, indent=2)
+        print(f"\n[Bench] Sonuçlar '{args.json}' dosyasına yazıldı.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# checkpoint.py
+"""
+Çok parçalı denetimler için parça bazında checkpoint.
+
+Her parçanın analiz çıktısı (Figma bileşenleri) ve karşılaştırma sonucu, parça tamamlanır
+tamamlanmaz çalışma klasöründeki 'checkpoint.jsonl' dosyasına tek satır (kompakt JSON) olarak
+eklenir. Denetim yarıda kalırsa (örn. 12 parçanın 9.'sunda Gemini kota hatası) aynı klasörle
+resume=True çalıştırıldığında bitmiş parçaların Figma, AI ve karşılaştırma adımları atlanır.
+
+İlk satır denetim parametrelerinin parmak izidir; parametreler değiştiyse eski kayıtlar
+kullanılmaz. Yarım yazılmış son satır (process öldürüldü) okunurken atlanır.
+"""
+import hashlib
+import json
+import os
+import threading
+
+FILENAME = "checkpoint.jsonl"
+
+
+def fingerprint(params):
+    """Denetim parametrelerinden kısa, sıra bağımsız bir parmak izi."""
+    payload = json.dumps(params, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+class AuditCheckpoint:
+    def __init__(self, output_dir, params):
+        self.path = os.path.join(output_dir, FILENAME)
+        self.fingerprint = fingerprint(params)
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Returns: {loop_index: kayıt}; dosya yoksa veya parmak izi uyuşmuyorsa None"""
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                lines = f.read().splitlines()
+        except FileNotFoundError:
+            return None
+        try:
+            header = json.loads(lines[0]) if lines else {}
+        except ValueError:
+            return None
+        if header.get("fingerprint") != self.fingerprint:
+            return None
+        records = {}
+        for line in lines[1:]:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            records[entry["loop_index"]] = entry
+        return records
+
+    def start(self, resume=False):
+        """
+        resume=True ise mevcut kayıtları yükler ve sonuna ekleme yapar; aksi halde (veya
+        parametreler değiştiyse) yeni bir checkpoint başlatır.
+        Returns: {loop_index: kayıt} tamamlanmış parçalar
+        """
+        records = self.load() if resume else None
+        if records is not None:
+            print(f"[Checkpoint] {len(records)} tamamlanmış parça bulundu, bunlar tekrar işlenmeyecek.")
+            return records
+        if resume:
+            print("[Checkpoint] Devam edilecek uyumlu checkpoint yok (parametreler değişmiş olabilir), baştan başlanıyor.")
+        with self._lock, open(self.path, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"fingerprint": self.fingerprint}) + "\n")
+        return {}
+
+    def save(self, record):
+        """Tamamlanan parçayı ekler; satır diske yazılmadan dönmez (process çökse de kaybolmaz)."""
+        line = json.dumps(record, separators=(",", ":"), default=str)
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+            f.flush()
+            os.fsync(f.fileno())
@@ -1,5 +1,6 @@
 # comparator.py (FULL VERSION - GHOST FILTER + FUZZY MATCH)
 import config
+import tracing
 import math
 import xml.etree.ElementTree as ET
 
@@ -214,99 +215,115 @@ def _parse_adb_xml(xml_path):
 
 # --- ZEKİ EŞLEŞTİRME ALGORİTMASI (Filtreli) ---
 
-def _calculate_auto_scale(figma_list, app_list):
+def _clean_text(txt):
+    """Metni karşılaştırma için normalize eder (küçük harf, sadece alfanümerik)."""
+    return "".join(c for c in (txt or "").strip().lower() if c.isalnum())
+
+
+def _median(values):
+    values = sorted(values)
+    n = len(values)
+    mid = n // 2
+    if n % 2: return values[mid]
+    return (values[mid - 1] + values[mid]) / 2.0
+
+
+def _robust_fit(values, min_spread):
     """
-    Calculates the scale factors (X, Y) based on the width/height ratio of high-confidence text matches.
-    Returns: (scale_x, scale_y)
+    Median + MAD tabanlı sağlam (robust) kestirim.
+    Medyandan çok uzak değerleri (hatalı anchor'lar) atar, kalanların medyanını döndürür.
+    Returns: (estimate, inlier_count) veya değer yoksa (None, 0)
     """
-    ratios_x = []
-    ratios_y = []
-    
-    app_text_map = {}
-    for a_node in app_list:
-        txt = (a_node.get('text') or a_node.get('text_content') or "").strip().lower()
-        clean_txt = "".join(c for c in txt if c.isalnum())
-        if len(clean_txt) > 5: # Only long texts
-            if clean_txt not in app_text_map: app_text_map[clean_txt] = []
-            app_text_map[clean_txt].append(a_node)
+    if not values: return None, 0
+    med = _median(values)
+    mad = _median([abs(v - med) for v in values])
+    # 1.4826 * MAD ~ standart sapma; 3 sigma dışı outlier sayılır
+    limit = max(3.0 * 1.4826 * mad, min_spread)
+    inliers = [v for v in values if abs(v - med) <= limit]
+    return _median(inliers), len(inliers)
 
-    for f_node in figma_list:
-        f_txt = (f_node.get('text_content') or "").strip().lower()
-        f_clean = "".join(c for c in f_txt if c.isalnum())
-        
-        if len(f_clean) > 5 and f_clean in app_text_map:
-            f_w = f_node['bounds']['w']
-            f_h = f_node['bounds']['h']
-            
-            if f_w < 10 or f_h < 10: continue
-            
-            for a_node in app_text_map[f_clean]:
-                a_w = a_node['bounds']['w']
-                a_h = a_node['bounds']['h']
-                
-                if a_w > 10: ratios_x.append(a_w / float(f_w))
-                if a_h > 10: ratios_y.append(a_h / float(f_h))
 
-    if not ratios_x or not ratios_y: return None
-    
-    # Return median ratios
-    ratios_x.sort()
-    ratios_y.sort()
-    
-    mid_x = len(ratios_x) // 2
-    mid_y = len(ratios_y) // 2
-    
-    return (ratios_x[mid_x], ratios_y[mid_y])
+def _confidence(inlier_count, total_count):
+    """Inlier oranı ile örnek sayısını birleştiren 0-1 arası güven skoru."""
+    if total_count == 0: return 0.0
+    support = min(1.0, inlier_count / 5.0)  # 5+ tutarlı anchor -> tam destek
+    return round((inlier_count / float(total_count)) * support, 2)
 
 
-def _calculate_global_offset(figma_list, app_list, scale, axis='y'):
+def _build_text_anchors(figma_list, app_list, min_len=3):
     """
-    Finds the median offset (X or Y) between high-confidence text matches.
+    Metni birebir eşleşen (Figma, App) çiftlerini TEK SEFERDE çıkarır.
+    Scale ve offset kestirimi aynı anchor listesini kullanır.
     """
-    offsets = []
-    
-    # Create a quick lookup for app text
     app_text_map = {}
     for a_node in app_list:
-        txt = (a_node.get('text') or a_node.get('text_content') or "").strip().lower()
-        clean_txt = "".join(c for c in txt if c.isalnum())
-        if len(clean_txt) > 3:
-            if clean_txt not in app_text_map: app_text_map[clean_txt] = []
-            app_text_map[clean_txt].append(a_node)
+        clean_txt = _clean_text(a_node.get('text') or a_node.get('text_content'))
+        if len(clean_txt) > min_len:
+            app_text_map.setdefault(clean_txt, []).append(a_node)
 
+    anchors = []
     for f_node in figma_list:
-        f_txt = (f_node.get('text_content') or "").strip().lower()
-        f_clean = "".join(c for c in f_txt if c.isalnum())
-        
-        if len(f_clean) > 3 and f_clean in app_text_map:
-            # Found a text match!
-            
-            if axis == 'y':
-                f_val = (f_node['bounds']['y'] + f_node['bounds']['h'] / 2.0) * scale
-            else:
-                f_val = (f_node['bounds']['x'] + f_node['bounds']['w'] / 2.0) * scale
-            
-            # Check all candidates (duplicates possible)
+        f_clean = _clean_text(f_node.get('text_content'))
+        if len(f_clean) > min_len and f_clean in app_text_map:
+            # Duplicate metinler olabilir, tüm adaylar anchor olur (outlier'lar fit'te elenir)
             for a_node in app_text_map[f_clean]:
-                if axis == 'y':
-                    a_val = a_node['bounds']['y'] + a_node['bounds']['h'] / 2.0
-                else:
-                    a_val = a_node['bounds']['x'] + a_node['bounds']['w'] / 2.0
-                
-                diff = a_val - f_val
-                offsets.append(diff)
-
-    if not offsets: return 0
-    
-    # Return median offset
-    offsets.sort()
-    mid = len(offsets) // 2
-    median = offsets[mid]
-    
-    # Only apply if significant (> 5px)
-    if abs(median) > 5:
-        return median
-    return 0
+                anchors.append((f_node, a_node, len(f_clean)))
+    return anchors
+
+
+def _estimate_alignment(figma_list, app_list, scale):
+    """
+    Scale (X, Y) ve global offset'i (X, Y) tek anchor kümesinden birlikte kestirir.
+    - Scale: uzun metinlerin (>5 karakter) genişlik/yükseklik oranlarının robust medyanı.
+    - Offset: bulunan scale ile ölçeklenmiş Figma merkezleri ile App merkezleri arasındaki
+      farkların robust medyanı.
+    Birkaç hatalı anchor (örn. aynı metnin farklı yerdeki kopyası) sonucu kaydırmaz.
+    """
+    anchors = _build_text_anchors(figma_list, app_list)
+
+    ratios_x, ratios_y = [], []
+    for f_node, a_node, txt_len in anchors:
+        if txt_len <= 5: continue  # Scale için sadece uzun metinler
+        f_w, f_h = f_node['bounds']['w'], f_node['bounds']['h']
+        if f_w < 10 or f_h < 10: continue
+        if a_node['bounds']['w'] > 10: ratios_x.append(a_node['bounds']['w'] / float(f_w))
+        if a_node['bounds']['h'] > 10: ratios_y.append(a_node['bounds']['h'] / float(f_h))
+
+    scale_x, scale_y = scale, scale
+    scale_detected = False
+    det_x, in_x = _robust_fit(ratios_x, 0.02)
+    det_y, in_y = _robust_fit(ratios_y, 0.02)
+    if det_x is not None and det_y is not None:
+        if abs(det_x - scale) > 0.01 or abs(det_y - scale) > 0.01:
+            scale_x, scale_y = det_x, det_y
+            scale_detected = True
+
+    offsets_x, offsets_y = [], []
+    for f_node, a_node, _ in anchors:
+        f_b, a_b = f_node['bounds'], a_node['bounds']
+        offsets_x.append((a_b['x'] + a_b['w'] / 2.0) - (f_b['x'] + f_b['w'] / 2.0) * scale_x)
+        offsets_y.append((a_b['y'] + a_b['h'] / 2.0) - (f_b['y'] + f_b['h'] / 2.0) * scale_y)
+
+    off_x, off_inx = _robust_fit(offsets_x, 5.0)
+    off_y, off_iny = _robust_fit(offsets_y, 5.0)
+    # Sadece anlamlıysa (> 5px) uygula
+    off_x = off_x if off_x is not None and abs(off_x) > 5 else 0
+    off_y = off_y if off_y is not None and abs(off_y) > 5 else 0
+
+    return {
+        "scale_x": scale_x,
+        "scale_y": scale_y,
+        "scale_detected": scale_detected,
+        "offset_x": off_x,
+        "offset_y": off_y,
+        "anchor_count": len(anchors),
+        "confidence": {
+            "scale_x": _confidence(in_x, len(ratios_x)),
+            "scale_y": _confidence(in_y, len(ratios_y)),
+            "offset_x": _confidence(off_inx, len(offsets_x)),
+            "offset_y": _confidence(off_iny, len(offsets_y)),
+        }
+    }
 
 
 def _find_matches(figma_list, app_list, scale):
@@ -315,30 +332,25 @@ def _find_matches(figma_list, app_list, scale):
     unmatched_f = []
     unmatched_a = app_list.copy()
 
-    # --- 0. AUTO-SCALE DETECTION ---
+    # --- 0. AUTO-SCALE + GLOBAL OFFSET (Tek geçiş) ---
     # Eğer verilen 'scale' parametresi hatalıysa (örn: farklı çözünürlükler),
-    # metin eşleşmelerinden gerçek ölçeği bulmaya çalış.
-    
-    scale_x = scale
-    scale_y = scale
-    
-    detected_scales = _calculate_auto_scale(figma_list, app_list)
-    if detected_scales:
-        det_x, det_y = detected_scales
-        if abs(det_x - scale) > 0.01 or abs(det_y - scale) > 0.01:
-            print(f"[Comparator] Auto-detected Scale: X={det_x:.3f}, Y={det_y:.3f} (vs provided {scale:.3f}). Using detected scales.")
-            scale_x = det_x
-            scale_y = det_y
+    # metin eşleşmelerinden gerçek ölçeği bulmaya çalış. Aynı anchor'lar ile
+    # auto-crop farklılıklarından kaynaklanan global kaymalar (X & Y) da hesaplanır.
+    alignment = _estimate_alignment(figma_list, app_list, scale)
+    scale_x = alignment["scale_x"]
+    scale_y = alignment["scale_y"]
+    conf = alignment["confidence"]
+
+    if alignment["scale_detected"]:
+        print(f"[Comparator] Auto-detected Scale: X={scale_x:.3f}, Y={scale_y:.3f} (vs provided {scale:.3f}). "
+              f"Using detected scales. (Güven: X={conf['scale_x']}, Y={conf['scale_y']})")
+
+    global_y_offset = alignment["offset_y"]
+    global_x_offset = alignment["offset_x"]
 
-    # --- 1. GLOBAL OFFSET COMPENSATION (Y & X) ---
-    # Auto-crop farklılıklarından kaynaklanan kaymaları düzeltmek için
-    # metin eşleşmelerine bakarak global ofsetleri hesapla.
-    
-    global_y_offset = _calculate_global_offset(figma_list, app_list, scale_y, axis='y')
-    global_x_offset = _calculate_global_offset(figma_list, app_list, scale_x, axis='x')
-    
     if global_y_offset != 0 or global_x_offset != 0:
-        print(f"[Comparator] Global Offset Detected: X={global_x_offset}px, Y={global_y_offset}px. Applying compensation...")
+        print(f"[Comparator] Global Offset Detected: X={global_x_offset}px, Y={global_y_offset}px "
+              f"(Güven: X={conf['offset_x']}, Y={conf['offset_y']}). Applying compensation...")
         # App koordinatlarını düzelt (Kopyası üzerinde)
         unmatched_a = []
         for node in app_list:
@@ -495,7 +507,7 @@ def _find_matches(figma_list, app_list, scale):
     all_unmatched_f = unmatched_f + final_unmatched_f
     
     print(f"[Debug] Matched: {len(matched)}, Unmatched Figma: {len(all_unmatched_f)}, Unmatched App: {len(unmatched_a)}")
-    return matched, all_unmatched_f, unmatched_a, scale_x, scale_y
+    return matched, all_unmatched_f, unmatched_a, scale_x, scale_y, alignment
 
 
 def _generate_results(matches, un_f, un_a, f_w, a_w, scale_x, scale_y, tol):
@@ -572,14 +584,24 @@ def _generate_results(matches, un_f, un_a, f_w, a_w, scale_x, scale_y, tol):
 
 def compare_layouts(figma_json, app_xml_path, figma_width, app_width, tolerance_px):
     """XML Modu"""
-    app_nodes = _parse_adb_xml(app_xml_path)
+    with tracing.span("compare.parse_xml") as span:
+        app_nodes = _parse_adb_xml(app_xml_path)
+        span.set(nodes=len(app_nodes))
     scale = app_width / figma_width if figma_width > 0 else 1.0
-    matches, unf, una, sx, sy = _find_matches(figma_json or [], app_nodes, scale)
-    return _generate_results(matches, unf, una, figma_width, app_width, sx, sy, tolerance_px)
+    with tracing.span("compare.match", figma_nodes=len(figma_json or []), app_nodes=len(app_nodes)):
+        matches, unf, una, sx, sy, alignment = _find_matches(figma_json or [], app_nodes, scale)
+    with tracing.span("compare.checks", matches=len(matches)):
+        res = _generate_results(matches, unf, una, figma_width, app_width, sx, sy, tolerance_px)
+    res["alignment"] = alignment
+    return res
 
 
 def compare_layouts_ai(figma_json, app_json, figma_width, app_width, tolerance_px):
     """AI Modu"""
     scale = app_width / figma_width if figma_width > 0 else 1.0
-    matches, unf, una, sx, sy = _find_matches(figma_json or [], app_json or [], scale)
-    return _generate_results(matches, unf, una, figma_width, app_width, sx, sy, tolerance_px)
\ No newline at end of file
+    with tracing.span("compare.match", figma_nodes=len(figma_json or []), app_nodes=len(app_json or [])):
+        matches, unf, una, sx, sy, alignment = _find_matches(figma_json or [], app_json or [], scale)
+    with tracing.span("compare.checks", matches=len(matches)):
+        res = _generate_results(matches, unf, una, figma_width, app_width, sx, sy, tolerance_px)
+    res["alignment"] = alignment
+    return res
\ No newline at end of file
@@ -1,5 +1,6 @@
 # config.py
 import os
+import shlex
 from dotenv import load_dotenv
 
 # .env dosyasındaki değişkenleri yükle
@@ -23,4 +24,77 @@ DIMENSION_TOLERANCE_PERCENT = 0.15
 # Uygulama tarafının hangi analiz modu ile okunacağını belirler:
 # - 'xml': UIAutomator XML'den okunur (mevcut davranış, sadece layout + metin).
 # - 'ai':  App ekran görüntüsü de Gemini ile analiz edilir (stil + layout).
-APP_ANALYSIS_MODE = os.getenv("APP_ANALYSIS_MODE", "ai").lower()
\ No newline at end of file
+APP_ANALYSIS_MODE = os.getenv("APP_ANALYSIS_MODE", "ai").lower()
+
+# Çok parçalı denetimlerde karşılaştırma (XML parse + eşleştirme + testler) için process sayısı.
+# 0 = CPU sayısı kadar, 1 = seri (paralellik kapalı).
+COMPARE_WORKERS = int(os.getenv("COMPARE_WORKERS", "0"))
+
+# Web server'da aynı anda çalışabilecek denetim sayısı (cihaz havuzu dışındaki denetimler)
+AUDIT_MAX_CONCURRENT = int(os.getenv("AUDIT_MAX_CONCURRENT", "2"))
+
+# batch_audit.py: aynı anda denetlenen manuel ekran sayısı (ADB ekranları cihaz başına sırayla)
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+
+# Parça pipeline'ı: Figma/App toplama, AI analizi ve karşılaştırma aşamaları üst üste çalışır
+PIPELINE_ANALYSIS_WORKERS = int(os.getenv("PIPELINE_ANALYSIS_WORKERS", "2"))  # Eşzamanlı analiz (Gemini) thread'i (async denetimde task)
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "2"))  # Aşamalar arası kuyruk boyu (parça)
+
+# Her denetim çalışmasının ara dosyaları (kırpılmış görseller, dump'lar, debug) ayrı klasöre yazılır.
+# disk = WORKSPACE_ROOT/<run_id>/, memory = RAM'deki klasör (/dev/shm). Eski çalışmalar, yeni
+# çalışma açılırken WORKSPACE_KEEP_RUNS / WORKSPACE_MAX_AGE_HOURS'a göre silinir (0 = sınır yok).
+WORKSPACE_BACKEND = os.getenv("WORKSPACE_BACKEND", "disk").lower()
+WORKSPACE_ROOT = os.getenv("WORKSPACE_ROOT", "audit_runs")
+WORKSPACE_KEEP_RUNS = int(os.getenv("WORKSPACE_KEEP_RUNS", "20"))
+WORKSPACE_MAX_AGE_HOURS = float(os.getenv("WORKSPACE_MAX_AGE_HOURS", "24"))
+
+# Aşama span'lerinin (süre, byte, token, tepe bellek) Chrome trace formatında yazılacağı dosya.
+# Boş = sadece rapordaki 'trace' alanı. Göreli yol denetimin output_dir'ine göredir.
+TRACE_FILE = os.getenv("TRACE_FILE", "")
+
+# Figma API HTTP ayarları (paylaşılan keep-alive session)
+FIGMA_API_BASE_URL = os.getenv("FIGMA_API_BASE_URL", "https://api.figma.com/v1")  # Yerel test: mock_figma_server.py
+FIGMA_HTTP_POOL_SIZE = int(os.getenv("FIGMA_HTTP_POOL_SIZE", "10"))
+FIGMA_CONNECT_TIMEOUT = float(os.getenv("FIGMA_CONNECT_TIMEOUT", "10"))
+FIGMA_READ_TIMEOUT = float(os.getenv("FIGMA_READ_TIMEOUT", "60"))
+FIGMA_MAX_URL_LENGTH = int(os.getenv("FIGMA_MAX_URL_LENGTH", "2000"))  # Toplu ID isteklerinde URL sınırı
+FIGMA_DOWNLOAD_WORKERS = int(os.getenv("FIGMA_DOWNLOAD_WORKERS", "4"))  # Eşzamanlı görsel indirme sayısı
+FIGMA_NODE_DEPTH = int(os.getenv("FIGMA_NODE_DEPTH", "0")) or None  # /nodes 'depth' (0 = tüm ağaç)
+FIGMA_RATE_LIMIT_PER_MIN = int(os.getenv("FIGMA_RATE_LIMIT_PER_MIN", "60"))  # Process geneli istek bütçesi (0 = sınırsız)
+FIGMA_RATE_LIMIT_BURST = int(os.getenv("FIGMA_RATE_LIMIT_BURST", "10"))
+FIGMA_MAX_RETRIES = int(os.getenv("FIGMA_MAX_RETRIES", "6"))
+
+# Figma node/render disk cache'i (dosya versiyonu değişmedikçe tekrar indirilmez)
+FIGMA_CACHE_ENABLED = os.getenv("FIGMA_CACHE_ENABLED", "1").lower() not in ("0", "false", "no")
+FIGMA_CACHE_DIR = os.getenv("FIGMA_CACHE_DIR", ".figma_cache")
+FIGMA_CACHE_MAX_MB = int(os.getenv("FIGMA_CACHE_MAX_MB", "500"))
+
+# adb komutu (örn. yerel test için: ADB_COMMAND="python fake_adb.py --scenario fake_device")
+ADB_COMMAND = shlex.split(os.getenv("ADB_COMMAND", "adb"))
+
+# ADB ekran görüntüsü modu:
+# - 'png': cihaz PNG encode eder (screencap -p)
+# - 'raw': ham framebuffer okunur, cihazda encode yok (yüksek frame hızı)
+ADB_CAPTURE_MODE = os.getenv("ADB_CAPTURE_MODE", "png").lower()
+ADB_DUMP_TIMEOUT = float(os.getenv("ADB_DUMP_TIMEOUT", "20"))  # UIAutomator dump için en uzun bekleme (s)
+
+# Cihaz havuzu (birden fazla cihazda paralel denetim, bkz. device_pool.py)
+DEVICE_SERIALS = [s.strip() for s in os.getenv("DEVICE_SERIALS", "").split(",") if s.strip()]  # Boş = 'adb devices'
+DEVICE_HEALTH_INTERVAL = float(os.getenv("DEVICE_HEALTH_INTERVAL", "30"))  # Boştaki cihaz kontrol aralığı (s)
+DEVICE_WORK_DIR = os.getenv("DEVICE_WORK_DIR", "device_runs")  # Cihaz başına çıktı klasörlerinin kökü
+
+# Scroll sonrası "ekran durdu mu" kontrolü (sabit 1 sn bekleme yerine)
+SCROLL_SETTLE_TIMEOUT = float(os.getenv("SCROLL_SETTLE_TIMEOUT", "3.0"))  # Durulmazsa en fazla bu kadar beklenir (s)
+SCROLL_SETTLE_INTERVAL = float(os.getenv("SCROLL_SETTLE_INTERVAL", "0.05"))  # Kareler arası bekleme (s)
+SCROLL_SETTLE_FRAMES = int(os.getenv("SCROLL_SETTLE_FRAMES", "2"))  # Art arda aynı olması gereken kare sayısı
+SCROLL_SETTLE_THUMB_WIDTH = int(os.getenv("SCROLL_SETTLE_THUMB_WIDTH", "64"))  # Karşılaştırma için küçültme genişliği
+SCROLL_SETTLE_BAND_ROWS = int(os.getenv("SCROLL_SETTLE_BAND_ROWS", "64"))  # Kare başına okunan satır bandı (px, tam ekran yerine)
+
+# Scroll gerçekleşti mi kontrolü (perceptual hash, bkz. run_audit._images_are_different)
+SCROLL_HASH_SIZE = (16, 32)  # Hash ızgarası (genişlik x yükseklik blok) -> 1024 bit (yatay + dikey)
+SCROLL_CHANGE_THRESHOLD = float(os.getenv("SCROLL_CHANGE_THRESHOLD", "0.03"))  # Farklı sayılmak için değişen bit oranı
+
+# Scroll birleştirme (auto modda sayfayı tek uzun görüntüye dönüştürme, bkz. stitcher.py)
+STITCH_MAX_SCROLLS = int(os.getenv("STITCH_MAX_SCROLLS", "10"))  # Sayfa sonu bulunamazsa en fazla scroll sayısı
+STITCH_MIN_OVERLAP = int(os.getenv("STITCH_MIN_OVERLAP", "40"))  # Ardışık kareler arasında gereken en az örtüşme (px)
+STITCH_MATCH_RATIO = float(os.getenv("STITCH_MATCH_RATIO", "0.9"))  # Örtüşen satırların eşleşme oranı eşiği
@@ -0,0 +1,328 @@
+# device_pool.py
+"""
+Birden fazla Android cihazda paralel denetim için cihaz havuzu.
+
+Bağlı cihazlar 'adb devices' (veya config.DEVICE_SERIALS) ile bulunur, her biri için kalıcı
+bir adb_client.DeviceSession açılır ve her cihazın kendi iş kuyruğu ile worker thread'i olur.
+İşler en kısa kuyruğa (veya istenen seriye) düşer; bir cihaz sağlık kontrolünden geçemezse
+kuyruğundaki işler diğer sağlıklı cihazlara aktarılır.
+
+Kullanım:
+    pool = DevicePool()
+    pool.start()
+    futures = [pool.submit_audit(figma_parts=["login.png"]), pool.submit_audit(figma_parts=["home.png"])]
+    reports = [f.result() for f in futures]
+    pool.shutdown()
+
+    # Tek seferlik manuel kullanım
+    with pool.lease() as device:
+        device.session.capture_screenshot()
+
+    # asyncio içinden (event loop bloklanmadan beklenir)
+    async with pool.lease_async() as device:
+        ...
+"""
+import asyncio
+import concurrent.futures
+import contextlib
+import os
+import queue
+import re
+import threading
+import time
+
+import adb_client
+import config
+
+
+class PooledDevice:
+    """Havuzdaki tek bir cihaz: oturumu, iş kuyruğu ve durumu."""
+
+    def __init__(self, serial, work_dir):
+        self.serial = serial
+        self.work_dir = work_dir
+        self.session = None
+        self.healthy = False
+        self.leased = False
+        self.jobs = queue.Queue()
+        self.worker = None
+        self.completed = 0
+        self.failed = 0
+        self.last_check = 0.0
+
+    def status(self):
+        return {"serial": self.serial, "healthy": self.healthy, "leased": self.leased,
+                "queued": self.jobs.qsize(), "completed": self.completed, "failed": self.failed}
+
+
+class DevicePool:
+    def __init__(self, serials=None, work_root=None, health_interval=None):
+        self.serials = serials or config.DEVICE_SERIALS
+        self.work_root = work_root or config.DEVICE_WORK_DIR
+        self.health_interval = health_interval if health_interval is not None else config.DEVICE_HEALTH_INTERVAL
+        self.devices = {}
+        self._cond = threading.Condition()
+        self._closed = False
+
+    # --- Keşif ve sağlık kontrolü ---
+
+    def start(self):
+        """Cihazları bulur, oturumlarını açar ve worker'ları başlatır. Sağlıklı cihaz sayısını döndürür."""
+        self.refresh()
+        healthy = sum(1 for d in self.devices.values() if d.healthy)
+        print(f"[DevicePool] {healthy}/{len(self.devices)} cihaz kullanıma hazır.")
+        return healthy
+
+    def refresh(self):
+        """Yeni bağlanan cihazları havuza ekler, kaybolanları sağlıksız işaretler."""
+        serials = self.serials or adb_client.list_devices()
+        for serial in serials:
+            with self._cond:
+                device = self.devices.get(serial)
+                if device is None:
+                    work_dir = os.path.join(self.work_root, re.sub(r"[^A-Za-z0-9_.-]", "_", serial))
+                    device = self.devices[serial] = PooledDevice(serial, work_dir)
+                if device.leased:
+                    continue
+            if not device.healthy:
+                self._check_health(device)
+            if device.worker is None:
+                device.worker = threading.Thread(target=self._worker_loop, args=(device,),
+                                                 name=f"device-{serial}", daemon=True)
+                device.worker.start()
+        if not self.serials:
+            with self._cond:
+                for serial, device in self.devices.items():
+                    if serial not in serials and not device.leased:
+                        device.healthy = False
+
+    def _check_health(self, device):
+        """Oturum yanıt vermiyorsa bir kez yeniden açmayı dener."""
+        if device.session and device.session.is_healthy():
+            healthy = True
+        else:
+            if device.session:
+                device.session.close()
+            device.session = adb_client.DeviceSession(device.serial)
+            healthy = device.session.open()
+        device.last_check = time.monotonic()
+        with self._cond:
+            if device.healthy != healthy:
+                print(f"[DevicePool] {device.serial}: {'sağlıklı' if healthy else 'SAĞLIKSIZ'}")
+            device.healthy = healthy
+            self._cond.notify_all()
+        if not healthy:
+            self._reroute_jobs(device)
+        return healthy
+
+    # --- Kiralama ---
+
+    @contextlib.contextmanager
+    def lease(self, serial=None, timeout=None):
+        """
+        Boştaki sağlıklı bir cihazı (veya verilen seriyi) özel kullanım için kiralar.
+        Süre dolarsa TimeoutError, verilen seri sağlıksızsa (beklerken sağlıksız olursa da) RuntimeError fırlatır.
+        """
+        device = self._acquire(serial, timeout)
+        try:
+            yield device
+        finally:
+            self._release(device)
+
+    def _acquire(self, serial, timeout):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                device = self._try_acquire(serial)
+                if device:
+                    return device
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError(f"Boşta cihaz bulunamadı ({serial or 'herhangi'}).")
+                self._cond.wait(remaining)
+
+    def _try_acquire(self, serial):
+        """Boştaki cihazı kiralar veya None döndürür (self._cond tutulurken çağrılır)."""
+        if self._closed:
+            raise RuntimeError("Cihaz havuzu kapatıldı.")
+        candidates = [d for d in self.devices.values()
+                      if d.healthy and not d.leased and (serial is None or d.serial == serial)]
+        if candidates:
+            device = min(candidates, key=lambda d: d.jobs.qsize())
+            device.leased = True
+            return device
+        if serial is not None and not getattr(self.devices.get(serial), "healthy", False):
+            # Beklenen cihaz sağlıksız (veya havuzda yok); düzelmesini sonsuza kadar bekleme
+            raise RuntimeError(f"Cihaz kullanılamıyor ({serial}).")
+        return None
+
+    @contextlib.asynccontextmanager
+    async def lease_async(self, serial=None, timeout=None):
+        """
+        lease()'in asyncio sürümü: cihaz boşalana kadar event loop bloklanmadan beklenir.
+        Kiralayan taraf cihaza kendi oturumunu açar (örn. adb_client.AsyncDeviceSession);
+        havuzun DeviceSession'ı worker thread'lerine aittir.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._cond:
+                device = self._try_acquire(serial)
+            if device:
+                break
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError(f"Boşta cihaz bulunamadı ({serial or 'herhangi'}).")
+            await asyncio.sleep(0.2)
+        try:
+            yield device
+        finally:
+            # Sağlık kontrolü havuzun (sync) oturumunu kullanır
+            await asyncio.to_thread(self._release, device)
+
+    def _release(self, device):
+        # Kullanım sonrası cihaz hâlâ yanıt veriyor mu?
+        self._check_health(device)
+        with self._cond:
+            device.leased = False
+            self._cond.notify_all()
+
+    # --- Cihaz başına iş kuyrukları ---
+
+    def submit(self, fn, *args, serial=None, **kwargs):
+        """
+        fn(device, *args, **kwargs) çağrısını bir cihazın kuyruğuna ekler.
+        serial verilmezse en kısa kuyruğa sahip sağlıklı cihaz seçilir.
+        Returns: concurrent.futures.Future
+        """
+        future = concurrent.futures.Future()
+        self._enqueue((future, fn, args, kwargs, serial))
+        return future
+
+    def _enqueue(self, job):
+        future, _, _, _, serial = job
+        with self._cond:
+            candidates = [d for d in self.devices.values()
+                          if d.healthy and (serial is None or d.serial == serial)]
+            if self._closed or not candidates:
+                future.set_exception(RuntimeError(f"Kullanılabilir cihaz yok ({serial or 'herhangi'})."))
+                return
+            min(candidates, key=lambda d: d.jobs.qsize() + d.leased).jobs.put(job)
+
+    def _reroute_jobs(self, device):
+        """Sağlıksız cihazın bekleyen işlerini diğer cihazlara dağıtır."""
+        while True:
+            try:
+                job = device.jobs.get_nowait()
+            except queue.Empty:
+                return
+            if job is not None:
+                self._enqueue(job)
+
+    def _worker_loop(self, device):
+        while True:
+            try:
+                job = device.jobs.get(timeout=self.health_interval or None)
+            except queue.Empty:
+                # Boştayken periyodik sağlık kontrolü (kiralanmış cihaza dokunulmaz)
+                with self._cond:
+                    if device.leased or self._closed:
+                        continue
+                    device.leased = True
+                try:
+                    self._check_health(device)
+                finally:
+                    with self._cond:
+                        device.leased = False
+                        self._cond.notify_all()
+                continue
+            if job is None:
+                return
+            if not device.healthy:
+                # Kuyruktayken cihaz düştü; iş başka cihaza gitsin
+                self._enqueue(job)
+                continue
+            future, fn, args, kwargs, _ = job
+            if future.cancelled():
+                continue
+            try:
+                # Cihaz dışarıdan kiralanmışsa (lease()) iş sırasını bekler
+                leased = self._acquire(device.serial, None)
+            except RuntimeError:
+                # Beklerken cihaz sağlıksız oldu (veya havuz kapandı); iş başka cihaza gitsin
+                self._enqueue(job)
+                continue
+            try:
+                # İş ancak cihaz alındıktan sonra 'running' olur; öncesinde başka cihaza aktarılabilir
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    result = fn(leased, *args, **kwargs)
+                except Exception as e:
+                    device.failed += 1
+                    future.set_exception(e)
+                    continue
+                device.completed += 1
+                future.set_result(result)
+            finally:
+                self._release(leased)
+
+    def submit_audit(self, serial=None, setup_commands=None, **audit_kwargs):
+        """
+        run_audit.run_audit_process'i bir cihazda (Otomatik/ADB modunda) çalıştırır.
+        setup_commands: denetimden önce cihaz shell'inde çalıştırılacak komutlar (örn. ekranı
+        açan 'am start ...'); ekran durulduktan sonra denetim başlar.
+        """
+        return self.submit(_run_audit_on_device, serial=serial, setup_commands=setup_commands, **audit_kwargs)
+
+    def status(self):
+        with self._cond:
+            return [d.status() for d in self.devices.values()]
+
+    def shutdown(self, wait=True):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            devices = list(self.devices.values())
+        for device in devices:
+            self._fail_pending(device)
+            device.jobs.put(None)
+        for device in devices:
+            if wait and device.worker:
+                device.worker.join()
+            if device.session:
+                device.session.close()
+
+    def _fail_pending(self, device):
+        while True:
+            try:
+                job = device.jobs.get_nowait()
+            except queue.Empty:
+                return
+            if job is not None:
+                job[0].set_exception(RuntimeError("Cihaz havuzu kapatıldı."))
+
+
+def _run_audit_on_device(device, setup_commands=None, **audit_kwargs):
+    import run_audit  # run_audit bu modülü import etmiyor, fakat ağır bağımlılıkları lazy yüklensin
+
+    os.makedirs(device.work_dir, exist_ok=True)
+    if setup_commands:
+        session = device.session
+        for command in setup_commands:
+            print(f"[DevicePool] {device.serial}: {command}")
+            if session.run(command) is None:
+                raise RuntimeError(f"Cihaz komutu başarısız ({device.serial}): {command}")
+        session.wait_for_stable_screen()
+    print(f"[DevicePool] Denetim {device.serial} cihazında başlıyor (çıktılar: {audit_kwargs.get('output_dir', device.work_dir)})")
+    audit_kwargs.setdefault("output_dir", device.work_dir)
+    audit_kwargs["app_parts"] = None  # Cihaz havuzu her zaman Otomatik (ADB) modda çalışır
+    report = run_audit.run_audit_process(device=device.session, **audit_kwargs)
+    report["device_serial"] = device.serial
+    return report
+
+
+if __name__ == "__main__":
+    pool = DevicePool()
+    pool.start()
+    for entry in pool.status():
+        print(entry)
+    pool.shutdown()
@@ -0,0 +1,542 @@
+# fake_adb.py
+"""
+Cihazsız (CI) test ve benchmark için 'adb' taklidi.
+
+Kaydedilmiş (veya sentetik) bir senaryodaki ekran görüntüleri ve UIAutomator dump'larını
+adb_client'ın kullandığı komutlara yanıt olarak oynatır; her 'input swipe' bir sonraki kareye
+geçer (son karede kalınır = sayfa sonu). Komut başına gecikmeler senaryodan ayarlanır, böylece
+capture / scroll / analiz throughput'u fiziksel cihaz olmadan tekrarlanabilir şekilde ölçülür.
+
+Desteklenen komutlar:
+    devices, get-serialno, -s SERIAL, pull, exec-out screencap [-p],
+    exec-out uiautomator dump /dev/tty, shell (etkileşimli oturum dahil):
+    wm size|density, getprop, input swipe, screencap, uiautomator dump, cat, echo,
+    boru aşamaları: base64, dd bs= skip= count=
+
+Kullanım:
+    # 1) Senaryo üret (sentetik) veya gerçek cihazdan kaydet
+    python fake_adb.py generate --out fake_device --frames 4 --seed 1
+    python fake_adb.py record --out fake_device --frames 4
+
+    # 2) Denetimi taklit cihaza yönlendir
+    ADB_COMMAND="python fake_adb.py --scenario fake_device" python run_audit.py --figma-parts figma.png
+
+    # 3) Capture / dump / scroll throughput'unu ölç
+    python fake_adb.py bench --scenario fake_device --iterations 5 --json adb_bench.json
+
+Senaryo yapısı (<scenario>/scenario.json):
+    {"serial": "fake-0001", "size": [1080, 2400], "density": 420, "sdk": 34,
+     "latency_ms": {"screencap": 250, "uiautomator": 2000, "swipe": 600, "wm": 20, "default": 5},
+     "jitter_ms": 0,
+     "frames": [{"screenshot": "frame_0.png", "xml": "frame_0.xml"}, ...]}
+Durum (kare indeksi, komut sayaçları) <scenario>/.state/ altında tutulur: 'reset' ve 'stats'.
+"""
+import argparse
+import base64
+import contextlib
+import json
+import os
+import random
+import shlex
+import struct
+import sys
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: kilitsiz (tek process kullanımı için yeterli)
+    fcntl = None
+
+import PIL.Image
+import PIL.ImageDraw
+
+TOOL_COMMANDS = ("generate", "record", "bench", "reset", "stats")
+
+
+# --- Senaryo ve durum ---
+
+class FakeDevice:
+    def __init__(self, scenario_dir):
+        self.scenario_dir = scenario_dir
+        with open(os.path.join(scenario_dir, "scenario.json"), "r", encoding="utf-8") as f:
+            self.scenario = json.load(f)
+        self.state_dir = os.path.join(scenario_dir, ".state")
+        os.makedirs(os.path.join(self.state_dir, "fs"), exist_ok=True)
+        self.rng = random.Random()
+
+    @property
+    def serials(self):
+        return self.scenario.get("serials") or [self.scenario.get("serial", "fake-0001")]
+
+    @contextlib.contextmanager
+    def _state(self):
+        """Durum dosyasını kilitli olarak okuyup (değiştirilirse) geri yazar."""
+        path = os.path.join(self.state_dir, "state.json")
+        with open(os.path.join(self.state_dir, "lock"), "a+") as lock:
+            if fcntl:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                try:
+                    with open(path, "r", encoding="utf-8") as f:
+                        state = json.load(f)
+                except (OSError, ValueError):
+                    state = {"frame": {}, "counts": {}}
+                yield state
+                tmp_path = f"{path}.{os.getpid()}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(state, f)
+                os.replace(tmp_path, path)
+            finally:
+                if fcntl:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def delay(self, command):
+        latency = self.scenario.get("latency_ms", {})
+        ms = latency.get(command, latency.get("default", 0))
+        jitter = self.scenario.get("jitter_ms", 0)
+        if jitter:
+            ms += self.rng.uniform(0, jitter)
+        if ms > 0:
+            time.sleep(ms / 1000.0)
+
+    def count(self, command, serial):
+        with self._state() as state:
+            counts = state["counts"]
+            counts[command] = counts.get(command, 0) + 1
+            return state["frame"].get(serial, 0)
+
+    def advance(self, serial):
+        with self._state() as state:
+            last = len(self.scenario["frames"]) - 1
+            state["frame"][serial] = min(state["frame"].get(serial, 0) + 1, last)
+            counts = state["counts"]
+            counts["swipe"] = counts.get("swipe", 0) + 1
+
+    def frame(self, serial, command):
+        index = self.count(command, serial)
+        return self.scenario["frames"][index]
+
+    def frame_path(self, frame, key):
+        return os.path.join(self.scenario_dir, frame[key])
+
+    def device_path(self, path):
+        return os.path.join(self.state_dir, "fs", path.lstrip("/"))
+
+
+# --- adb komut taklidi ---
+
+def _screencap(device, serial, png):
+    frame = device.frame(serial, "screencap")
+    device.delay("screencap")
+    path = device.frame_path(frame, "screenshot")
+    if png:
+        with open(path, "rb") as f:
+            return f.read()
+    with PIL.Image.open(path) as img:
+        rgba = img.convert("RGBA")
+    header = struct.pack("<III", rgba.width, rgba.height, 1)  # 1 = RGBA_8888
+    if device.scenario.get("sdk", 34) >= 28:
+        header += struct.pack("<I", 0)  # colorspace
+    return header + rgba.tobytes()
+
+
+def _dump_xml(device, serial):
+    frame = device.frame(serial, "uiautomator")
+    device.delay("uiautomator")
+    with open(device.frame_path(frame, "xml"), "rb") as f:
+        return f.read()
+
+
+def _run_command(device, serial, args):
+    """Tek bir cihaz komutunu çalıştırır. Returns: (return code, stdout bytes)"""
+    if not args:
+        return 0, b""
+    cmd = args[0]
+    if cmd == "echo":
+        return 0, (" ".join(args[1:]) + "\n").encode()
+    if cmd == "wm":
+        device.count("wm", serial)
+        device.delay("wm")
+        width, height = device.scenario.get("size", [1080, 2400])
+        if args[1:2] == ["size"]:
+            return 0, f"Physical size: {width}x{height}\n".encode()
+        if args[1:2] == ["density"]:
+            return 0, f"Physical density: {device.scenario.get('density', 420)}\n".encode()
+        return 1, b""
+    if cmd == "getprop":
+        device.delay("getprop")
+        props = {"ro.build.version.sdk": str(device.scenario.get("sdk", 34)), "ro.serialno": serial}
+        return 0, (props.get(args[1], "") + "\n").encode() if len(args) > 1 else b""
+    if cmd == "input" and args[1:2] == ["swipe"]:
+        device.delay("swipe")
+        device.advance(serial)
+        return 0, b""
+    if cmd == "screencap":
+        png = "-p" in args[1:]
+        files = [a for a in args[1:] if not a.startswith("-")]
+        data = _screencap(device, serial, png)
+        if files:
+            os.makedirs(os.path.dirname(device.device_path(files[0])), exist_ok=True)
+            with open(device.device_path(files[0]), "wb") as f:
+                f.write(data)
+            return 0, b""
+        return 0, data
+    if cmd == "uiautomator" and args[1:2] == ["dump"]:
+        target = args[2] if len(args) > 2 else "/sdcard/window_dump.xml"
+        xml = _dump_xml(device, serial)
+        if target == "/dev/tty":
+            return 0, xml + f"UI hierchary dumped to: {target}\n".encode()
+        os.makedirs(os.path.dirname(device.device_path(target)), exist_ok=True)
+        with open(device.device_path(target), "wb") as f:
+            f.write(xml)
+        return 0, f"UI hierchary dumped to: {target}\n".encode()
+    if cmd == "cat":
+        try:
+            with open(device.device_path(args[1]), "rb") as f:
+                return 0, f.read()
+        except OSError:
+            return 1, b""
+    if cmd in ("true", ":"):
+        return 0, b""
+    if cmd == "false":
+        return 1, b""
+    return 127, b""
+
+
+def _split_unquoted(text, sep):
+    """text'i tırnak dışındaki 'sep' ayraçlarından böler (örn. echo '|' bölünmez)."""
+    parts, current, quote, i = [], [], None, 0
+    while i < len(text):
+        ch = text[i]
+        if quote:
+            if ch == quote:
+                quote = None
+        elif ch in ("'", '"'):
+            quote = ch
+        elif text.startswith(sep, i) and not (sep == "|" and text.startswith("||", i)):
+            parts.append("".join(current))
+            current = []
+            i += len(sep)
+            continue
+        current.append(ch)
+        i += 1
+    parts.append("".join(current))
+    return parts
+
+
+def _dd(data, args):
+    """toybox 'dd'nin stdin -> stdout bs/skip/count alt kümesi."""
+    opts = dict(a.split("=", 1) for a in args if "=" in a)
+    block = int(opts.get("bs", 512))
+    start = int(opts.get("skip", 0)) * block
+    end = start + int(opts["count"]) * block if "count" in opts else len(data)
+    return data[start:end]
+
+
+def _run_pipeline(device, serial, segment, env):
+    """'a | b', 'a && b', '>/dev/null' içeren tek bir segmenti çalıştırır."""
+    rc, output = 0, b""
+    for part in _split_unquoted(segment, "&&"):
+        if rc != 0:
+            break
+        part = part.replace("2>/dev/null", "")  # stderr zaten yazılmıyor
+        discard = ">/dev/null" in part
+        part = part.replace(">/dev/null", "")
+        stages = [shlex.split(s.replace("$__rc", env.get("__rc", "0"))) for s in _split_unquoted(part, "|")]
+        rc, out = _run_command(device, serial, stages[0])
+        for stage in stages[1:]:
+            if stage[:1] == ["base64"]:
+                encoded = base64.encodebytes(out)
+                out = encoded
+            elif stage[:1] == ["dd"]:
+                out = _dd(out, stage[1:])
+            else:
+                rc, out = 127, b""
+        if not discard:
+            output += out
+    return rc, output
+
+
+def _interactive_shell(device, serial):
+    """DeviceSession'ın stdin üzerinden gönderdiği komut satırlarını çalıştırır."""
+    stdin = sys.stdin.buffer
+    stdout = sys.stdout.buffer
+    env = {}
+    last_rc = 0
+    for raw_line in stdin:
+        line = raw_line.decode("utf-8", errors="replace").strip()
+        if line == "exit":
+            return 0
+        for segment in _split_unquoted(line, ";"):
+            segment = segment.strip()
+            if not segment:
+                continue
+            if segment == "__rc=$?":
+                env["__rc"] = str(last_rc)
+                continue
+            last_rc, output = _run_pipeline(device, serial, segment, env)
+            stdout.write(output)
+        stdout.flush()
+    return 0
+
+
+def run_adb(device, argv):
+    """adb komut satırını taklit eder. Returns: çıkış kodu"""
+    serial = None
+    if argv[:1] == ["-s"]:
+        serial, argv = argv[1], argv[2:]
+        if serial not in device.serials:
+            sys.stderr.write(f"adb: device '{serial}' not found\n")
+            return 1
+    serial = serial or device.serials[0]
+    if not argv:
+        return 1
+    cmd, args = argv[0], argv[1:]
+    out = sys.stdout.buffer
+
+    if cmd == "devices":
+        out.write(b"List of devices attached\n")
+        for s in device.serials:
+            out.write(f"{s}\tdevice\n".encode())
+        return 0
+    if cmd == "get-serialno":
+        out.write(f"{serial}\n".encode())
+        return 0
+    if cmd == "pull":
+        try:
+            with open(device.device_path(args[0]), "rb") as src, open(args[1], "wb") as dst:
+                dst.write(src.read())
+            return 0
+        except OSError as e:
+            sys.stderr.write(f"adb: error: {e}\n")
+            return 1
+    if cmd == "shell" and not args:
+        return _interactive_shell(device, serial)
+    if cmd in ("shell", "exec-out"):
+        segment = " ".join(shlex.quote(a) for a in args) if len(args) > 1 else (args[0] if args else "")
+        rc, output = _run_pipeline(device, serial, segment, {})
+        out.write(output)
+        return rc
+    sys.stderr.write(f"fake_adb: desteklenmeyen komut: {cmd}\n")
+    return 1
+
+
+# --- Senaryo üretimi / kaydı ---
+
+def generate_scenario(out_dir, frames=4, size=(1080, 2400), density=420, sdk=34, header=200, footer=150,
+                      scroll_step=900, latency=None, seed=0):
+    """
+    Uzun sentetik bir sayfa üretip kaydırılmış kareler ve eşleşen UIAutomator dump'ları yazar.
+    Sabit header/footer içerir (scroll birleştirme ve scroll algılama da test edilebilir).
+    """
+    rng = random.Random(seed)
+    width, height = size
+    viewport = height - header - footer
+    page_height = viewport + scroll_step * (frames - 1)
+    page = PIL.Image.new("RGB", (width, page_height), "white")
+    draw = PIL.ImageDraw.Draw(page)
+    items = []
+    y = 0
+    while y < page_height:
+        item_h = rng.randint(100, 260)
+        color = tuple(rng.randint(0, 230) for _ in range(3))
+        draw.rectangle((40, y + 16, width - 40, y + item_h - 16), fill=color)
+        text = f"Öğe {len(items) + 1}"
+        draw.text((64, y + 32), text, fill="white")
+        items.append((text, (40, y + 16, width - 40, y + item_h - 16)))
+        y += item_h
+
+    os.makedirs(out_dir, exist_ok=True)
+    scenario_frames = []
+    for i in range(frames):
+        top = i * scroll_step
+        image = PIL.Image.new("RGB", size, "#f0f0f0")
+        image.paste(page.crop((0, top, width, top + viewport)), (0, header))
+        d = PIL.ImageDraw.Draw(image)
+        d.rectangle((0, 0, width, header), fill="#1a237e")
+        d.text((32, header // 2), "Başlık", fill="white")
+        d.rectangle((0, height - footer, width, height), fill="#263238")
+        image.save(os.path.join(out_dir, f"frame_{i}.png"))
+
+        nodes = [f'<node index="0" text="Başlık" class="android.widget.TextView" package="com.fake.app" '
+                 f'visible-to-user="true" bounds="[32,{header // 4}][{width // 2},{header * 3 // 4}]" />']
+        for text, (x1, y1, x2, y2) in items:
+            vy1, vy2 = y1 - top + header, y2 - top + header
+            if vy2 <= header or vy1 >= height - footer:
+                continue
+            vy1, vy2 = max(vy1, header), min(vy2, height - footer)
+            nodes.append(f'<node index="{len(nodes)}" text="{text}" class="android.widget.TextView" '
+                         f'package="com.fake.app" visible-to-user="true" bounds="[{x1},{vy1}][{x2},{vy2}]" />')
+        xml = ("<?xml version='1.0' encoding='UTF-8' standalone='yes' ?><hierarchy rotation=\"0\">"
+               f'<node index="0" text="" class="android.widget.FrameLayout" package="com.fake.app" '
+               f'visible-to-user="true" bounds="[0,0][{width},{height}]">' + "".join(nodes) + "</node></hierarchy>")
+        with open(os.path.join(out_dir, f"frame_{i}.xml"), "w", encoding="utf-8") as f:
+            f.write(xml)
+        scenario_frames.append({"screenshot": f"frame_{i}.png", "xml": f"frame_{i}.xml"})
+
+    scenario = {
+        "serial": "fake-0001", "size": list(size), "density": density, "sdk": sdk,
+        "latency_ms": latency or {"screencap": 250, "uiautomator": 2000, "swipe": 600, "wm": 20, "default": 5},
+        "jitter_ms": 0,
+        "frames": scenario_frames,
+    }
+    with open(os.path.join(out_dir, "scenario.json"), "w", encoding="utf-8") as f:
+        json.dump(scenario, f, indent=2)
+    print(f"[FakeADB] {frames} karelik sentetik senaryo '{out_dir}' klasörüne yazıldı.")
+
+
+def record_scenario(out_dir, frames=4):
+    """Bağlı gerçek cihazdan kare + dump dizisi ve ortalama komut gecikmelerini kaydeder."""
+    import adb_client
+
+    os.makedirs(out_dir, exist_ok=True)
+    size = adb_client._get_screen_dimensions()
+    density = adb_client.get_screen_density()
+    timings = {"screencap": [], "uiautomator": [], "swipe": []}
+    scenario_frames = []
+    for i in range(frames):
+        capture = adb_client.capture_screenshot("png")
+        if not capture:
+            print("[FakeADB] HATA: Ekran görüntüsü alınamadı, kayıt durduruldu.")
+            break
+        timings["screencap"].append(capture["latency_ms"])
+        with open(os.path.join(out_dir, f"frame_{i}.png"), "wb") as f:
+            f.write(capture["png"])
+        start = time.perf_counter()
+        xml_path = adb_client.dump_layout_xml(out_dir)
+        timings["uiautomator"].append((time.perf_counter() - start) * 1000.0)
+        if xml_path:
+            os.replace(xml_path, os.path.join(out_dir, f"frame_{i}.xml"))
+        scenario_frames.append({"screenshot": f"frame_{i}.png", "xml": f"frame_{i}.xml"})
+        if i < frames - 1:
+            start = time.perf_counter()
+            adb_client.scroll_down()
+            timings["swipe"].append((time.perf_counter() - start) * 1000.0)
+
+    latency = {k: round(sum(v) / len(v)) for k, v in timings.items() if v}
+    latency["default"] = 5
+    scenario = {"serial": "fake-0001", "size": list(size), "density": density or 420, "sdk": 34,
+                "latency_ms": latency, "jitter_ms": 0, "frames": scenario_frames}
+    with open(os.path.join(out_dir, "scenario.json"), "w", encoding="utf-8") as f:
+        json.dump(scenario, f, indent=2)
+    print(f"[FakeADB] {len(scenario_frames)} kare '{out_dir}' klasörüne kaydedildi (gecikmeler: {latency}).")
+
+
+def reset_state(scenario_dir):
+    device = FakeDevice(scenario_dir)
+    with device._state() as state:
+        state["frame"] = {}
+        state["counts"] = {}
+
+
+# --- Benchmark ---
+
+def _timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - start) * 1000.0
+
+
+def run_benchmark(scenario_dir, iterations=3):
+    """
+    adb_client'ı taklit cihaza bağlayıp capture, dump ve scroll aşamalarını ölçer (ms).
+    Ayrı process yolu (modül fonksiyonları) ile kalıcı oturum (DeviceSession) yan yana raporlanır.
+    """
+    import config
+    import adb_client
+
+    config.ADB_COMMAND = [sys.executable, os.path.abspath(__file__), "--scenario", scenario_dir]
+    results = {}
+
+    def record(name, ms):
+        results.setdefault(name, []).append(ms)
+
+    for _ in range(iterations):
+        reset_state(scenario_dir)
+        for mode in ("png", "raw"):
+            _, ms = _timed(lambda: adb_client.capture_screenshot(mode, log=False))
+            record(f"capture_{mode}", ms)
+        _, ms = _timed(lambda: adb_client.start_layout_dump().result(os.path.join(scenario_dir, ".state")))
+        record("dump_stream", ms)
+
+        session = adb_client.DeviceSession()
+        _, ms = _timed(session.open)
+        record("session_open", ms)
+        for mode in ("png", "raw"):
+            _, ms = _timed(lambda: session.capture_screenshot(mode, log=False))
+            record(f"session_capture_{mode}", ms)
+
+        def overlapped():
+            dump = session.start_layout_dump()
+            session.capture_screenshot(log=False)
+            return dump.result(os.path.join(scenario_dir, ".state"))
+        _, ms = _timed(overlapped)
+        record("session_capture_and_dump", ms)
+        _, ms = _timed(session.capture_settle_band)
+        record("session_settle_probe", ms)
+        _, ms = _timed(session.scroll_down)
+        record("session_scroll_settle", ms)
+        _, ms = _timed(session.wait_for_stable_screen)  # Sadece durağanlık beklemesi (eski sabit 1 sn'nin yerine)
+        record("session_settle", ms)
+        session.close()
+        _, ms = _timed(adb_client.scroll_down)
+        record("scroll_settle", ms)
+
+    summary = {name: {"mean_ms": round(sum(v) / len(v), 1), "min_ms": round(min(v), 1)}
+               for name, v in results.items()}
+    print(f"\n{'aşama':<28}{'ort. ms':>10}{'min ms':>10}")
+    for name, row in summary.items():
+        print(f"{name:<28}{row['mean_ms']:>10.1f}{row['min_ms']:>10.1f}")
+    return summary
+
+
+def main():
+    argv = sys.argv[1:]
+    scenario_dir = os.getenv("FAKE_ADB_SCENARIO", "fake_device")
+    if argv[:1] == ["--scenario"]:
+        scenario_dir, argv = argv[1], argv[2:]
+
+    if not argv or argv[0] not in TOOL_COMMANDS:
+        # adb olarak çağrıldı
+        return run_adb(FakeDevice(scenario_dir), argv)
+
+    parser = argparse.ArgumentParser(description="Cihazsız test için adb taklidi")
+    # Senaryo hem alt komuttan önce hem de sonra verilebilir ('--scenario X bench' / 'bench --scenario X')
+    scenario_arg = argparse.ArgumentParser(add_help=False)
+    scenario_arg.add_argument("--scenario", default=scenario_dir, help="Senaryo klasörü")
+    sub = parser.add_subparsers(dest="command", required=True)
+    gen = sub.add_parser("generate", help="Sentetik senaryo üret")
+    gen.add_argument("--out", default=scenario_dir)
+    gen.add_argument("--frames", type=int, default=4)
+    gen.add_argument("--width", type=int, default=1080)
+    gen.add_argument("--height", type=int, default=2400)
+    gen.add_argument("--seed", type=int, default=0)
+    rec = sub.add_parser("record", help="Gerçek cihazdan senaryo kaydet")
+    rec.add_argument("--out", default=scenario_dir)
+    rec.add_argument("--frames", type=int, default=4)
+    bench = sub.add_parser("bench", parents=[scenario_arg], help="Capture / dump / scroll sürelerini ölç")
+    bench.add_argument("--iterations", type=int, default=3)
+    bench.add_argument("--json", help="Sonuçları JSON olarak kaydet")
+    sub.add_parser("reset", parents=[scenario_arg], help="Kare indeksini ve sayaçları sıfırla")
+    sub.add_parser("stats", parents=[scenario_arg], help="Komut sayaçlarını göster")
+    args = parser.parse_args(argv)
+
+    if args.command == "generate":
+        generate_scenario(args.out, frames=args.frames, size=(args.width, args.height), seed=args.seed)
+    elif args.command == "record":
+        record_scenario(args.out, frames=args.frames)
+    elif args.command == "bench":
+        summary = run_benchmark(args.scenario, iterations=args.iterations)
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump(summary, f, indent=2)
+    elif args.command == "reset":
+        reset_state(args.scenario)
+    elif args.command == "stats":
+        with FakeDevice(args.scenario)._state() as state:
+            print(json.dumps(state, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
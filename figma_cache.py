@@ -0,0 +1,170 @@
+# figma_cache.py
+import json
+import os
+import re
+import shutil
+import threading
+import time
+
+import config
+
+# Cache klasörü başına tahmini toplam boyut (byte). Process içinde bir kez taranır, sonra
+# yazılan girdiler eklenir; evict() sadece sınır aşılmış görünüyorsa klasörü tarar.
+_SIZE_ESTIMATES = {}
+_SIZE_LOCK = threading.Lock()
+
+
+def _safe_name(value):
+    """Node ID / versiyon gibi değerleri dosya adına uygun hale getirir (örn. '1:2' -> '1_2')."""
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", str(value))
+
+
+class FigmaCache:
+    """
+    Figma node'ları ve render'ları için disk cache'i.
+
+    Anahtar: (file_key, version, node_id[, scale]). Dosya değişmediği sürece (aynı version)
+    parse edilmiş bileşen listesi ve PNG render'ı tekrar kullanılır; dosya değişirse
+    yeni version farklı bir klasöre düşer ve eski girdiler boyut sınırına göre temizlenir.
+
+    Yapı:
+        <cache_dir>/<file_key>/<version>/nodes/<node_id>.json
+        <cache_dir>/<file_key>/<version>/renders/<node_id>@<scale>x.png
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=None):
+        self.cache_dir = cache_dir or config.FIGMA_CACHE_DIR
+        self.max_bytes = max_bytes if max_bytes is not None else config.FIGMA_CACHE_MAX_MB * 1024 * 1024
+        self._key = os.path.abspath(self.cache_dir)
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _scan(self):
+        """Returns: ([(mtime, boyut, yol), ...], toplam boyut) - yazılmakta olan dosyalar hariç"""
+        entries = []
+        total = 0
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith(".tmp") or name.endswith(".part"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+                total += st.st_size
+        return entries, total
+
+    def _estimated_size(self):
+        with _SIZE_LOCK:
+            if self._key not in _SIZE_ESTIMATES:
+                _SIZE_ESTIMATES[self._key] = self._scan()[1]
+            return _SIZE_ESTIMATES[self._key]
+
+    def note_written(self, path):
+        """Cache'e yeni yazılan dosyayı boyut tahminine ekler."""
+        self._estimated_size()
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return
+        with _SIZE_LOCK:
+            _SIZE_ESTIMATES[self._key] += size
+
+    def _version_dir(self, file_key, version):
+        return os.path.join(self.cache_dir, _safe_name(file_key), _safe_name(version))
+
+    def _nodes_path(self, file_key, version, node_id):
+        return os.path.join(self._version_dir(file_key, version), "nodes", f"{_safe_name(node_id)}.json")
+
+    def render_path(self, file_key, version, node_id, scale):
+        """Render PNG'sinin cache'teki yolu (var olsun ya da olmasın)."""
+        return os.path.join(self._version_dir(file_key, version), "renders",
+                            f"{_safe_name(node_id)}@{scale}x.png")
+
+    def _touch(self, path):
+        # LRU eviction için son erişim zamanını güncelle
+        try:
+            now = time.time()
+            os.utime(path, (now, now))
+        except OSError:
+            pass
+
+    def get_node(self, file_key, version, node_id):
+        """
+        Cache'teki node girdisini döndürür, yoksa None.
+        Girdi: {"frame": {"w": ..., "h": ...} veya None, "components": [...]}
+        """
+        path = self._nodes_path(file_key, version, node_id)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(entry, dict) or "components" not in entry:
+            return None  # Eski formatta girdi, yeniden çekilsin
+        self._touch(path)
+        return entry
+
+    def put_node(self, file_key, version, node_id, components, frame=None):
+        """Parse edilmiş bileşenleri ve root frame boyutunu (Figma biriminde) saklar."""
+        path = self._nodes_path(file_key, version, node_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"frame": frame, "components": components}, f)
+        os.replace(tmp_path, path)
+        # Boyut sınırı her girdide değil, prefetch sonunda bir kez evict() ile uygulanır
+        self.note_written(path)
+
+    def get_render(self, file_key, version, node_id, scale):
+        """Cache'teki render PNG yolunu döndürür, yoksa None."""
+        path = self.render_path(file_key, version, node_id, scale)
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            self._touch(path)
+            return path
+        return None
+
+    def prepare_render_path(self, file_key, version, node_id, scale):
+        """İndirme hedefi olarak kullanılacak render yolunu hazırlar (klasörü oluşturur)."""
+        path = self.render_path(file_key, version, node_id, scale)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return path
+
+    def evict(self):
+        """
+        Toplam boyut max_bytes'ı aşarsa en uzun süredir kullanılmayan dosyaları siler.
+        Boyut tahmini sınırın altındaysa klasör hiç taranmaz. Çalışan denetimler render'ları
+        kendi workspace'lerine bağlayarak (bkz. link_into) kullandığından silinen girdiler
+        onları etkilemez.
+        """
+        if self._estimated_size() <= self.max_bytes:
+            return
+        with _SIZE_LOCK:
+            entries, total = self._scan()
+            if total > self.max_bytes:
+                entries.sort()
+                for _, size, path in entries:
+                    if total <= self.max_bytes:
+                        break
+                    try:
+                        os.remove(path)
+                        total -= size
+                    except OSError:
+                        pass
+                print(f"[FigmaCache] Boyut sınırı aşıldı, eski girdiler silindi ({total / (1024 * 1024):.1f} MB kaldı).")
+            _SIZE_ESTIMATES[self._key] = total
+
+    @staticmethod
+    def link_into(path, target_path):
+        """
+        Cache'teki render'ı çalışma klasörüne hard link'ler (başka dosya sistemindeyse kopyalar);
+        denetim ve rapor bu kopyayı kullanır, eş zamanlı bir evict() onu silemez.
+        """
+        tmp_path = f"{target_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.link(path, tmp_path)
+        except OSError:
+            shutil.copyfile(path, tmp_path)
+        os.replace(tmp_path, target_path)
+        return target_path
@@ -1,32 +1,323 @@
 import requests
+from requests.adapters import HTTPAdapter
+import aiohttp
+import asyncio
 import config
+import tracing
 import json
 import os
+import random
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+
+# --- PAYLAŞILAN HTTP SESSION ---
+# Tüm FigmaClient örnekleri (CLI'da bir run boyunca, server'da tüm istekler boyunca)
+# aynı connection pool'u kullanır; her istek için yeni TLS handshake yapılmaz.
+_shared_session = None
+_shared_session_lock = threading.Lock()
+
+
+def get_shared_session():
+    """Keep-alive ve connection pooling açık, process genelinde tek bir Session döndürür."""
+    global _shared_session
+    if _shared_session is None:
+        with _shared_session_lock:
+            if _shared_session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=config.FIGMA_HTTP_POOL_SIZE,
+                    pool_maxsize=config.FIGMA_HTTP_POOL_SIZE,
+                    pool_block=False,
+                )
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                session.headers.update({
+                    "Accept-Encoding": "gzip, deflate",
+                    "Connection": "keep-alive",
+                })
+                _shared_session = session
+    return _shared_session
+
+
+def close_shared_session():
+    """Paylaşılan Session'ı kapatır (örn. server kapanırken)."""
+    global _shared_session
+    with _shared_session_lock:
+        if _shared_session is not None:
+            _shared_session.close()
+            _shared_session = None
+
+
+# asyncio denetimleri için aiohttp session'ı (bkz. AsyncFigmaClient). aiohttp session'ı açıldığı
+# event loop'a bağlıdır; server açılırken open_async_session() ile loop'a ait paylaşılan session
+# açılır, yoksa her AsyncFigmaClient kendi session'ını açar ve aclose() ile kapatır.
+_async_session = None  # (loop, aiohttp.ClientSession)
+
+
+def _new_async_session():
+    return aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=config.FIGMA_HTTP_POOL_SIZE),
+        timeout=aiohttp.ClientTimeout(sock_connect=config.FIGMA_CONNECT_TIMEOUT, sock_read=config.FIGMA_READ_TIMEOUT),
+    )
+
+
+def open_async_session():
+    """Çalışan event loop için paylaşılan aiohttp session'ı açar (örn. server başlarken)."""
+    global _async_session
+    loop = asyncio.get_running_loop()
+    if _async_session is None or _async_session[0] is not loop or _async_session[1].closed:
+        _async_session = (loop, _new_async_session())
+    return _async_session[1]
+
+
+async def close_async_session():
+    """Paylaşılan aiohttp session'ı kapatır (örn. server kapanırken)."""
+    global _async_session
+    if _async_session is not None:
+        _, session = _async_session
+        _async_session = None
+        await session.close()
+
+
+def _get_async_session():
+    """Çalışan loop'a ait açık paylaşılan session veya None."""
+    if _async_session is not None and _async_session[0] is asyncio.get_running_loop() \
+            and not _async_session[1].closed:
+        return _async_session[1]
+    return None
+
+
+# --- PAYLAŞILAN RATE LIMITER ---
+class RateLimiter:
+    """
+    Process genelinde paylaşılan token-bucket rate limiter.
+    - Dakikalık istek bütçesi (rate_per_min) ve anlık patlama kapasitesi (burst)
+    - Bekleyen istekler FIFO sırada (bilet sırası) hizmet alır
+    - 429 + Retry-After gelince TÜM istekler o süre boyunca durdurulur (pause)
+    rate_per_min <= 0 ise bütçe uygulanmaz, sadece Retry-After duraklamaları geçerlidir.
+    Thread'ler acquire(), asyncio istemcileri acquire_async() kullanır; ikisi aynı bilet sırasını paylaşır.
+    """
+
+    def __init__(self, rate_per_min, burst):
+        self.rate = rate_per_min / 60.0 if rate_per_min > 0 else 0
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._cond = threading.Condition()
+        self._next_ticket = 0
+        self._serving = 0
+        self._abandoned = set()  # Sırası gelmeden iptal edilen (async) biletler
+
+    def _refill(self, now):
+        if self.rate:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def _take_ticket(self):
+        ticket = self._next_ticket
+        self._next_ticket += 1
+        return ticket
+
+    def _try_acquire(self, ticket):
+        """
+        (self._cond tutulurken) Sıra bu bilette ve hak varsa alır.
+        Returns: 0 = alındı, None = sıra başka bilette, aksi halde beklenecek süre (s)
+        """
+        if ticket != self._serving:
+            return None
+        now = time.monotonic()
+        self._refill(now)
+        wait = self.paused_until - now
+        if wait <= 0:
+            if self.rate and self.tokens < 1:
+                return (1 - self.tokens) / self.rate
+            if self.rate:
+                self.tokens -= 1
+            self._advance()
+            return 0
+        return wait
+
+    def _advance(self):
+        self._serving += 1
+        while self._serving in self._abandoned:
+            self._abandoned.discard(self._serving)
+            self._serving += 1
+        self._cond.notify_all()
+
+    def acquire(self):
+        """Bir istek hakkı alınana kadar bekler (sıraya girer)."""
+        with self._cond:
+            ticket = self._take_ticket()
+            while True:
+                wait = self._try_acquire(ticket)
+                if wait == 0:
+                    return
+                self._cond.wait(wait)
+
+    async def acquire_async(self):
+        """acquire()'ın event loop'u bloklamayan sürümü."""
+        with self._cond:
+            ticket = self._take_ticket()
+        try:
+            while True:
+                with self._cond:
+                    wait = self._try_acquire(ticket)
+                if wait == 0:
+                    return
+                # Sıra başka bir bilette: thread'ler cond ile uyanır, coroutine kısa aralıklarla yoklar
+                await asyncio.sleep(0.01 if wait is None else wait)
+        except asyncio.CancelledError:
+            # Sırası gelmemiş bilet kuyruğu tıkamasın
+            with self._cond:
+                if ticket == self._serving:
+                    self._advance()
+                elif ticket > self._serving:
+                    self._abandoned.add(ticket)
+            raise
+
+    def pause(self, seconds):
+        """429 sonrası tüm istekleri 'seconds' boyunca durdurur ve bütçeyi sıfırlar."""
+        with self._cond:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+            self.tokens = 0.0
+            self._cond.notify_all()
+
+
+_rate_limiter = None
+_rate_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    """Tüm FigmaClient'ların (ve server'daki paralel denetimlerin) paylaştığı limiter."""
+    global _rate_limiter
+    if _rate_limiter is None:
+        with _rate_limiter_lock:
+            if _rate_limiter is None:
+                _rate_limiter = RateLimiter(config.FIGMA_RATE_LIMIT_PER_MIN, config.FIGMA_RATE_LIMIT_BURST)
+    return _rate_limiter
+
+
+def _retry_after_seconds(response, attempt):
+    """
+    429 yanıtındaki Retry-After başlığını (saniye veya HTTP tarihi) okur.
+    Başlık yoksa üstel backoff (1s, 2s, 4s...) kullanılır. Paralel istemciler aynı anda
+    geri dönmesin diye jitter eklenir.
+    """
+    header = response.headers.get("Retry-After") if response is not None else None
+    wait = None
+    if header:
+        try:
+            wait = float(header)
+        except ValueError:
+            try:
+                wait = (parsedate_to_datetime(header).timestamp() - time.time())
+            except (TypeError, ValueError):
+                wait = None
+    if wait is None or wait < 0:
+        wait = float(2 ** attempt)
+    return wait + random.uniform(0, min(1.0, wait * 0.1))
+
+
+# parse_figma_response'un kullandığı alanlar; geri kalan her şey (componentler, stiller,
+# efektler, constraint'ler vb.) JSON çözümlenirken atılır.
+_COMPACT_KEYS = frozenset([
+    # Yanıt kökü
+    "name", "nodes", "version", "lastModified", "err", "status",
+    # Node
+    "document", "children", "type", "visible", "characters", "fills", "strokes", "absoluteBoundingBox",
+    # Bounding box / renk
+    "x", "y", "width", "height", "color", "r", "g", "b", "a",
+])
+
+
+def _compact_object(obj):
+    """
+    JSON nesnelerini çözümlenir çözümlenmez (içten dışa) küçültür.
+    'nodes' sözlüğünün anahtarları node ID'leri olduğundan, değeri bir node girdisi
+    ('document' içeren) olan anahtarlar da korunur.
+    """
+    return {
+        k: v for k, v in obj.items()
+        if k in _COMPACT_KEYS or (isinstance(v, dict) and "document" in v)
+    }
+
+
+def _load_compact_json(response):
+    """
+    Yanıtı küçültülmüş ağaç olarak çözümler. json.load gövdenin tamamını tek bir string olarak
+    okur (tepe bellek yine doküman boyutuyla orantılıdır); kazanç, gereksiz alanların
+    object_hook ile decode sırasında atılması ve sonrasında tutulan ağacın küçük olmasıdır.
+    """
+    response.raw.decode_content = True  # gzip/deflate açılarak okunur
+    return json.load(response.raw, object_hook=_compact_object)
+
+
+def parse_figma_link(link: str):
+    """
+    Extracts file_key and node_id from a Figma URL.
+    Example: https://www.figma.com/design/KEY/Title?node-id=1-2...
+    """
+    try:
+        from urllib.parse import urlparse, parse_qs
+        parsed = urlparse(link)
+        path_parts = parsed.path.split('/')
+        
+        # File Key is usually the 3rd or 4th part depending on URL structure
+        # /file/KEY/Title or /design/KEY/Title
+        file_key = None
+        for part in path_parts:
+            if len(part) > 20: # Heuristic for ID
+                file_key = part
+                break
+        
+        if not file_key:
+            return None, None
+            
+        query_params = parse_qs(parsed.query)
+        node_id = query_params.get('node-id', [None])[0]
+        
+        if node_id:
+            node_id = node_id.replace('-', ':')
+            
+        return file_key, node_id
+    except:
+        return None, None
+
 
 class FigmaClient:
-    def __init__(self):
+    def __init__(self, session=None):
         self.access_token = config.FIGMA_ACCESS_TOKEN
-        self.base_url = "https://api.figma.com/v1"
+        self.base_url = config.FIGMA_API_BASE_URL.rstrip("/")
         self.headers = {
             "X-Figma-Token": self.access_token
         }
+        self.session = session or get_shared_session()
+        self.rate_limiter = get_rate_limiter()
+        self.timeout = (config.FIGMA_CONNECT_TIMEOUT, config.FIGMA_READ_TIMEOUT)
 
-    def _make_request(self, url, retries=3):
+    def _make_request(self, url, retries=None, stream=False):
         """
-        Helper method to make HTTP requests with exponential backoff for rate limits.
+        Helper method to make HTTP requests through the shared rate limiter.
+        429'da Retry-After (yoksa üstel backoff + jitter) kadar TÜM Figma istekleri bekletilir.
+        stream=True ise gövde okunmadan döner (çağıran okuyup kapatmalıdır).
         """
+        retries = retries or config.FIGMA_MAX_RETRIES
         for i in range(retries):
+            self.rate_limiter.acquire()
             try:
-                response = requests.get(url, headers=self.headers)
+                response = self.session.get(url, headers=self.headers, timeout=self.timeout, stream=stream)
                 response.raise_for_status()
                 return response
             except requests.exceptions.HTTPError as e:
                 if e.response.status_code == 429:
                     if i < retries - 1:
-                        wait_time = (2 ** i)  # Exponential backoff: 1s, 2s, 4s
-                        print(f"[FigmaClient] Rate limit hit. Retrying in {wait_time}s...")
-                        time.sleep(wait_time)
+                        wait_time = _retry_after_seconds(e.response, i)
+                        print(f"[FigmaClient] Rate limit hit. Retrying in {wait_time:.1f}s...")
+                        e.response.close()
+                        self.rate_limiter.pause(wait_time)
                         continue
                     else:
                         raise Exception("Figma API Rate Limit Exceeded. Please try again later.")
@@ -41,22 +332,52 @@ class FigmaClient:
         return None
 
 
-    def get_file_nodes(self, file_key, node_ids):
+    def get_file_version(self, file_key):
+        """
+        Dosyanın güncel versiyonunu ucuz bir istekle (depth=1) döndürür.
+        Cache anahtarı olarak kullanılır; 'version' yoksa 'lastModified' döner.
+        """
+        if not self.access_token:
+            raise Exception("Figma Access Token is missing. Please check your configuration.")
+
+        url = f"{self.base_url}/files/{file_key}?depth=1"
+        response = self._make_request(url)
+        data = response.json()
+        return data.get("version") or data.get("lastModified")
+
+    def get_file_nodes(self, file_key, node_ids, depth=None, geometry=None):
         """
         Fetches specific nodes from a Figma file.
         node_ids: list of strings (e.g., ["1:2", "10:5"])
+        depth: Figma 'depth' parametresi (None = tüm ağaç, config.FIGMA_NODE_DEPTH varsayılan)
+        geometry: Figma 'geometry' parametresi ('paths' vektör verisini de getirir; biz kullanmıyoruz)
+
+        Çözümleme sırasında sadece parse_figma_response'un kullandığı alanlar tutulur
+        (bkz. _COMPACT_KEYS); ham yanıt decode sırasında yine tamamen bellektedir, fakat
+        sonrasında saklanan / cache'lenen ağaç küçüktür.
         """
         if not self.access_token:
             raise Exception("Figma Access Token is missing. Please check your configuration.")
 
-        ids_str = ",".join(node_ids)
-        url = f"{self.base_url}/files/{file_key}/nodes?ids={ids_str}"
-        
-        try:
-            response = self._make_request(url)
-            return response.json()
-        except Exception as e:
-            raise e
+        url = self._nodes_url(file_key, node_ids, depth, geometry)
+        with tracing.span("figma.fetch_nodes", nodes=len(node_ids)) as span:
+            response = self._make_request(url, stream=True)
+            try:
+                data = _load_compact_json(response)
+                # Ağdan okunan (sıkıştırılmış) byte sayısı
+                span.add(bytes=response.raw.tell())
+                return data
+            finally:
+                response.close()
+
+    def _nodes_url(self, file_key, node_ids, depth=None, geometry=None):
+        url = f"{self.base_url}/files/{file_key}/nodes?ids={','.join(node_ids)}"
+        depth = depth if depth is not None else config.FIGMA_NODE_DEPTH
+        if depth:
+            url += f"&depth={depth}"
+        if geometry:
+            url += f"&geometry={geometry}"
+        return url
 
     def get_image(self, file_key, node_id, scale=1.0):
         """
@@ -76,75 +397,171 @@ class FigmaClient:
                 raise Exception("Figma API Rate Limit Exceeded (Images).")
             raise e
 
+    def _chunk_ids(self, url_prefix, node_ids, url_suffix=""):
+        """
+        Node ID listesini, oluşan URL FIGMA_MAX_URL_LENGTH'i aşmayacak şekilde gruplara böler.
+        """
+        max_len = config.FIGMA_MAX_URL_LENGTH
+        chunks, current, current_len = [], [], len(url_prefix) + len(url_suffix)
+        for node_id in node_ids:
+            # ':' URL'de '%3A' olarak gidebilir, en kötü durumu hesaba kat
+            id_len = len(node_id.replace(":", "%3A")) + (3 if current else 0)  # ',' -> '%2C'
+            if current and current_len + id_len > max_len:
+                chunks.append(current)
+                current, current_len = [], len(url_prefix) + len(url_suffix)
+                id_len -= 3
+            current.append(node_id)
+            current_len += id_len
+        if current:
+            chunks.append(current)
+        return chunks
+
+    def get_file_nodes_batched(self, file_key, node_ids):
+        """
+        Birden fazla node'u mümkün olan en az istekle çeker (ID'ler virgülle birleştirilir,
+        URL uzunluğuna göre parçalanır). Tüm parçaların 'nodes' sözlükleri birleştirilir.
+        """
+        unique_ids = list(dict.fromkeys(node_ids))
+        url_prefix = f"{self.base_url}/files/{file_key}/nodes?ids="
+        merged = None
+        for chunk in self._chunk_ids(url_prefix, unique_ids):
+            data = self.get_file_nodes(file_key, chunk)
+            if merged is None:
+                merged = data
+            else:
+                merged.setdefault("nodes", {}).update(data.get("nodes") or {})
+        return merged
+
+    def get_images_batched(self, file_key, node_ids, scale=1.0):
+        """
+        Birden fazla node için render URL'lerini toplu ister.
+        Returns: {node_id: image_url veya None}
+        """
+        if not self.access_token:
+            raise Exception("Figma Access Token is missing.")
+
+        unique_ids = list(dict.fromkeys(node_ids))
+        url_prefix = f"{self.base_url}/images/{file_key}?ids="
+        url_suffix = f"&scale={scale}&format=png"
+        image_urls = {}
+        for chunk in self._chunk_ids(url_prefix, unique_ids, url_suffix):
+            url = url_prefix + ",".join(chunk) + url_suffix
+            try:
+                with tracing.span("figma.image_urls", nodes=len(chunk), scale=scale) as span:
+                    response = self._make_request(url)
+                    span.add(bytes=len(response.content))
+                    image_urls.update(response.json().get("images") or {})
+            except Exception as e:
+                if "Rate Limit" in str(e):
+                    raise Exception("Figma API Rate Limit Exceeded (Images).")
+                raise e
+        return {node_id: image_urls.get(node_id) for node_id in unique_ids}
+
+    def start_downloads(self, downloads, max_workers=None):
+        """
+        Görselleri arka planda, eşzamanlı olarak indirmeye başlar.
+        downloads: {key: (url, output_path)}
+        Returns: (executor, {key: Future}) - Future sonucu download_image ile aynıdır (path veya None).
+        Executor'ı işi bitince kapatmak çağıranın sorumluluğundadır.
+        """
+        executor = ThreadPoolExecutor(max_workers=max_workers or config.FIGMA_DOWNLOAD_WORKERS)
+        futures = {
+            key: executor.submit(tracing.bind(self.download_image), url, output_path)
+            for key, (url, output_path) in downloads.items()
+        }
+        return executor, futures
+
     def download_image(self, url, output_path):
         """Downloads the image from the URL to the specified path."""
         try:
-            response = requests.get(url, stream=True)
-            response.raise_for_status()
-            with open(output_path, 'wb') as f:
-                for chunk in response.iter_content(1024):
-                    f.write(chunk)
+            # S3 URL'leri token istemez; 'with' ile bağlantı pool'a geri bırakılır
+            # Önce geçici dosyaya yaz, bitince taşı: yarım kalan indirme hedefi bozmaz.
+            # Geçici ad indirme başına tekildir; aynı render'ı cache'e indiren eş zamanlı denetimler çakışmaz
+            tmp_path = f"{output_path}.{os.getpid()}.{threading.get_ident()}.part"
+            with tracing.span("figma.download") as span, \
+                    self.session.get(url, stream=True, timeout=self.timeout) as response:
+                response.raise_for_status()
+                with open(tmp_path, 'wb') as f:
+                    for chunk in response.iter_content(64 * 1024):
+                        f.write(chunk)
+                        span.add(bytes=len(chunk))
+            os.replace(tmp_path, output_path)
             return output_path
         except Exception as e:
             print(f"[FigmaClient] Error downloading image: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
             return None
 
     def parse_figma_response(self, json_data):
         """
         Parses the raw Figma API response into a flat list of components
         compatible with the comparator's expected format.
-        Recursively traverses the node tree.
         """
-        if not json_data or "nodes" not in json_data:
-            return []
+        return list(self.iter_figma_components(json_data))
 
-        components = []
+    def get_frame_size(self, json_data, node_id):
+        """İstenen node'un (root frame) Figma birimindeki boyutu: {"w", "h"} veya None."""
+        node_info = ((json_data or {}).get("nodes") or {}).get(node_id) or {}
+        bounds = (node_info.get("document") or {}).get("absoluteBoundingBox")
+        if not bounds or not bounds.get("width"):
+            return None
+        return {"w": bounds["width"], "h": bounds["height"]}
+
+    def iter_figma_components(self, json_data):
+        """
+        Yanıttaki node ağacını açık bir stack ile (özyinelemesiz) dolaşır ve bileşenleri
+        bulundukça üretir. Çok derin frame'lerde recursion limitine takılmaz.
+        Sıra, önceki özyinelemeli (pre-order) dolaşım ile aynıdır.
+        """
+        if not json_data or "nodes" not in json_data:
+            return
 
         for node_id, node_info in json_data["nodes"].items():
-            document = node_info.get("document")
-            if document:
-                # The root node of the request (the Frame)
-                # We need its absolute position to use as offset for children
-                root_bounds = document.get("absoluteBoundingBox")
-                offset_x = 0
-                offset_y = 0
-                if root_bounds:
-                    offset_x = root_bounds["x"]
-                    offset_y = root_bounds["y"]
-                
-                # Traverse children, passing the offset to subtract
-                # Note: The root node itself should probably NOT be added as a component?
-                # Or if it is, it will be at 0,0.
-                # Usually we want the *contents* of the frame.
-                if "children" in document:
-                    for child in document["children"]:
-                        self._traverse_node(child, components, offset_x, offset_y)
-
-        return components
-
-    def _traverse_node(self, node, components, offset_x, offset_y):
-        """
-        Recursive function to traverse the node tree.
+            document = (node_info or {}).get("document")
+            if not document:
+                continue
+
+            # The root node of the request (the Frame)
+            # We need its absolute position to use as offset for children
+            root_bounds = document.get("absoluteBoundingBox")
+            offset_x = 0
+            offset_y = 0
+            if root_bounds:
+                offset_x = root_bounds["x"]
+                offset_y = root_bounds["y"]
+
+            # Root node'un kendisi bileşen olarak eklenmez; frame'in *içeriği* dolaşılır.
+            stack = list(reversed(document.get("children") or []))
+            while stack:
+                node = stack.pop()
+                comp, descend = self._node_to_component(node, offset_x, offset_y)
+                if comp:
+                    yield comp
+                if descend:
+                    stack.extend(reversed(node.get("children") or []))
+
+    def _node_to_component(self, node, offset_x, offset_y):
+        """
+        Tek bir node'u bileşene çevirir.
+        Returns: (component veya None, çocuklara inilsin mi)
         """
         # Calculate absolute position relative to the Root Frame
         bounds = node.get("absoluteBoundingBox")
-        
-        if not bounds:
-             pass
 
         # Determine type
         node_type = node.get("type")
         
         # Filter out invisible nodes
         if node.get("visible") is False:
-            return
+            return None, False
 
         # --- REFINEMENT: Filter System Bars ---
-        node_name_lower = node.get("name", "").lower()
+        node_name_lower = (node.get("name") or "").lower()
         if "status bar" in node_name_lower or "navigation bar" in node_name_lower or "home indicator" in node_name_lower:
             # Skip system bars entirely from the "Figma" side data
             # This avoids matching them against the App screenshot which might have different bars
-            return
+            return None, False
 
         # Map Figma types to our internal types
         internal_type = "Container"
@@ -186,24 +603,8 @@ class FigmaClient:
                      break
 
         # Create component dict
+        comp = None
         if bounds:
-            # NORMALIZE COORDINATES: Subtract the Root Frame's position
-            rel_x = bounds["x"] - offset_x
-            rel_y = bounds["y"] - offset_y
-            
-            comp = {
-                "name": node.get("name"),
-                "type": internal_type,
-                "bounds": {
-                    "x": rel_x,
-                    "y": rel_y,
-                    "w": bounds["width"],
-                    "h": bounds["height"]
-                },
-                "text_content": text_content,
-                "estimated_color": color_hex,
-            }
-            
             should_add = False
             if internal_type == "Text":
                 should_add = True
@@ -218,11 +619,161 @@ class FigmaClient:
                 should_add = True
             
             if should_add:
-                components.append(comp)
+                # NORMALIZE COORDINATES: Subtract the Root Frame's position
+                comp = {
+                    "name": node.get("name"),
+                    "type": internal_type,
+                    "bounds": {
+                        "x": bounds["x"] - offset_x,
+                        "y": bounds["y"] - offset_y,
+                        "w": bounds["width"],
+                        "h": bounds["height"]
+                    },
+                    "text_content": text_content,
+                    "estimated_color": color_hex,
+                }
 
+        return comp, True
 
-        # Recursion
-        if "children" in node:
-            for child in node["children"]:
-                self._traverse_node(child, components, offset_x, offset_y)
 
+class AsyncFigmaClient(FigmaClient):
+    """
+    FigmaClient'ın asyncio sürümü (aiohttp): ağ metodlarının hepsi coroutine'dir; ayrıştırma
+    (parse_figma_response, get_frame_size) ve ID gruplama FigmaClient'tan gelir.
+    Rate limiter sync istemcilerle paylaşılır (process geneli bütçe, Retry-After duraklamaları).
+    Toplu isteklerin parçaları ve indirmeler eşzamanlı yürür. İş bitince aclose() çağrılmalıdır.
+    """
+
+    def __init__(self, session=None):
+        self.access_token = config.FIGMA_ACCESS_TOKEN
+        self.base_url = config.FIGMA_API_BASE_URL.rstrip("/")
+        self.headers = {
+            "X-Figma-Token": self.access_token
+        }
+        session = session or _get_async_session()
+        self._owns_session = session is None
+        self.session = session or _new_async_session()
+        self.rate_limiter = get_rate_limiter()
+        self._download_slots = asyncio.Semaphore(max(1, config.FIGMA_DOWNLOAD_WORKERS))
+
+    async def aclose(self):
+        if self._owns_session:
+            await self.session.close()
+
+    async def _make_request(self, url, retries=None):
+        """_make_request'in async sürümü. Returns: yanıt gövdesi (bytes)"""
+        retries = retries or config.FIGMA_MAX_RETRIES
+        for i in range(retries):
+            await self.rate_limiter.acquire_async()
+            try:
+                async with self.session.get(url, headers=self.headers) as response:
+                    if response.status == 429:
+                        if i < retries - 1:
+                            wait_time = _retry_after_seconds(response, i)
+                            print(f"[FigmaClient] Rate limit hit. Retrying in {wait_time:.1f}s...")
+                            self.rate_limiter.pause(wait_time)
+                            continue
+                        raise Exception("Figma API Rate Limit Exceeded. Please try again later.")
+                    if response.status == 403:
+                        raise Exception("Figma API Access Denied. Check your Token and File permissions.")
+                    if response.status == 404:
+                        raise Exception("Figma File or Node not found.")
+                    response.raise_for_status()
+                    return await response.read()
+            except aiohttp.ClientResponseError as e:
+                raise Exception(f"Figma API Error: {str(e)}")
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                raise Exception(f"Figma Connection Error: {str(e) or type(e).__name__}")
+        return None
+
+    async def get_file_version(self, file_key):
+        if not self.access_token:
+            raise Exception("Figma Access Token is missing. Please check your configuration.")
+        data = json.loads(await self._make_request(f"{self.base_url}/files/{file_key}?depth=1"))
+        return data.get("version") or data.get("lastModified")
+
+    async def get_file_nodes(self, file_key, node_ids, depth=None, geometry=None):
+        """get_file_nodes'un async sürümü; sadece parse_figma_response'un kullandığı alanlar tutulur."""
+        if not self.access_token:
+            raise Exception("Figma Access Token is missing. Please check your configuration.")
+
+        url = self._nodes_url(file_key, node_ids, depth, geometry)
+        with tracing.span("figma.fetch_nodes", nodes=len(node_ids)) as span:
+            body = await self._make_request(url)
+            span.add(bytes=len(body))
+            # Büyük dokümanlarda JSON decode CPU-yoğun; event loop'u tutmasın
+            return await asyncio.to_thread(json.loads, body, object_hook=_compact_object)
+
+    async def get_file_nodes_batched(self, file_key, node_ids):
+        """get_file_nodes_batched'in async sürümü; URL parçaları eşzamanlı istenir."""
+        unique_ids = list(dict.fromkeys(node_ids))
+        url_prefix = f"{self.base_url}/files/{file_key}/nodes?ids="
+        merged = None
+        chunks = self._chunk_ids(url_prefix, unique_ids)
+        for data in await asyncio.gather(*(self.get_file_nodes(file_key, chunk) for chunk in chunks)):
+            if merged is None:
+                merged = data
+            else:
+                merged.setdefault("nodes", {}).update(data.get("nodes") or {})
+        return merged
+
+    async def get_image(self, file_key, node_id, scale=1.0):
+        return (await self.get_images_batched(file_key, [node_id], scale=scale)).get(node_id)
+
+    async def get_images_batched(self, file_key, node_ids, scale=1.0):
+        """get_images_batched'in async sürümü. Returns: {node_id: image_url veya None}"""
+        if not self.access_token:
+            raise Exception("Figma Access Token is missing.")
+
+        unique_ids = list(dict.fromkeys(node_ids))
+        url_prefix = f"{self.base_url}/images/{file_key}?ids="
+        url_suffix = f"&scale={scale}&format=png"
+
+        async def fetch(chunk):
+            try:
+                with tracing.span("figma.image_urls", nodes=len(chunk), scale=scale) as span:
+                    body = await self._make_request(url_prefix + ",".join(chunk) + url_suffix)
+                    span.add(bytes=len(body))
+                    return json.loads(body).get("images") or {}
+            except Exception as e:
+                if "Rate Limit" in str(e):
+                    raise Exception("Figma API Rate Limit Exceeded (Images).")
+                raise e
+
+        image_urls = {}
+        chunks = self._chunk_ids(url_prefix, unique_ids, url_suffix)
+        for images in await asyncio.gather(*(fetch(chunk) for chunk in chunks)):
+            image_urls.update(images)
+        return {node_id: image_urls.get(node_id) for node_id in unique_ids}
+
+    def start_downloads(self, downloads, max_workers=None):
+        """
+        Görselleri eşzamanlı indiren task'ları başlatır (en fazla FIGMA_DOWNLOAD_WORKERS aynı anda).
+        Returns: (None, {key: asyncio.Task}) - executor yok; task sonucu download_image ile aynıdır.
+        """
+        return None, {
+            key: asyncio.create_task(self.download_image(url, output_path))
+            for key, (url, output_path) in downloads.items()
+        }
+
+    async def download_image(self, url, output_path):
+        """Görseli indirir (geçici dosyaya yazıp taşır). Returns: output_path veya None"""
+        tmp_path = f"{output_path}.{os.getpid()}.{id(asyncio.current_task())}.part"
+        try:
+            async with self._download_slots:
+                with tracing.span("figma.download") as span:
+                    async with self.session.get(url) as response:
+                        response.raise_for_status()
+                        with open(tmp_path, "wb") as f:
+                            async for chunk in response.content.iter_chunked(64 * 1024):
+                                f.write(chunk)
+                                span.add(bytes=len(chunk))
+            os.replace(tmp_path, output_path)
+            return output_path
+        except Exception as e:
+            print(f"[FigmaClient] Error downloading image: {e}")
+            return None
+        finally:
+            # Hata veya iptal (CancelledError) sonrası yarım dosya kalmasın
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
@@ -1,6 +1,8 @@
 # image_analyzer.py
 import google.generativeai as genai
+import asyncio
 import config
+import tracing
 import PIL.Image
 import PIL.ImageDraw
 import PIL.ImageFont
@@ -111,7 +113,7 @@ def _extract_json_from_response(text: str):
     return text.strip()
 
 
-def _save_debug_image(original_image_path, json_data):
+def _save_debug_image(original_image_path, json_data, output_dir="."):
     """
     Analiz sonucunu görselleştirir.
     Kutuların üzerine Tip ve İsim yazar.
@@ -161,7 +163,7 @@ def _save_debug_image(original_image_path, json_data):
                 draw.text((x + 2, label_y), label, fill="white")
 
         base_name = os.path.basename(original_image_path)
-        debug_filename = f"DEBUG_AI_VISION_{base_name}"
+        debug_filename = os.path.join(output_dir, f"DEBUG_AI_VISION_{base_name}")
         img.save(debug_filename)
         print(f"[DEBUG] Görsel kaydedildi: {debug_filename}")
 
@@ -169,141 +171,204 @@ def _save_debug_image(original_image_path, json_data):
         print(f"[DEBUG] Resim çizme hatası: {e}")
 
 
+def _record_token_usage(span, response):
+    """Gemini yanıtındaki token kullanımını tracing span'ine ekler."""
+    usage = getattr(response, "usage_metadata", None)
+    if usage:
+        span.add(
+            prompt_tokens=getattr(usage, "prompt_token_count", 0) or 0,
+            output_tokens=getattr(usage, "candidates_token_count", 0) or 0,
+            tokens=getattr(usage, "total_token_count", 0) or 0,
+        )
+
+
+def _slice_prompt(expected_components=None):
+    """Dilim analizi prompt'u; expected_components varsa Hybrid mod prompt'u."""
+    if not expected_components:
+        return SYSTEM_PROMPT
+    # Format expected components for this slice (simple heuristic: include all or filter by y)
+    # Let's pass a simplified list of names/types/texts to avoid token limit issues
+    comp_strs = []
+    for c in expected_components:
+        c_name = c.get('name', 'Unknown')
+        c_type = c.get('type', 'Unknown')
+        c_text = c.get('text_content', '')
+        comp_strs.append(f"- [{c_type}] '{c_name}' (Text: '{c_text}')")
+
+    # Limit to top 50 to avoid context window issues if list is huge
+    if len(comp_strs) > 50:
+        comp_strs = comp_strs[:50] + ["... ve diğerleri"]
+
+    component_list_str = "\n".join(comp_strs)
+    print(f"   -> [AI] Hybrid Mode: {len(comp_strs)} beklenen bileşen ile prompt oluşturuldu.")
+    return CONTEXT_AWARE_PROMPT_TEMPLATE.format(component_list_str=component_list_str)
+
+
+def _parse_slice_response(response, offset_y, part_no):
+    """Gemini yanıtındaki bileşenleri global koordinata taşır ve filtreler."""
+    raw_text = getattr(response, "text", str(response))
+    json_str = _extract_json_from_response(raw_text)
+
+    if not json_str:
+        print(f"   -> [UYARI] Parça {part_no} boş veri döndü.")
+        return []
+
+    data = json.loads(json_str)
+    if not isinstance(data, list): return []
+
+    valid_data = []
+    for comp in data:
+        if "bounds" in comp:
+            # Koordinatları global konuma oturt
+            comp["bounds"]["y"] += offset_y
+
+            # --- PYTHON TARAFI FİLTRELEME ---
+            # AI bazen prompta uymaz, burada ikinci bir güvenlik kontrolü yapıyoruz.
+            c_type = comp.get("type", "")
+            c_text = comp.get("text_content", "")
+
+            # Eğer tipi Container ise ve metin yoksa -> ÇÖP (Hayalet Kutu)
+            if c_type == "Container" and not c_text:
+                continue
+
+            # Eğer sınırları (bounds) 0 veya negatifse -> ÇÖP
+            if comp["bounds"]["w"] <= 0 or comp["bounds"]["h"] <= 0:
+                continue
+
+            valid_data.append(comp)
+
+    return valid_data
+
+
 def _analyze_single_slice(pil_image, offset_y, part_no, expected_components=None):
     """Tek bir görüntü dilimini analiz eder."""
     try:
         print(f"   -> [AI] Parça {part_no} analiz ediliyor (Offset: {offset_y})...")
-        
-        prompt_to_use = SYSTEM_PROMPT
-        if expected_components:
-            # Format expected components for this slice (simple heuristic: include all or filter by y)
-            # For simplicity, we pass a summary of all components to give context
-            # Or better: filter components that are likely in this slice range?
-            # Let's pass a simplified list of names/types/texts to avoid token limit issues
-            
-            comp_strs = []
-            for c in expected_components:
-                # Optional: Filter by Y coordinate if we trust Figma Y enough
-                # if c['bounds']['y'] ...
-                
-                c_name = c.get('name', 'Unknown')
-                c_type = c.get('type', 'Unknown')
-                c_text = c.get('text_content', '')
-                comp_strs.append(f"- [{c_type}] '{c_name}' (Text: '{c_text}')")
-            
-            # Limit to top 50 to avoid context window issues if list is huge
-            if len(comp_strs) > 50:
-                comp_strs = comp_strs[:50] + ["... ve diğerleri"]
-                
-            component_list_str = "\n".join(comp_strs)
-            prompt_to_use = CONTEXT_AWARE_PROMPT_TEMPLATE.format(component_list_str=component_list_str)
-            print(f"   -> [AI] Hybrid Mode: {len(comp_strs)} beklenen bileşen ile prompt oluşturuldu.")
-
-        response = vision_model.generate_content([prompt_to_use, pil_image])
-
-        raw_text = getattr(response, "text", str(response))
-        json_str = _extract_json_from_response(raw_text)
-
-        if not json_str:
-            print(f"   -> [UYARI] Parça {part_no} boş veri döndü.")
-            return []
-
-        data = json.loads(json_str)
-        if not isinstance(data, list): return []
-
-        valid_data = []
-        for comp in data:
-            if "bounds" in comp:
-                # Koordinatları global konuma oturt
-                comp["bounds"]["y"] += offset_y
-
-                # --- PYTHON TARAFI FİLTRELEME ---
-                # AI bazen prompta uymaz, burada ikinci bir güvenlik kontrolü yapıyoruz.
-                c_type = comp.get("type", "")
-                c_text = comp.get("text_content", "")
-
-                # Eğer tipi Container ise ve metin yoksa -> ÇÖP (Hayalet Kutu)
-                if c_type == "Container" and not c_text:
-                    continue
-
-                    # Eğer sınırları (bounds) 0 veya negatifse -> ÇÖP
-                if comp["bounds"]["w"] <= 0 or comp["bounds"]["h"] <= 0:
-                    continue
-
-                valid_data.append(comp)
-
-        return valid_data
+        prompt_to_use = _slice_prompt(expected_components)
+
+        with tracing.span("gemini.slice", slice=part_no, offset_y=offset_y) as span:
+            response = vision_model.generate_content([prompt_to_use, pil_image])
+            _record_token_usage(span, response)
+
+        return _parse_slice_response(response, offset_y, part_no)
+    except Exception as e:
+        print(f"   -> [HATA] Parça {part_no} analiz hatası: {e}")
+        return []
+
+
+async def _analyze_single_slice_async(pil_image, offset_y, part_no, expected_components=None):
+    """_analyze_single_slice'ın async sürümü (generate_content_async)."""
+    try:
+        print(f"   -> [AI] Parça {part_no} analiz ediliyor (Offset: {offset_y})...")
+        prompt_to_use = _slice_prompt(expected_components)
+
+        with tracing.span("gemini.slice", slice=part_no, offset_y=offset_y) as span:
+            response = await vision_model.generate_content_async([prompt_to_use, pil_image])
+            _record_token_usage(span, response)
+
+        return _parse_slice_response(response, offset_y, part_no)
     except Exception as e:
         print(f"   -> [HATA] Parça {part_no} analiz hatası: {e}")
         return []
 
 
-def analyze_image(image_path: str, expected_components=None):
-    """Ana analiz fonksiyonu. expected_components (Figma Data) varsa Hybrid modda çalışır."""
+def _image_slices(full_img):
+    """Returns: [(dilim görüntüsü, offset_y, parça no)]"""
+    width, total_height = full_img.size
+
+    # Resim kısaysa tek seferde işle
+    if total_height <= SLICE_HEIGHT:
+        print("[AI] Tek parça analiz ediliyor...")
+        return [(full_img, 0, 1)]
+
+    # Resim uzunsa parçala
+    num_slices = math.ceil(total_height / SLICE_HEIGHT)
+    print(f"[AI] Resim {total_height}px yüksekliğinde, {num_slices} parçaya bölünüyor...")
+
+    slices = []
+    for i in range(num_slices):
+        top = i * SLICE_HEIGHT
+        # Deterministic olması için overlap'i şimdilik kapalı tutuyoruz, ama 
+        # temperature 0 ile zaten daha stabil olacak.
+        bottom = min(top + SLICE_HEIGHT, total_height)
+
+        # Son parça çok küçükse atla (Gürültü ve yarım bileşen riski)
+        if (bottom - top) < 50 and i > 0:
+            continue
+
+        slices.append((full_img.crop((0, top, width, bottom)), top, i + 1))
+    return slices
+
+
+def _analysis_error(e):
+    """Analiz hatasını kullanıcıya gösterilecek mesaja çevirir."""
+    # Check for ResourceExhausted (Quota Limit)
+    # Since we might not have the exact class imported, check string
+    error_str = str(e)
+    if "429" in error_str or "ResourceExhausted" in error_str or "Quota exceeded" in error_str:
+        return Exception("Gemini AI Quota Exceeded. Please wait a minute or check your billing.")
+    elif "403" in error_str:
+        return Exception("Gemini API Permission Denied. Check your API Key.")
+    else:
+        return Exception(f"AI Analysis Error: {error_str}")
+
+
+def analyze_image(image_path: str, expected_components=None, debug_dir="."):
+    """
+    Ana analiz fonksiyonu. expected_components (Figma Data) varsa Hybrid modda çalışır.
+    debug_dir: AI debug görselinin (DEBUG_AI_VISION_*) yazılacağı klasör.
+    """
     if not vision_model:
         print("[AI] Model yüklü değil.")
         return None
 
     try:
         full_img = PIL.Image.open(image_path)
-        width, total_height = full_img.size
 
         final_json = []
-
-        # Resim kısaysa tek seferde işle
-        if total_height <= SLICE_HEIGHT:
-            print("[AI] Tek parça analiz ediliyor...")
-            final_json = _analyze_single_slice(full_img, 0, 1, expected_components)
-        else:
-            # Resim uzunsa parçala
-            num_slices = math.ceil(total_height / SLICE_HEIGHT)
-            print(f"[AI] Resim {total_height}px yüksekliğinde, {num_slices} parçaya bölünüyor...")
-
-            for i in range(num_slices):
-                top = i * SLICE_HEIGHT
-                # Son parça değilse, overlap ekle (örn: 100px) ki kesilen bileşenler kaybolmasın
-                # Ancak bu duplicate yaratabilir, şimdilik basit tutalım.
-                # Deterministic olması için overlap'i şimdilik kapalı tutuyoruz, ama 
-                # temperature 0 ile zaten daha stabil olacak.
-                bottom = min(top + SLICE_HEIGHT, total_height)
-
-                # Son parça çok küçükse atla (Gürültü ve yarım bileşen riski)
-                if (bottom - top) < 50 and i > 0:
-                    continue
-
-                slice_img = full_img.crop((0, top, width, bottom))
-                slice_data = _analyze_single_slice(slice_img, top, i + 1, expected_components)
-                final_json.extend(slice_data)
+        for slice_img, top, part_no in _image_slices(full_img):
+            final_json.extend(_analyze_single_slice(slice_img, top, part_no, expected_components))
 
         print(f"[AI] Analiz bitti. Toplam {len(final_json)} bileşen bulundu.")
 
         # Debug görselini kaydet
-        _save_debug_image(image_path, final_json)
-
-        return final_json
+        _save_debug_image(image_path, final_json, debug_dir)
 
         return final_json
 
     except Exception as e:
-        # Check for ResourceExhausted (Quota Limit)
-        # Since we might not have the exact class imported, check string
-        error_str = str(e)
-        if "429" in error_str or "ResourceExhausted" in error_str or "Quota exceeded" in error_str:
-            raise Exception("Gemini AI Quota Exceeded. Please wait a minute or check your billing.")
-        elif "403" in error_str:
-            raise Exception("Gemini API Permission Denied. Check your API Key.")
-        else:
-            raise Exception(f"AI Analysis Error: {error_str}")
+        raise _analysis_error(e)
 
 
-def detect_system_bars(image_path: str):
+async def analyze_image_async(image_path: str, expected_components=None, debug_dir="."):
     """
-    Görüntüdeki Status Bar ve Navigation Bar yüksekliklerini AI ile tespit eder.
+    analyze_image'ın async sürümü: dilimler Gemini'ye eşzamanlı gönderilir
+    (generate_content_async), görsel açma / debug çizimi thread'de yapılır.
     """
     if not vision_model:
-        return {"status_bar_height": 0, "nav_bar_height": 0}
+        print("[AI] Model yüklü değil.")
+        return None
+
+    try:
+        full_img = await asyncio.to_thread(PIL.Image.open, image_path)
+        slices = await asyncio.to_thread(_image_slices, full_img)
+        results = await asyncio.gather(*(
+            _analyze_single_slice_async(slice_img, top, part_no, expected_components)
+            for slice_img, top, part_no in slices
+        ))
+        final_json = [comp for slice_data in results for comp in slice_data]
+
+        print(f"[AI] Analiz bitti. Toplam {len(final_json)} bileşen bulundu.")
 
-    prompt = """
+        await asyncio.to_thread(_save_debug_image, image_path, final_json, debug_dir)
+
+        return final_json
+
+    except Exception as e:
+        raise _analysis_error(e)
+
+
+SYSTEM_BARS_PROMPT = """
     Analyze this mobile UI screenshot.
     Detect the height (in pixels) of the system Status Bar (at the very top) and the system Navigation Bar/Home Indicator (at the very bottom).
     
@@ -317,20 +382,52 @@ def detect_system_bars(image_path: str):
     Do not include any markdown formatting, just the raw JSON.
     """
 
+_NO_SYSTEM_BARS = {"status_bar_height": 0, "nav_bar_height": 0}
+
+
+def _parse_system_bars(response):
+    raw_text = getattr(response, "text", str(response))
+    json_str = _extract_json_from_response(raw_text)
+    if not json_str:
+        return dict(_NO_SYSTEM_BARS)
+    data = json.loads(json_str)
+    return {
+        "status_bar_height": int(data.get("status_bar_height", 0)),
+        "nav_bar_height": int(data.get("nav_bar_height", 0))
+    }
+
+
+def detect_system_bars(image_path: str):
+    """
+    Görüntüdeki Status Bar ve Navigation Bar yüksekliklerini AI ile tespit eder.
+    """
+    if not vision_model:
+        return dict(_NO_SYSTEM_BARS)
+
     try:
         img = PIL.Image.open(image_path)
-        response = vision_model.generate_content([prompt, img])
-        
-        raw_text = getattr(response, "text", str(response))
-        json_str = _extract_json_from_response(raw_text)
-        
-        if json_str:
-            data = json.loads(json_str)
-            return {
-                "status_bar_height": int(data.get("status_bar_height", 0)),
-                "nav_bar_height": int(data.get("nav_bar_height", 0))
-            }
+        with tracing.span("gemini.detect_bars") as span:
+            response = vision_model.generate_content([SYSTEM_BARS_PROMPT, img])
+            _record_token_usage(span, response)
+        return _parse_system_bars(response)
     except Exception as e:
         print(f"[AI] Bar tespiti hatası: {e}")
     
-    return {"status_bar_height": 0, "nav_bar_height": 0}
\ No newline at end of file
+    return dict(_NO_SYSTEM_BARS)
+
+
+async def detect_system_bars_async(image_path: str):
+    """detect_system_bars'ın async sürümü."""
+    if not vision_model:
+        return dict(_NO_SYSTEM_BARS)
+
+    try:
+        img = await asyncio.to_thread(PIL.Image.open, image_path)
+        with tracing.span("gemini.detect_bars") as span:
+            response = await vision_model.generate_content_async([SYSTEM_BARS_PROMPT, img])
+            _record_token_usage(span, response)
+        return _parse_system_bars(response)
+    except Exception as e:
+        print(f"[AI] Bar tespiti hatası: {e}")
+
+    return dict(_NO_SYSTEM_BARS)
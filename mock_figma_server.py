@@ -0,0 +1,321 @@
+# mock_figma_server.py
+"""
+Yerel Figma API taklidi (load / regresyon testi için).
+
+Kaydedilmiş /files/{key}/nodes ve /images/{key} yanıtlarını ve render PNG'lerini sunar.
+Yapılandırılabilir gecikme ve 429 (Retry-After) enjeksiyonu ile FigmaClient'ın throughput,
+cache ve retry davranışı internetsiz ölçülebilir.
+
+Kullanım:
+    # 1) Gerçek API'den fixture kaydet (FIGMA_ACCESS_TOKEN gerekir)
+    python mock_figma_server.py record --file-key KEY --node-ids 1:2 10:5 --out figma_fixtures
+
+    # 2) Sunucuyu başlat
+    python mock_figma_server.py serve --fixtures figma_fixtures --port 8765 --latency-ms 80 --error-rate 0.1
+
+    # 3) Denetimi sunucuya yönlendir
+    FIGMA_API_BASE_URL=http://127.0.0.1:8765/v1 FIGMA_ACCESS_TOKEN=dummy python run_audit.py \\
+        --figma-file-key KEY --figma-node-ids 1:2 10:5 --app-parts app_1.xml app_2.xml
+
+Fixture yapısı:
+    <fixtures>/<file_key>/file.json            {"name", "version", "lastModified", "render_scale"} (opsiyonel)
+    <fixtures>/<file_key>/nodes/<node_id>.json  /nodes yanıtındaki tek node girdisi ({"document": ...})
+    <fixtures>/<file_key>/renders/<node_id>.png render görseli (render_scale ölçeğinde, varsayılan 1x)
+    <fixtures>/<file_key>/renders/<node_id>@<scale>x.png  belirli bir ölçek için kayıt (opsiyonel)
+
+/images isteğindeki 'scale' parametresi gerçek API'deki gibi uygulanır: o ölçekte kayıt yoksa
+render fixture'ı istenen ölçeğe yeniden boyutlandırılarak sunulur.
+
+İstatistikler: GET /__stats  (istek sayıları, enjekte edilen 429'lar)
+"""
+import argparse
+import json
+import os
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+def _safe_name(node_id):
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", node_id)
+
+
+class MockFigmaState:
+    """Sunucu ayarları ve sayaçlar (tüm handler thread'leri paylaşır)."""
+
+    def __init__(self, fixtures_dir, latency_ms=0, jitter_ms=0, error_rate=0.0, retry_after=1, seed=None):
+        self.fixtures_dir = fixtures_dir
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = {"requests": 0, "rate_limited": 0, "nodes": 0, "images": 0, "renders": 0, "files": 0,
+                      "not_found": 0}
+        self._scaled_renders = {}  # (render yolu, ölçek) -> PNG byte'ları
+
+    def count(self, key):
+        with self.lock:
+            self.stats[key] += 1
+
+    def should_rate_limit(self):
+        with self.lock:
+            return self.error_rate > 0 and self.rng.random() < self.error_rate
+
+    def delay(self):
+        with self.lock:
+            ms = self.latency_ms + (self.rng.uniform(0, self.jitter_ms) if self.jitter_ms else 0)
+        if ms > 0:
+            time.sleep(ms / 1000.0)
+
+    def file_dir(self, file_key):
+        return os.path.join(self.fixtures_dir, _safe_name(file_key))
+
+    def file_meta(self, file_key):
+        meta_path = os.path.join(self.file_dir(file_key), "file.json")
+        if os.path.exists(meta_path):
+            with open(meta_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        return {"name": file_key, "version": "mock", "lastModified": "1970-01-01T00:00:00Z"}
+
+    def render_png(self, file_key, name, scale):
+        """
+        Render fixture'ını istenen ölçekte PNG byte'ları olarak döndürür (yoksa None).
+        '<node>@<scale>x.png' kaydı varsa o, yoksa kayıt ölçeğine göre yeniden boyutlandırılmış render.
+        """
+        renders_dir = os.path.join(self.file_dir(file_key), "renders")
+        base, _ = os.path.splitext(name)
+        exact_path = os.path.join(renders_dir, f"{base}@{scale:g}x.png")
+        path = exact_path if os.path.exists(exact_path) else os.path.join(renders_dir, name)
+        if not os.path.exists(path):
+            return None
+        ratio = 1.0 if path == exact_path else scale / float(self.file_meta(file_key).get("render_scale") or 1.0)
+        if abs(ratio - 1.0) < 1e-6:
+            with open(path, "rb") as f:
+                return f.read()
+
+        key = (path, ratio)
+        with self.lock:
+            cached = self._scaled_renders.get(key)
+        if cached is None:
+            import io
+            from PIL import Image
+
+            with Image.open(path) as img:
+                size = (max(1, round(img.width * ratio)), max(1, round(img.height * ratio)))
+                buffer = io.BytesIO()
+                img.resize(size, Image.LANCZOS).save(buffer, format="PNG")
+            cached = buffer.getvalue()
+            with self.lock:
+                self._scaled_renders[key] = cached
+        return cached
+
+
+class MockFigmaHandler(BaseHTTPRequestHandler):
+    server_version = "MockFigma/1.0"
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    @property
+    def state(self):
+        return self.server.state
+
+    def log_message(self, fmt, *args):
+        pass  # İstek başına log'u kapat (benchmark çıktısını boğmasın)
+
+    def _send_json(self, payload, status=200, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_bytes(self, body, content_type):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _not_found(self):
+        self.state.count("not_found")
+        self._send_json({"status": 404, "err": "Not found"}, status=404)
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        query = parse_qs(parsed.query)
+        parts = [p for p in parsed.path.split("/") if p]
+
+        if parts == ["__stats"]:
+            with self.state.lock:
+                return self._send_json(dict(self.state.stats))
+
+        self.state.count("requests")
+        self.state.delay()
+
+        # Render görselleri (S3 taklidi) rate limit'e tabi değil
+        if len(parts) == 3 and parts[0] == "renders":
+            self.state.count("renders")
+            try:
+                scale = float(query.get("scale", ["1"])[0])
+            except ValueError:
+                return self._not_found()
+            body = self.state.render_png(parts[1], parts[2], scale)
+            if body is None:
+                return self._not_found()
+            return self._send_bytes(body, "image/png")
+
+        if self.state.should_rate_limit():
+            self.state.count("rate_limited")
+            return self._send_json({"status": 429, "err": "Rate limit exceeded"}, status=429,
+                                   headers={"Retry-After": str(self.state.retry_after)})
+
+        if len(parts) >= 3 and parts[0] == "v1" and parts[1] == "files":
+            file_key = parts[2]
+            if len(parts) == 4 and parts[3] == "nodes":
+                return self._handle_nodes(file_key, query)
+            if len(parts) == 3:
+                return self._handle_file(file_key)
+        if len(parts) == 3 and parts[0] == "v1" and parts[1] == "images":
+            return self._handle_images(parts[2], query)
+        return self._not_found()
+
+    def _file_meta(self, file_key):
+        meta = self.state.file_meta(file_key)
+        meta.pop("render_scale", None)  # Fixture bilgisi, API yanıtının parçası değil
+        return meta
+
+    def _handle_file(self, file_key):
+        self.state.count("files")
+        if not os.path.isdir(self.state.file_dir(file_key)):
+            return self._not_found()
+        meta = self._file_meta(file_key)
+        meta.setdefault("document", {"id": "0:0", "type": "DOCUMENT", "children": []})
+        return self._send_json(meta)
+
+    def _handle_nodes(self, file_key, query):
+        self.state.count("nodes")
+        if not os.path.isdir(self.state.file_dir(file_key)):
+            return self._not_found()
+        ids = ",".join(query.get("ids", [])).split(",")
+        nodes = {}
+        for node_id in filter(None, ids):
+            path = os.path.join(self.state.file_dir(file_key), "nodes", f"{_safe_name(node_id)}.json")
+            if os.path.exists(path):
+                with open(path, "r", encoding="utf-8") as f:
+                    nodes[node_id] = json.load(f)
+            else:
+                nodes[node_id] = None  # Figma, bulunamayan node'lar için null döner
+        payload = self._file_meta(file_key)
+        payload["nodes"] = nodes
+        return self._send_json(payload)
+
+    def _handle_images(self, file_key, query):
+        self.state.count("images")
+        if not os.path.isdir(self.state.file_dir(file_key)):
+            return self._not_found()
+        ids = ",".join(query.get("ids", [])).split(",")
+        try:
+            scale = float(query.get("scale", ["1"])[0])
+        except ValueError:
+            scale = 0
+        if not 0.01 <= scale <= 4:
+            # Gerçek API de geçersiz ölçekte 400 döner
+            return self._send_json({"status": 400, "err": "Invalid scale"}, status=400)
+        host = self.headers.get("Host") or f"{self.server.server_address[0]}:{self.server.server_address[1]}"
+        images = {}
+        for node_id in filter(None, ids):
+            name = f"{_safe_name(node_id)}.png"
+            if os.path.exists(os.path.join(self.state.file_dir(file_key), "renders", name)):
+                images[node_id] = f"http://{host}/renders/{_safe_name(file_key)}/{name}?scale={scale:g}"
+            else:
+                images[node_id] = None
+        return self._send_json({"err": None, "images": images})
+
+
+def create_server(fixtures_dir, host="127.0.0.1", port=8765, **state_kwargs):
+    """Sunucuyu oluşturur (başlatmaz). port=0 ile boş bir port seçilir; testlerden de kullanılabilir."""
+    server = ThreadingHTTPServer((host, port), MockFigmaHandler)
+    server.daemon_threads = True
+    server.state = MockFigmaState(fixtures_dir, **state_kwargs)
+    return server
+
+
+def record_fixtures(file_key, node_ids, out_dir, scale=1.0):
+    """Gerçek Figma API'sinden node ve render'ları fixture olarak kaydeder."""
+    import figma_client
+
+    client = figma_client.FigmaClient()
+    file_dir = os.path.join(out_dir, _safe_name(file_key))
+    os.makedirs(os.path.join(file_dir, "nodes"), exist_ok=True)
+    os.makedirs(os.path.join(file_dir, "renders"), exist_ok=True)
+
+    # Kayıt için ham (küçültülmemiş) yanıt gerekir
+    url = f"{client.base_url}/files/{file_key}/nodes?ids={','.join(node_ids)}"
+    data = client._make_request(url).json()
+    with open(os.path.join(file_dir, "file.json"), "w", encoding="utf-8") as f:
+        meta = {k: data.get(k) for k in ("name", "version", "lastModified")}
+        meta["render_scale"] = scale
+        json.dump(meta, f, indent=2)
+    for node_id, node_info in (data.get("nodes") or {}).items():
+        if not node_info:
+            print(f"[MockFigma] UYARI: Node {node_id} bulunamadı, atlanıyor.")
+            continue
+        with open(os.path.join(file_dir, "nodes", f"{_safe_name(node_id)}.json"), "w", encoding="utf-8") as f:
+            json.dump(node_info, f)
+
+    for node_id, img_url in client.get_images_batched(file_key, node_ids, scale=scale).items():
+        if img_url:
+            client.download_image(img_url, os.path.join(file_dir, "renders", f"{_safe_name(node_id)}.png"))
+    print(f"[MockFigma] {len(node_ids)} node '{file_dir}' klasörüne kaydedildi.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Yerel Figma API taklidi")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    serve = sub.add_parser("serve", help="Kaydedilmiş fixture'ları sun")
+    serve.add_argument("--fixtures", default="figma_fixtures")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8765)
+    serve.add_argument("--latency-ms", type=float, default=0, help="Her isteğe eklenen sabit gecikme")
+    serve.add_argument("--jitter-ms", type=float, default=0, help="Gecikmeye eklenen rastgele (0..N) ms")
+    serve.add_argument("--error-rate", type=float, default=0.0, help="API isteklerinde 429 döndürme olasılığı (0-1)")
+    serve.add_argument("--retry-after", type=int, default=1, help="429 yanıtlarındaki Retry-After (s)")
+    serve.add_argument("--seed", type=int, default=None)
+
+    record = sub.add_parser("record", help="Gerçek API'den fixture kaydet")
+    record.add_argument("--file-key", required=True)
+    record.add_argument("--node-ids", nargs="+", required=True)
+    record.add_argument("--out", default="figma_fixtures")
+    record.add_argument("--scale", type=float, default=1.0)
+
+    args = parser.parse_args()
+
+    if args.command == "record":
+        record_fixtures(args.file_key, args.node_ids, args.out, scale=args.scale)
+        return
+
+    server = create_server(
+        args.fixtures, host=args.host, port=args.port, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate, retry_after=args.retry_after, seed=args.seed,
+    )
+    host, port = server.server_address
+    print(f"[MockFigma] http://{host}:{port}/v1 adresinde dinleniyor (fixtures: {args.fixtures})")
+    print(f"[MockFigma] FIGMA_API_BASE_URL=http://{host}:{port}/v1 ile kullanın.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -636,7 +636,7 @@ def _generate_component_comparison_tables_html(report_parts):
     return html
 
 
-def create_html_report(results, output_filename="report.html"):
+def create_html_report(results, output_filename="report.html", open_browser=True):
     if not results.get("parts"):
         print("[Rapor] Uyarı: Hiç parça yok, boş bir rapor üretilecek.")
     summary = results.get("summary", {})
@@ -667,8 +667,9 @@ def create_html_report(results, output_filename="report.html"):
         with open(output_filename, "w", encoding="utf-8") as f:
             f.write(html_content)
 
-        filepath = "file://" + os.path.realpath(output_filename)
-        webbrowser.open(filepath, new=2)
+        if open_browser:
+            filepath = "file://" + os.path.realpath(output_filename)
+            webbrowser.open(filepath, new=2)
         print(f"\n[Rapor] Görsel Kontrol Listesi başarıyla '{output_filename}' olarak oluşturuldu.")
     except Exception as e:
         print(f"\n[Rapor] HATA: HTML dashboard yazılırken bir hata oluştu: {e}")
\ No newline at end of file
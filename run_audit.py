@@ -1,16 +1,27 @@
 # run_audit.py
 import sys
 import os
+import collections
 import config
 import adb_client
 import image_analyzer
 import comparator  # <-- Artık V8.0
 import PIL.Image
-from PIL import ImageChops
 import report_generator
 import argparse
+import asyncio
+import concurrent.futures
+import multiprocessing
+import queue
+import threading
+import weakref
 from pprint import pprint
 import figma_client
+import figma_cache
+import stitcher
+import tracing
+import workspace
+import checkpoint
 
 
 
@@ -29,8 +40,10 @@ def _crop_image(input_path, crop_top, crop_bottom, output_path):
         if bottom <= top:
             print(f"[Crop] HATA: Geçersiz crop değerleri: height={height}, top={top}, bottom={bottom}")
             return input_path
-        cropped = img.crop((0, top, width, bottom))
-        cropped.save(output_path)
+        with tracing.span("image.crop", top=crop_top, bottom=crop_bottom) as span:
+            cropped = img.crop((0, top, width, bottom))
+            cropped.save(output_path)
+            span.add(bytes=os.path.getsize(output_path))
         print(f"[Crop] '{input_path}' -> '{output_path}' (top={crop_top}, bottom={crop_bottom})")
         return output_path
     except Exception as e:
@@ -38,30 +51,740 @@ def _crop_image(input_path, crop_top, crop_bottom, output_path):
         return input_path
 
 
-def _images_are_different(img_path_1, img_path_2, diff_threshold=10):
+# Son görülen karelerin hash'leri: her kare (yol veya bellekteki görüntü) bir kez hash'lenir.
+# Görüntü referansı da saklanır ki id() başka bir nesneye tekrar verilmesin.
+_FRAME_HASH_CACHE = collections.OrderedDict()
+_FRAME_HASH_CACHE_SIZE = 8
+
+
+def _frame_hash(img_or_path):
     """
-    İki görüntünün anlamlı şekilde farklı olup olmadığını kontrol eder.
-    Çok basit bir piksel farkı kıyaslaması yapar.
+    Kare için perceptual 'difference hash': gri tonlamalı görüntü (W+1)x(H+1) bloğa ortalanarak
+    küçültülür, yatay ve dikey komşu blokların parlaklık farkının işareti bit olarak alınır
+    (dikey bitler içeriğin kaymasını yakalar). Sonuç 2*W*H bitlik bir int'tir (birkaç KB'lık iş);
+    kareler arası karşılaştırma Hamming mesafesidir.
     """
-    if not img_path_1 or not img_path_2:
+    if isinstance(img_or_path, PIL.Image.Image):
+        key = ("image", id(img_or_path))
+    else:
+        key = ("path", os.path.abspath(img_or_path), os.path.getmtime(img_or_path))
+    cached = _FRAME_HASH_CACHE.get(key)
+    if cached is not None:
+        _FRAME_HASH_CACHE.move_to_end(key)
+        return cached[0]
+
+    width, height = config.SCROLL_HASH_SIZE
+    if isinstance(img_or_path, PIL.Image.Image):
+        thumb = img_or_path.convert("L").resize((width + 1, height + 1), PIL.Image.BOX)
+    else:
+        with PIL.Image.open(img_or_path) as img:
+            img.draft("L", (width * 8, height * 8))  # JPEG ise tam çözünürlükte decode etme
+            thumb = img.convert("L").resize((width + 1, height + 1), PIL.Image.BOX)
+    pixels = thumb.tobytes()
+    stride = width + 1
+    value = 0
+    for y in range(height):
+        row = pixels[y * stride:(y + 1) * stride]
+        below = pixels[(y + 1) * stride:(y + 2) * stride]
+        for x in range(width):
+            value = (value << 2) | ((row[x] > row[x + 1]) << 1) | (row[x] > below[x])
+
+    _FRAME_HASH_CACHE[key] = (value, img_or_path)
+    while len(_FRAME_HASH_CACHE) > _FRAME_HASH_CACHE_SIZE:
+        _FRAME_HASH_CACHE.popitem(last=False)
+    return value
+
+
+def _images_are_different(img_1, img_2, threshold=None):
+    """
+    İki karenin anlamlı şekilde farklı olup olmadığını (scroll gerçekleşti mi) kontrol eder.
+    Perceptual hash'lerin Hamming mesafesi, toplam bitin 'threshold' oranını aşarsa farklı sayılır;
+    böylece status bar saati gibi küçük değişiklikler scroll olarak algılanmaz.
+    Dosya yolu veya bellekteki PIL.Image kabul eder.
+    """
+    if not img_1 or not img_2:
         return True
+    threshold = config.SCROLL_CHANGE_THRESHOLD if threshold is None else threshold
 
     try:
-        img1 = PIL.Image.open(img_path_1).convert("RGB")
-        img2 = PIL.Image.open(img_path_2).convert("RGB")
-        if img1.size != img2.size:
-            return True
-        diff = ImageChops.difference(img1, img2)
-        bbox = diff.getbbox()
-        if bbox:
-            return True
-        else:
-            return False
+        distance = bin(_frame_hash(img_1) ^ _frame_hash(img_2)).count("1")
+        total_bits = 2 * config.SCROLL_HASH_SIZE[0] * config.SCROLL_HASH_SIZE[1]
+        return distance > threshold * total_bits
     except Exception as e:
         print(f"[HATA] Görüntü karşılaştırmada hata: {e}")
         return False
 
 
+def _open_device_session():
+    """
+    Otomatik mod için kalıcı ADB oturumu açar. Açılamazsa adb_client modülünün kendisi
+    döner; modül fonksiyonları aynı imzaya sahip olduğu için çağıran taraf farkı görmez.
+    """
+    session = adb_client.DeviceSession()
+    if session.open():
+        return session
+    print("[ADB] Kalıcı oturum açılamadı, her komut için ayrı adb çağrısı yapılacak.")
+    return adb_client
+
+
+def _capture_app_screenshot(part_index, final_report, device=adb_client, output_dir="."):
+    """
+    ADB ile ekran görüntüsünü belleğe alır, gecikmesini rapora ekler ve sonraki aşamalar
+    için diske yazar.
+    Returns: (dosya yolu, bellekteki PIL.Image) veya (None, None)
+    """
+    with tracing.span("adb.capture", part=part_index) as span:
+        capture = device.capture_screenshot()
+        if not capture:
+            span.set(ok=False)
+            return None, None
+        span.add(bytes=_capture_size(capture))
+    final_report.setdefault("capture_latency_ms", []).append(
+        {"part_index": part_index, "screenshot": round(capture["latency_ms"], 1)}
+    )
+    with tracing.span("image.save", part=part_index):
+        return adb_client.save_screenshot(capture, part_index, output_dir), capture["image"]
+
+
+def _capture_size(capture):
+    """Cihazdan aktarılan byte sayısı (PNG veya ham RGBA framebuffer)."""
+    if capture.get("png"):
+        return len(capture["png"])
+    return capture["image"].width * capture["image"].height * 4
+
+
+def _start_layout_dump(device, previous=None):
+    """Yeni bir arka plan XML dump'ı başlatır; kullanılmamış önceki dump varsa durdurur."""
+    if previous:
+        previous.cancel()
+    return device.start_layout_dump()
+
+
+def _finish_layout_dump(pending_dump, part_index, output_dir="."):
+    """
+    Parçanın dump'ı bitene kadar bekler (sonuç saklanır, analiz aşaması tekrar beklemez).
+    Bir sonraki scroll'dan önce çağrılır; aksi halde dump kaydırılmış ekranı yakalayabilir.
+    """
+    if pending_dump:
+        pending_dump.result(output_dir, filename=f"app_layout_dump_part_{part_index}.xml")
+
+
+def _resolve_layout_dump(pending_dump, part_index, output_dir="."):
+    """
+    Arka planda alınan XML dump'ını bekler. Başarısızsa yerel fallback XML'e bakar.
+    Her parça kendi dosyasına yazılır; paralel karşılaştırma bir önceki parçanın XML'ini okurken
+    üzerine yazılmaz.
+    Returns: XML yolu veya None
+    """
+    xml_path = pending_dump.result(output_dir, filename=f"app_layout_dump_part_{part_index}.xml") if pending_dump else None
+    return xml_path or _local_layout_fallback(output_dir)
+
+
+def _local_layout_fallback(output_dir="."):
+    """XML dump alınamadığında kullanıcının koyduğu yerel XML'i arar. Returns: yol veya None"""
+    # Denetim bu ada yazmaz (dump'lar parça bazında); bulunan dosya kullanıcının koyduğu yedektir
+    fallback_xml = _find_local_fallback("app_layout_dump.xml", output_dir)
+    if fallback_xml:
+        print(f"[Oto-Mod] ADB XML dump başarısız, fakat yerelde '{fallback_xml}' bulundu ve kullanılacak.")
+    else:
+        print("[Oto-Mod] HATA: Ne ADB XML dump ne de yerel fallback XML bulundu. Bu parça için layout analizi yapılamayacak.")
+    return fallback_xml
+
+
+def _find_local_fallback(filename, output_dir="."):
+    """
+    ADB başarısız olduğunda kullanılacak yerel dosyayı önce çalışma klasöründe, sonra
+    bulunulan klasörde arar. Returns: yol veya None
+    """
+    for directory in dict.fromkeys((output_dir, ".")):
+        path = os.path.join(directory, filename)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def _capture_stitched_page(device, first_image, final_report, crop_top, crop_bottom, output_dir="."):
+    """
+    Sayfanın sonuna kadar kaydırıp kareleri tek bir uzun görüntüde birleştirir.
+    Returns: birleştirilmiş görüntünün yolu veya None
+    """
+    page = stitcher.ScrollStitcher(header=crop_top, footer=crop_bottom)
+    page.add(first_image)
+    for scroll_index in range(1, config.STITCH_MAX_SCROLLS + 1):
+        print(f"[Stitch] Kaydırma {scroll_index}/{config.STITCH_MAX_SCROLLS}...")
+        with tracing.span("adb.scroll"):
+            scrolled = device.scroll_down(crop_top, crop_bottom)
+        if not scrolled:
+            break
+        with tracing.span("adb.capture", part=0, scroll=scroll_index) as span:
+            capture = device.capture_screenshot()
+            if capture:
+                span.add(bytes=_capture_size(capture))
+        if not capture:
+            break
+        final_report.setdefault("capture_latency_ms", []).append(
+            {"part_index": 0, "scroll_index": scroll_index, "screenshot": round(capture["latency_ms"], 1)}
+        )
+        added = page.add(capture["image"])
+        if added == 0:
+            print("[Stitch] Sayfa sonuna ulaşıldı.")
+            break
+    else:
+        print(f"[Stitch] UYARI: {config.STITCH_MAX_SCROLLS} kaydırmada sayfa sonu bulunamadı.")
+
+    return _save_stitched_page(page, output_dir)
+
+
+def _save_stitched_page(page, output_dir="."):
+    """Returns: birleştirilmiş görüntünün yolu veya (tek kare varsa) None"""
+    if len(page.frames) < 2:
+        print("[Stitch] Birleştirilecek yeni içerik yok, tek ekran kullanılacak.")
+        return None
+    stitched_path = os.path.join(output_dir, "app_screenshot_stitched.png")
+    image = page.image()
+    image.save(stitched_path, format="PNG", compress_level=1)
+    print(f"[Stitch] {len(page.frames)} kare birleştirildi -> {stitched_path} ({image.width}x{image.height})")
+    return stitched_path
+
+
+def _compare_part(job):
+    """
+    Tek bir parçanın CPU-yoğun karşılaştırma aşaması (XML parse, eşleştirme, testler).
+    Process pool içinde çalışabilmesi için modül seviyesinde tanımlıdır; span'ler ayrı bir
+    tracer'da toplanıp sonuçla ('trace_spans') birlikte döner.
+    """
+    tracer = tracing.Tracer()
+    with tracer.activate(), tracing.span("compare", mode=job["mode"]):
+        if job["mode"] == "ai":
+            result = comparator.compare_layouts_ai(
+                job["figma_data"], job["app_source"], job["figma_width"], job["app_width"],
+                config.DEFAULT_TOLERANCE_PX
+            )
+        else:
+            result = comparator.compare_layouts(
+                job["figma_data"], job["app_source"], job["figma_width"], job["app_width"],
+                config.DEFAULT_TOLERANCE_PX
+            )
+    result["trace_spans"] = tracer.spans
+    return result
+
+
+def _create_compare_executor(num_parts):
+    """
+    Çok parçalı denetimlerde karşılaştırmalar için process pool oluşturur.
+    Tek parça varsa veya COMPARE_WORKERS=1 ise None döner (seri yol).
+    Worker'lar forkserver / spawn ile başlar: run_audit_process'i çağıran script
+    'if __name__ == "__main__":' korumasına sahip olmalıdır.
+    """
+    workers = config.COMPARE_WORKERS or (os.cpu_count() or 1)
+    workers = min(workers, num_parts)
+    if workers <= 1:
+        return None
+    print(f"[Paralel] Karşılaştırmalar {workers} process ile yapılacak.")
+    # Havuz, pipeline thread'leri (indirme, analiz, toplama; server'da uvicorn) çalışırken ilk
+    # submit'te açılır. 'fork' ile başka bir thread'in tuttuğu kilit (örn. stdout) child'da
+    # kilitli kalır ve ilk print'te deadlock olur; bu yüzden fork yerine forkserver / spawn.
+    start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return concurrent.futures.ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context(start_method)
+    )
+
+
+def _submit_comparison(executor, job):
+    """Karşılaştırmayı havuza gönderir; havuz yoksa hemen çalıştırıp tamamlanmış Future döner."""
+    if executor:
+        return executor.submit(_compare_part, job)
+    return _completed_future(_compare_part(job))
+
+
+def _completed_future(value):
+    """Hazır bir değeri, bekleyen işlerle aynı arayüzde (Future) sunar."""
+    future = concurrent.futures.Future()
+    future.set_result(value)
+    return future
+
+
+def _add_part_to_report(final_report, pending, results_part):
+    """Parça sonucunu ana rapora ekler ve global özeti günceller."""
+    final_report["parts"].append({
+        "part_index": pending["part_index"],
+        "image_pair": {
+            "figma": pending["figma_path"],
+            "app": pending["app_path"]  # Kırpılmış SS'i rapora yolla
+        },
+        "figma_spec": pending["figma_spec"],
+        "comparison_results": results_part
+    })
+
+    part_summary = results_part.get("summary", {})
+    final_report["summary"]["error_count"] += part_summary.get("error_count", 0)
+    final_report["summary"]["audit_count"] += part_summary.get("audit_count", 0)
+    final_report["summary"]["layout_success_count"] += part_summary.get("layout_success_count", 0)
+    final_report["summary"]["style_success_count"] += part_summary.get("style_success_count", 0)
+    final_report["summary"]["warning_count"] += part_summary.get("warning_count", 0)
+    final_report["summary"]["total_matched"] += part_summary.get("total_matched", 0)
+
+    if pending["loop_index"] == 0:
+        final_report["scale_factor"] = results_part.get("scale_factor", 0.0)
+
+
+
+def _find_report_image(app_part_path):
+    """
+    Manuel moddaki App parçası için rapor/analizde kullanılacak görseli bulur.
+    Parça zaten bir resimse kendisi, değilse (örn XML) aynı isimli .png/.jpg/.jpeg döner.
+    """
+    if app_part_path.lower().endswith(('.png', '.jpg', '.jpeg')):
+        return app_part_path
+    base_path = os.path.splitext(app_part_path)[0]
+    for ext in ['.png', '.jpg', '.jpeg']:
+        potential_path = base_path + ext
+        if os.path.exists(potential_path):
+            return potential_path
+    return None
+
+
+def _choose_figma_render_scale(frame, target_width=None, density=None):
+    """
+    Figma render ölçeğini App ekranına göre seçer; böylece Figma görseli doğrudan
+    App çözünürlüğünde gelir ve sonradan yeniden boyutlandırma gerekmez.
+    - App ekran görüntüsü genişliği biliniyorsa: app_width / frame_width
+    - Değilse cihaz yoğunluğundan: density / 160 (Figma frame'leri dp cinsinden kabul edilir)
+    - Hiçbiri yoksa 1.0
+    """
+    scale = 1.0
+    if frame and target_width:
+        scale = target_width / float(frame["w"])
+    elif density:
+        scale = density / 160.0
+    # Figma /images endpoint'i 0.01 - 4 aralığını kabul eder
+    return round(min(max(scale, 0.01), 4.0), 3)
+
+
+def _scale_components(components, scale):
+    """Figma birimindeki bileşen bounds'larını render piksel uzayına taşır (kopya üzerinde)."""
+    if scale == 1.0:
+        return components
+    scaled = []
+    for comp in components:
+        new_comp = comp.copy()
+        b = comp["bounds"]
+        new_comp["bounds"] = {"x": b["x"] * scale, "y": b["y"] * scale, "w": b["w"] * scale, "h": b["h"] * scale}
+        scaled.append(new_comp)
+    return scaled
+
+
+def _detect_app_render_target(run_mode, app_parts, base_ss_path, device=adb_client):
+    """
+    Figma render ölçeği için App ekranının genişliğini (px) ve gerekirse cihaz yoğunluğunu bulur.
+    Returns: (target_width veya None, density veya None)
+    """
+    image_path = base_ss_path if run_mode == "auto" else _find_report_image(app_parts[0])
+    if image_path and os.path.exists(image_path):
+        try:
+            with PIL.Image.open(image_path) as img:
+                return img.width, None
+        except Exception as e:
+            print(f"[Figma API] App görsel genişliği okunamadı: {e}")
+    if run_mode == "auto":
+        if isinstance(device, (adb_client.DeviceSession, adb_client.AsyncDeviceSession)):
+            return None, device.density
+        return None, adb_client.get_screen_density()
+    return None, None
+
+
+def _part_widths(figma_path, app_path):
+    """Returns: (figma_width, app_width) veya okunamazsa None"""
+    try:
+        with PIL.Image.open(figma_path) as img:
+            figma_width = img.width
+        # App genişliğini XML'den (root node) veya SS'ten almamız lazım
+        # Şimdilik SS'ten alalım
+        with PIL.Image.open(app_path) as img:
+            app_width = img.width
+    except Exception as e:
+        print(f"HATA: Kırpılmış görüntü boyutları okunurken hata: {e}. Parça atlanıyor.")
+        return None
+    return figma_width, app_width
+
+
+def _save_debug_json(figma_data_json, app_data_json, part_index, output_dir="."):
+    # --- DEBUG: JSON'ları kaydet ---
+    import json
+    with open(os.path.join(output_dir, f"debug_figma_part_{part_index}.json"), "w") as f:
+        json.dump(figma_data_json, f, indent=2)
+    with open(os.path.join(output_dir, f"debug_app_part_{part_index}.json"), "w") as f:
+        json.dump(app_data_json, f, indent=2)
+    print(f"[Debug] JSON verileri 'debug_figma_part_{part_index}.json' ve 'debug_app_part_{part_index}.json' dosyalarına kaydedildi.")
+
+
+def _analyze_part(part, app_analysis_mode, using_figma_api, output_dir="."):
+    """
+    Pipeline'ın analiz aşaması: Figma/App AI analizleri ve (gerekirse) XML dump'ının beklenmesi.
+    Returns: karşılaştırma işi (dict) veya parça atlanacaksa None
+    """
+    part_index = part["part_index"]
+    figma_cropped_path = part["figma_path"]
+    app_cropped_path_for_report = part["app_path"]
+    figma_data_json = part["figma_data"]
+    app_xml_path_for_analysis = part["app_xml_path"]
+    pending_dump = part["pending_dump"]
+
+    try:
+        # 3. Adım: AI Analizi (SADECE FIGMA - Eğer API kullanılmıyorsa)
+        if not using_figma_api:
+            figma_data_json = image_analyzer.analyze_image(figma_cropped_path, debug_dir=output_dir)
+
+            if not figma_data_json:
+                print("HATA: AI Figma analizi başarısız. Bu parça atlanıyor.")
+                return None
+            part["figma_data"] = figma_data_json
+        else:
+            print(f"[Figma API] {len(figma_data_json)} bileşen (Ground Truth) kullanılıyor.")
+
+        # 4. Adım: En-boy oranlarına göre scale factor hesapla
+        widths = _part_widths(figma_cropped_path, app_cropped_path_for_report)
+        if widths is None:
+            return None
+        figma_width, app_width = widths
+
+        if app_analysis_mode == "ai":
+            # --- HYBRID MODE LOGIC ---
+            expected_components_for_ai = None
+            if using_figma_api and figma_data_json:
+                 expected_components_for_ai = figma_data_json
+                 print(f"   [INFO] Hybrid Mode: {len(figma_data_json)} Figma bileşeni AI'ya rehberlik edecek.")
+
+            app_data_json = image_analyzer.analyze_image(
+                app_cropped_path_for_report, expected_components=expected_components_for_ai, debug_dir=output_dir
+            )
+
+            if pending_dump:
+                app_xml_path_for_analysis = _resolve_layout_dump(pending_dump, part_index, output_dir)
+                pending_dump = None
+                if not app_xml_path_for_analysis:
+                    print("HATA: Gerekli App XML verisi yok. Bu parça atlanıyor.")
+                    return None
+
+            if not app_data_json:
+                print("UYARI: AI App analizi başarısız, XML moduna düşülüyor.")
+                if not app_xml_path_for_analysis:
+                    print("HATA: Ne App SS ne de XML mevcut, bu parça atlanıyor.")
+                    return None
+
+                # Fallback to XML comparison
+                compare_job = {"mode": "xml", "app_source": app_xml_path_for_analysis}
+            else:
+                _save_debug_json(figma_data_json, app_data_json, part_index, output_dir)
+                compare_job = {"mode": "ai", "app_source": app_data_json}
+        else:
+            if pending_dump:
+                app_xml_path_for_analysis = _resolve_layout_dump(pending_dump, part_index, output_dir)
+                pending_dump = None
+                if not app_xml_path_for_analysis:
+                    print("HATA: Gerekli App XML verisi yok. Bu parça atlanıyor.")
+                    return None
+            print(f"[Debug] XML Modu: compare_layouts çağrılıyor... XML: {app_xml_path_for_analysis}")
+            compare_job = {"mode": "xml", "app_source": app_xml_path_for_analysis}
+    finally:
+        if pending_dump:
+            pending_dump.cancel()
+
+    compare_job.update(figma_data=figma_data_json, figma_width=figma_width, app_width=app_width)
+    return compare_job
+
+
+def _pending_part(part, compare_job, result):
+    """Karşılaştırması başlamış parça; result sonucun Future'ı (veya task'ı)."""
+    return {
+        "loop_index": part["loop_index"],
+        "part_index": part["part_index"],
+        "figma_path": part["figma_path"],
+        "app_path": part["app_path"],
+        "figma_spec": part["figma_data"],
+        "mode": compare_job["mode"],
+        "item": part.get("item"),
+        "crops": part.get("crops"),
+        "result": result,
+    }
+
+
+class _PartPipeline:
+    """
+    Parçaları aşamalı işler; ağ (Figma, Gemini) ve cihaz aşamaları üst üste biner:
+
+        toplama (Figma görseli + App capture + kırpma, ana thread, sıralı)
+          -> [sınırlı kuyruk] -> analiz (AI çağrıları, PIPELINE_ANALYSIS_WORKERS thread)
+          -> karşılaştırma (compare executor) -> [sınırlı kuyruk] -> sonuç toplama (thread)
+
+    Kuyruklar sınırlı olduğu için toplama aşaması analizden en fazla PIPELINE_QUEUE_SIZE parça
+    öndedir. Bir aşamada hata olursa pipeline durur ve hata ana thread'de tekrar fırlatılır;
+    analizi başlamamış parçalar atlanır, fakat karşılaştırması başlamış parçaların sonuçları
+    yine toplanır (on_result / checkpoint), böylece devam ederken tekrar işlenmezler.
+    close() sonuçları parça sırasıyla döndürür, böylece rapor seri çalışmayla aynıdır.
+    on_result(pending, results_part) her parça tamamlandığında (toplama thread'inde) çağrılır.
+    """
+
+    def __init__(self, analyze, compare_executor, workers=None, queue_size=None, on_result=None):
+        self._analyze = analyze
+        self._compare_executor = compare_executor
+        self._on_result = on_result
+        self._analysis_queue = queue.Queue(maxsize=queue_size or config.PIPELINE_QUEUE_SIZE)
+        self._compare_queue = queue.Queue(maxsize=queue_size or config.PIPELINE_QUEUE_SIZE)
+        self._stop = threading.Event()
+        self._error = None
+        self._closed = False
+        self._results = []
+        self._workers = [
+            threading.Thread(target=tracing.bind(self._analysis_worker), name=f"audit-analysis-{n}", daemon=True)
+            for n in range(max(1, workers or config.PIPELINE_ANALYSIS_WORKERS))
+        ]
+        self._collector = threading.Thread(target=tracing.bind(self._collect_worker), name="audit-collect",
+                                           daemon=True)
+        for thread in self._workers + [self._collector]:
+            thread.start()
+
+    def _fail(self, error):
+        if self._error is None:
+            self._error = error
+        self._stop.set()
+
+    def _raise_if_failed(self):
+        if self._error is not None:
+            raise self._error
+
+    def _put(self, q, item):
+        # Pipeline durduysa (hata) bloklanmadan vazgeç
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    @staticmethod
+    def _discard(part):
+        if part.get("pending_dump"):
+            part["pending_dump"].cancel()
+
+    def submit(self, part):
+        """Toplanan parçayı analiz kuyruğuna ekler (kuyruk doluysa bekler)."""
+        self._raise_if_failed()
+        if not self._put(self._analysis_queue, part):
+            self._discard(part)
+            self._raise_if_failed()
+
+    def _analysis_worker(self):
+        while True:
+            part = self._analysis_queue.get()
+            if part is None:
+                return
+            if self._stop.is_set():
+                self._discard(part)
+                continue
+            try:
+                with tracing.span("part.analyze", part=part["part_index"]):
+                    compare_job = self._analyze(part)
+                if compare_job is None:
+                    continue
+                # 5. Adım: Karşılaştırmayı başlat (paralel modda arka planda çalışır)
+                pending = _pending_part(part, compare_job, _submit_comparison(self._compare_executor, compare_job))
+            except BaseException as e:
+                self._fail(e)
+                continue
+            # Hata sonrasında da bırakılmaz: toplama thread'i kuyruğu None gelene kadar boşaltır
+            self._compare_queue.put(pending)
+
+    def _collect_worker(self):
+        while True:
+            pending = self._compare_queue.get()
+            if pending is None:
+                return
+            # Pipeline durmuş olsa da (başka parçada hata) biten karşılaştırmalar checkpoint'e yazılır
+            try:
+                with tracing.span("part.wait_compare", part=pending["part_index"]):
+                    results_part = pending["result"].result()
+                # Karşılaştırma process pool'da çalıştıysa span'leri sonuçla birlikte döner
+                tracing.merge(results_part.pop("trace_spans", None))
+                self._results.append((pending, results_part))
+                if self._on_result:
+                    self._on_result(pending, results_part)
+            except BaseException as e:
+                self._fail(e)
+
+    def add_result(self, pending, results_part):
+        """Önceden tamamlanmış (checkpoint'ten gelen) parçayı sonuçlara ekler."""
+        self._results.append((pending, results_part))
+
+    def close(self, abort=False):
+        """
+        Tüm parçaların bitmesini bekler. abort=True ise bekleyen işler atlanır.
+        Returns: [(pending, results_part), ...] parça sırasıyla
+        """
+        if self._closed:
+            return []
+        self._closed = True
+        if abort:
+            self._stop.set()
+        for _ in self._workers:
+            self._analysis_queue.put(None)
+        for thread in self._workers:
+            thread.join()
+        self._compare_queue.put(None)
+        self._collector.join()
+        if not abort:
+            self._raise_if_failed()
+        return sorted(self._results, key=lambda r: r[0]["loop_index"])
+
+
+def _checkpoint_record(pending, results_part):
+    """Checkpoint'e yazılacak parça kaydı (rapora eklemek için gereken her şey)."""
+    record = {key: value for key, value in pending.items() if key != "result"}
+    record["results"] = results_part
+    return record
+
+
+def _restorable(completed_parts, loop_index, item):
+    """Parça checkpoint'te var mı ve aynı Figma kaynağına (node / PNG) mı ait?"""
+    record = completed_parts.get(loop_index)
+    return bool(record) and record.get("item") == item
+
+
+def _restore_part(pipeline, record):
+    """Checkpoint'teki parçayı, tekrar işlemeden sonuçlara ekler."""
+    pending = {key: value for key, value in record.items() if key != "results"}
+    pipeline.add_result(pending, record["results"])
+
+
+def _download_render_to_cache(client, cache, url, cache_path, workspace_path):
+    """Render'ı cache'e indirir ve çalışma klasörüne bağlar. Returns: çalışma klasöründeki yol veya None"""
+    path = client.download_image(url, cache_path)
+    if not path:
+        return None
+    cache.note_written(path)
+    return cache.link_into(path, workspace_path)
+
+
+def _prefetch_figma_parts(client, file_key, node_ids, target_width=None, density=None, output_dir="."):
+    """
+    Tüm node dokümanlarını ve render URL'lerini döngüden önce, mümkün olan en az
+    toplu istekle çeker; referans görsellerin indirilmesini eşzamanlı olarak başlatır.
+    Disk cache açıksa önce dosya versiyonu kontrol edilir ve cache'te olan node'lar /
+    render'lar hiç istenmez.
+    Render ölçeği App ekranına göre seçilir (bkz. _choose_figma_render_scale); bileşen
+    bounds'ları da aynı ölçekle render piksel uzayına çevrilir.
+    """
+    print(f"[Figma API] {len(node_ids)} node için veri ve görseller toplu çekiliyor...")
+
+    version = None
+    if config.FIGMA_CACHE_ENABLED:
+        try:
+            version = client.get_file_version(file_key)
+        except Exception as e:
+            print(f"[FigmaCache] Versiyon kontrolü başarısız, cache kullanılmayacak: {e}")
+    cache = figma_cache.FigmaCache() if version else None
+
+    # 1. Node verileri (parse edilmiş bileşenler + root frame boyutu, Figma biriminde)
+    nodes = _cached_nodes(cache, file_key, version, node_ids)
+    missing_nodes = [node_id for node_id in node_ids if node_id not in nodes]
+    if missing_nodes:
+        node_data = client.get_file_nodes_batched(file_key, missing_nodes) or {}
+        _store_fetched_nodes(client, cache, file_key, version, node_data, nodes)
+
+    # 2. Render ölçeği (node başına) ve ölçeklenmiş bileşenler
+    components, scales = _scaled_components(nodes, target_width, density)
+
+    # 3. Referans görseller
+    executor, futures = client.start_downloads({})
+    workspace_paths, cached_paths, missing_by_scale = _split_cached_renders(
+        cache, file_key, version, node_ids, scales, output_dir
+    )
+    for node_id, path in cached_paths.items():
+        futures[node_id] = _completed_future(path)
+
+    # /images tek istekte tek ölçek kabul eder; aynı ölçekteki node'lar birlikte istenir
+    for scale, scale_node_ids in missing_by_scale.items():
+        image_urls = client.get_images_batched(file_key, scale_node_ids, scale=scale)
+        for node_id, img_url in image_urls.items():
+            if not img_url:
+                continue
+            if cache:
+                cache_path = cache.prepare_render_path(file_key, version, node_id, scale)
+                futures[node_id] = executor.submit(
+                    tracing.bind(_download_render_to_cache), client, cache, img_url, cache_path, workspace_paths[node_id]
+                )
+            else:
+                futures[node_id] = executor.submit(tracing.bind(client.download_image), img_url, workspace_paths[node_id])
+
+    _log_prefetch(cache, version, node_ids, missing_nodes, missing_by_scale, components, futures)
+    return {"components": components, "scales": scales, "downloads": futures, "executor": executor, "cache": cache}
+
+
+def _cached_nodes(cache, file_key, version, node_ids):
+    nodes = {}
+    if cache:
+        for node_id in node_ids:
+            cached = cache.get_node(file_key, version, node_id)
+            if cached is not None:
+                nodes[node_id] = cached
+    return nodes
+
+
+def _store_fetched_nodes(client, cache, file_key, version, node_data, nodes):
+    """Toplu /nodes yanıtını node başına ayrıştırıp 'nodes'a (ve cache'e) ekler."""
+    for node_id, node_info in (node_data.get("nodes") or {}).items():
+        if not node_info:
+            continue
+        single = {"nodes": {node_id: node_info}}
+        nodes[node_id] = {
+            "frame": client.get_frame_size(single, node_id),
+            "components": client.parse_figma_response(single),
+        }
+        if cache:
+            cache.put_node(file_key, version, node_id, nodes[node_id]["components"], nodes[node_id]["frame"])
+
+
+def _scaled_components(nodes, target_width=None, density=None):
+    """Returns: ({node_id: ölçeklenmiş bileşenler}, {node_id: render ölçeği})"""
+    scales = {}
+    components = {}
+    for node_id, entry in nodes.items():
+        scales[node_id] = _choose_figma_render_scale(entry.get("frame"), target_width, density)
+        components[node_id] = _scale_components(entry["components"], scales[node_id])
+    if scales:
+        print(f"[Figma API] Render ölçeği: {sorted(set(scales.values()))} (App genişliği: {target_width}, yoğunluk: {density})")
+    return components, scales
+
+
+def _split_cached_renders(cache, file_key, version, node_ids, scales, output_dir="."):
+    """
+    Render'ları cache'te olanlar ve indirilecekler (ölçeğe göre gruplu) diye ayırır.
+    Returns: (workspace_paths, {node_id: cache'ten bağlanan yol}, {scale: [node_id, ...]})
+    """
+    # Denetim render'ın cache'teki dosyasını değil, çalışma klasörüne bağlanmış kopyasını kullanır;
+    # eş zamanlı başka bir denetimin evict()'i kullanılan görseli silemez
+    workspace_paths = {node_id: os.path.join(output_dir, f"figma_api_node_{node_id.replace(':', '_')}.png")
+                       for node_id in node_ids}
+    cached_paths = {}
+    missing_by_scale = {}
+    for node_id in dict.fromkeys(node_ids):
+        scale = scales.get(node_id, 1.0)
+        cached_path = cache.get_render(file_key, version, node_id, scale) if cache else None
+        if cached_path:
+            cached_paths[node_id] = cache.link_into(cached_path, workspace_paths[node_id])
+        else:
+            missing_by_scale.setdefault(scale, []).append(node_id)
+    return workspace_paths, cached_paths, missing_by_scale
+
+
+def _log_prefetch(cache, version, node_ids, missing_nodes, missing_by_scale, components, downloads):
+    if cache:
+        missing_render_count = sum(len(ids) for ids in missing_by_scale.values())
+        print(f"[FigmaCache] Versiyon {version}: {len(node_ids) - len(missing_nodes)} node ve "
+              f"{len(node_ids) - missing_render_count} render cache'ten kullanıldı.")
+    print(f"[Figma API] {len(components)} node verisi hazır, {len(downloads)} görsel hazırlanıyor.")
+
 
 def run_audit_process(
     figma_parts=None,
@@ -72,327 +795,1039 @@ def run_audit_process(
     app_crop_top=0,
     app_crop_bottom=0,
     figma_file_key=None,
-    figma_node_ids=None
+    figma_node_ids=None,
+    device=None,
+    output_dir=None,
+    stitch_app_page=False,
+    tracer=None,
+    trace_file=None,
+    resume=False
 ):
-
     """
     Core audit logic extracted for external use (e.g., Web GUI).
+
+    device: Otomatik modda kullanılacak, önceden açılmış adb_client.DeviceSession (örn. device_pool'dan).
+            Verilmezse varsayılan cihaza yeni bir oturum açılır (ve sonunda kapatılır).
+    output_dir: ADB ekran görüntüleri, XML dump'ları, kırpılmış görseller ve debug dosyalarının
+            yazılacağı klasör. Verilmezse bu çalışma için yeni bir workspace açılır (bkz. workspace.py).
+    stitch_app_page: Otomatik + AI modunda sayfa sonuna kadar kaydırıp App tarafını tek uzun
+            görüntü olarak (tek Figma parçasına karşı) denetler.
+    tracer: Aşama span'lerinin yazılacağı tracing.Tracer (verilmezse yeni oluşturulur).
+            Özet ve span'ler raporun 'trace' alanına eklenir.
+    trace_file: Span'lerin Chrome trace formatında yazılacağı dosya (output_dir'e göre).
+            None ise config.TRACE_FILE kullanılır; "" ise yazılmaz.
+    resume: Tamamlanan parçalar output_dir'deki checkpoint'e yazılır (bkz. checkpoint.py).
+            True ise ve output_dir yarıda kalmış aynı denetimin klasörüyse, bitmiş parçalar
+            tekrar işlenmez.
     """
-    # Run Mode belirle
-    if app_parts:
-        run_mode = "manual"
-        print("[Mod] 'Manuel Mod' aktif. Sağlanan App dosyaları kullanılacak.")
-    else:
-        run_mode = "auto"
-        print("[Mod] 'Otomatik Mod' (ADB) aktif. ADB başarısız olursa yerel dosyalara bakılacak.")
+    ws, output_dir = _open_workspace(output_dir, resume)
+    tracer = tracer or tracing.Tracer()
+    try:
+        with tracer.activate(), tracing.span("audit"):
+            final_report = _run_audit_process(
+                figma_parts, app_parts, app_analysis_mode, figma_crop_top, figma_crop_bottom,
+                app_crop_top, app_crop_bottom, figma_file_key, figma_node_ids, device, output_dir,
+                stitch_app_page, resume
+            )
+    finally:
+        if ws:
+            ws.release()
+    return _finish_report(final_report, output_dir, tracer, trace_file)
+
+
+def _open_workspace(output_dir, resume=False):
+    """Returns: (workspace veya None, output_dir) - output_dir verilmezse yeni workspace açılır."""
+    if output_dir is not None:
+        return None, output_dir
+    if resume:
+        print("[Checkpoint] UYARI: Devam etmek için önceki çalışmanın output_dir'i gerekli, baştan başlanıyor.")
+    ws = workspace.create()
+    return ws, ws.dir
+
+
+def _finish_report(final_report, output_dir, tracer, trace_file=None):
+    final_report["output_dir"] = output_dir
+    final_report["trace"] = tracer.to_dict()
+    if trace_file is None:
+        trace_file = config.TRACE_FILE
+    if trace_file:
+        tracer.export(os.path.join(output_dir, trace_file))
+    return final_report
 
-    final_report = {
-        "summary": {"error_count": 0, "layout_success_count": 0, "style_success_count": 0, "warning_count": 0,
-                    "audit_count": 0, "total_matched": 0},
-        "parts": [],
-        "all_warnings": []
-    }
+
+def _run_audit_process(
+    figma_parts=None,
+    app_parts=None,
+    app_analysis_mode=config.APP_ANALYSIS_MODE,
+    figma_crop_top=0,
+    figma_crop_bottom=0,
+    app_crop_top=0,
+    app_crop_bottom=0,
+    figma_file_key=None,
+    figma_node_ids=None,
+    device=None,
+    output_dir=".",
+    stitch_app_page=False,
+    resume=False
+):
+    """run_audit_process'in gövdesi (aktif tracer altında çalışır)."""
+    run_mode = _run_mode(app_parts)
+    final_report = _new_final_report()
 
     # --- FIGMA SOURCE DETERMINATION ---
-    using_figma_api = False
-    figma_client_instance = None
-    
-    if figma_file_key and figma_node_ids:
-        using_figma_api = True
-        figma_client_instance = figma_client.FigmaClient()
-        num_parts = len(figma_node_ids)
-        print(f"[Mod] Figma API Modu aktif. {num_parts} parça (Node ID) işlenecek.")
-    elif figma_parts:
-        num_parts = len(figma_parts)
-        print(f"[Mod] Figma PNG Modu aktif. {num_parts} parça (PNG) işlenecek.")
-    else:
-        print("HATA: Ne Figma PNG'leri ne de Figma API bilgileri sağlandı.")
+    using_figma_api, loop_range = _figma_source(figma_file_key, figma_node_ids, figma_parts)
+    if loop_range is None:
         return final_report
+    figma_client_instance = figma_client.FigmaClient() if using_figma_api else None
 
-    last_successful_ss_path = None  # Sadece 'scroll'u algılamak için
+    last_successful_ss_path = None
+    last_successful_ss_image = None  # Sadece 'scroll'u algılamak için (bellekte, diskten tekrar okunmaz)
+    pending_dump = None  # Arka planda süren UIAutomator dump'ı (adb_client.LayoutDump)
+    owns_device = device is None  # Dışarıdan verilen oturumu (cihaz havuzu) kapatmak bize düşmez
+    device = device or adb_client
+    os.makedirs(output_dir, exist_ok=True)
 
     if run_mode == "auto":
+        # Tüm parçalar boyunca tek bir 'adb shell' oturumu kullan (komut başına process başlatma yok)
+        if owns_device:
+            device = _open_device_session()
         print("\n[Oto-Mod] Başlangıç ekran görüntüsü (Base) alınıyor...")
-        last_successful_ss_path = adb_client.take_screenshot(0)
+        # XML dump (2-3 sn) ekran görüntüsüyle aynı anda başlar; sonucu ihtiyaç anında beklenir
+        pending_dump = _start_layout_dump(device)
+        last_successful_ss_path, last_successful_ss_image = _capture_app_screenshot(0, final_report, device, output_dir)
         if not last_successful_ss_path:
             # Fallback (Yedek) mantığı: PNG'yi yerelden ara
-            fallback_path = "app_screenshot_part_0.png"
-            if os.path.exists(fallback_path):
+            fallback_path = _find_local_fallback("app_screenshot_part_0.png", output_dir)
+            if fallback_path:
                 print(f"[Oto-Mod] ADB başarısız oldu, fakat yerelde '{fallback_path}' bulundu ve kullanılacak.")
                 last_successful_ss_path = fallback_path
             else:
                 print("[Oto-Mod] HATA: Ne ADB ne de yerel fallback ekran görüntüsü alınabildi.")
                 # Return empty report with error
                 final_report["error"] = "ADB ve yerel ekran görüntüsü alınamadı."
+                pending_dump.cancel()
+                if owns_device and device is not adb_client:
+                    device.close()
                 return final_report
 
-    # Loop range depends on source
-    loop_range = figma_node_ids if using_figma_api else figma_parts
-    
-    for i, item in enumerate(loop_range):
-        part_index = i
-        print(f"\n--- Parça {part_index} işleniyor ---")
+    stitch_app_page = _stitch_enabled(stitch_app_page, run_mode, loop_range, app_analysis_mode, last_successful_ss_image)
+
+    part_checkpoint = _audit_checkpoint(
+        output_dir, figma_parts, app_parts, app_analysis_mode, figma_crop_top, figma_crop_bottom,
+        app_crop_top, app_crop_bottom, figma_file_key, figma_node_ids, stitch_app_page
+    )
+    completed_parts = part_checkpoint.start(resume)
+    if completed_parts:
+        final_report["resumed_parts"] = sorted(completed_parts)
+
+    compare_executor = _create_compare_executor(len(loop_range) - len(completed_parts))
+    pipeline = _PartPipeline(
+        lambda part: _analyze_part(part, app_analysis_mode, using_figma_api, output_dir),
+        compare_executor,
+        on_result=lambda pending, results_part: part_checkpoint.save(
+            _checkpoint_record(pending, results_part)
+        ),
+    )
+    figma_prefetch = None
+    previous_dump = (None, None)
+    # Elle verilen Figma kırpmaları 1x tasarım pikselidir; API modunda render ölçeğiyle çarpılır.
+    # Oto-crop (-1) render görselinden tespit edildiği için zaten render pikselindedir.
+    figma_crop_is_design_px = (figma_crop_top != -1, figma_crop_bottom != -1)
+
+    try:
+        pending_node_ids = [node_id for i, node_id in enumerate(figma_node_ids or [])
+                            if not _restorable(completed_parts, i, node_id)]
+        if using_figma_api and pending_node_ids:
+            # Figma'yı doğrudan App çözünürlüğünde render etmek için hedef genişliği belirle
+            target_width, density = _detect_app_render_target(run_mode, app_parts, last_successful_ss_path, device)
+            with tracing.span("figma.prefetch", nodes=len(pending_node_ids)):
+                figma_prefetch = _prefetch_figma_parts(
+                    figma_client_instance, figma_file_key, pending_node_ids,
+                    target_width=target_width, density=density, output_dir=output_dir
+                )
+
+        for i, item in enumerate(loop_range):
+            part_index = i
+            print(f"\n--- Parça {part_index} işleniyor ---")
         
-        figma_part_path = None
-        figma_data_json = None
+            figma_part_path = None
+            figma_data_json = None
+            figma_render_scale = 1.0
+            restored = completed_parts.get(i) if _restorable(completed_parts, i, item) else None
         
-        if using_figma_api:
-            node_id = item
-            print(f"[Figma API] Node {node_id} verisi çekiliyor...")
+            if restored:
+                # Figma verisi ve görseli checkpoint'te; indirme / AI analizi gerekmez
+                print("[Checkpoint] Parça daha önce tamamlanmış, sonuç checkpoint'ten alınacak.")
+            elif using_figma_api:
+                node_id = item
+                print(f"[Figma API] Node {node_id} verisi (ön-yüklemeden) alınıyor...")
             
-            # 1. Get Metadata (Ground Truth)
-            # We fetch ALL nodes at once usually, but here we do per-part for simplicity in loop
-            # Optimization: Fetch all at start? For now, keep it simple.
-            node_data = figma_client_instance.get_file_nodes(figma_file_key, [node_id])
-            if not node_data:
-                print(f"HATA: Node {node_id} verisi çekilemedi.")
-                continue
+                # 1. Get Metadata (Ground Truth) - toplu çekilmiş / cache'lenmiş yanıttan
+                if node_id not in figma_prefetch["components"]:
+                    print(f"HATA: Node {node_id} verisi çekilemedi.")
+                    continue
                 
-            figma_data_json = figma_client_instance.parse_figma_response(node_data)
+                figma_data_json = figma_prefetch["components"][node_id]
+                figma_render_scale = figma_prefetch["scales"].get(node_id, 1.0)
             
-            # 2. Get Image (Reference)
-            img_url = figma_client_instance.get_image(figma_file_key, node_id)
-            if img_url:
-                figma_part_path = f"figma_api_node_{node_id.replace(':', '_')}.png"
-                figma_client_instance.download_image(img_url, figma_part_path)
-                print(f"[Figma API] Referans görsel indirildi: {figma_part_path}")
-            else:
-                print("UYARI: Referans görsel indirilemedi.")
+                # 2. Get Image (Reference) - indirme döngüden önce başlatıldı
+                download = figma_prefetch["downloads"].get(node_id)
+                with tracing.span("figma.wait_download", part=part_index):
+                    figma_part_path = download.result() if download else None
+                if figma_part_path:
+                    print(f"[Figma API] Referans görsel indirildi: {figma_part_path}")
+                else:
+                    print("UYARI: Referans görsel indirilemedi.")
                 
-        else:
-            figma_part_path = item
-            if not os.path.exists(figma_part_path):
-                print(f"HATA: Figma parçası '{figma_part_path}' bulunamadı. Atlanıyor.")
-                continue
+            else:
+                figma_part_path = item
+                if not os.path.exists(figma_part_path):
+                    print(f"HATA: Figma parçası '{figma_part_path}' bulunamadı. Atlanıyor.")
+                    continue
 
-        app_xml_path_for_analysis = None
-        app_ss_path_for_report = None
+            app_xml_path_for_analysis = None
+            app_ss_path_for_report = None
 
-        if run_mode == "manual":
-            app_xml_path = app_parts[i]
-            print(f"   App XML (Manuel): '{app_xml_path}'")
-            if not os.path.exists(app_xml_path):
-                print(f"HATA: App XML parçası '{app_xml_path}' bulunamadı. Atlanıyor.")
-                continue
-            app_xml_path_for_analysis = app_xml_path
+            if restored:
+                # Oto-crop (-1) sonraki parçalarda tekrar AI'ya sorulmasın
+                figma_crop_top, figma_crop_bottom, app_crop_top, app_crop_bottom = restored["crops"]
+                if run_mode == "manual":
+                    _restore_part(pipeline, restored)
+                    continue
 
-            # Manuel modda, eğer dosya zaten bir resimse onu kullan
-            if app_xml_path.lower().endswith(('.png', '.jpg', '.jpeg')):
-                app_ss_path_for_report = app_xml_path
-            else:
-                # Değilse (örn XML ise), aynı isimde resim ara (.png, .jpg, .jpeg)
-                base_path = os.path.splitext(app_xml_path)[0]
-                for ext in ['.png', '.jpg', '.jpeg']:
-                    potential_path = base_path + ext
-                    if os.path.exists(potential_path):
-                        app_ss_path_for_report = potential_path
-                        break
-                
+            if run_mode == "manual":
+                app_xml_path = app_parts[i]
+                print(f"   App XML (Manuel): '{app_xml_path}'")
+                if not os.path.exists(app_xml_path):
+                    print(f"HATA: App XML parçası '{app_xml_path}' bulunamadı. Atlanıyor.")
+                    continue
+                app_xml_path_for_analysis = app_xml_path
+
+                # Manuel modda, eğer dosya zaten bir resimse onu, değilse aynı isimli resmi kullan
+                app_ss_path_for_report = _find_report_image(app_xml_path)
                 if not app_ss_path_for_report:
-                    print(f"UYARI: Rapor için görsel dosyası (png/jpg) bulunamadı: {base_path}.*")
-                    app_ss_path_for_report = None
+                    print(f"UYARI: Rapor için görsel dosyası (png/jpg) bulunamadı: {os.path.splitext(app_xml_path)[0]}.*")
 
-        else:  # run_mode == "auto"
-            if i == 0:
-                app_ss_path_for_report = last_successful_ss_path
-            else:
-                print("[Oto-Scroll] Kaydırma deneniyor...")
-                scroll_success = adb_client.scroll_down(app_crop_top, app_crop_bottom)
-                new_ss_path = adb_client.take_screenshot(part_index)
-
-                if not scroll_success or not new_ss_path:
-                    # ADB Başarısız -> Fallback'i dene
-                    fallback_path = f"app_screenshot_part_{part_index}.png"
-                    if os.path.exists(fallback_path):
-                        print(f"[Oto-Scroll] ADB başarısız, fakat '{fallback_path}' bulundu ve kullanılacak.")
-                        new_ss_path = fallback_path
+            else:  # run_mode == "auto"
+                if i == 0:
+                    app_ss_path_for_report = last_successful_ss_path
+                else:
+                    # Önceki parçanın dump'ı (analiz aşamasına devredilmiş olsa da) scroll'dan önce bitmeli
+                    _finish_layout_dump(*previous_dump, output_dir)
+                    print("[Oto-Scroll] Kaydırma deneniyor...")
+                    with tracing.span("adb.scroll", part=part_index):
+                        scroll_success = device.scroll_down(app_crop_top, app_crop_bottom)
+                    # Ekran durağan olduğu için dump ve ekran görüntüsü aynı anda alınabilir
+                    pending_dump = _start_layout_dump(device, pending_dump)
+                    new_ss_path, new_ss_image = _capture_app_screenshot(part_index, final_report, device, output_dir)
+
+                    if not scroll_success or not new_ss_path:
+                        # ADB Başarısız -> Fallback'i dene
+                        fallback_path = _find_local_fallback(f"app_screenshot_part_{part_index}.png", output_dir)
+                        if fallback_path:
+                            print(f"[Oto-Scroll] ADB başarısız, fakat '{fallback_path}' bulundu ve kullanılacak.")
+                            new_ss_path = fallback_path
+                            new_ss_image = None
+                        else:
+                            print("[Oto-Scroll] HATA: ADB scroll + screenshot başarısız ve fallback görüntü yok. Parça atlanıyor.")
+                            continue
+
+                    # Görüntü gerçekten farklı mı diye kontrol et (opsiyonel)
+                    # Bellekteki görüntüler varsa onlar kullanılır, diskten tekrar okunmaz.
+                    if not _images_are_different(last_successful_ss_image or last_successful_ss_path,
+                                                 new_ss_image or new_ss_path):
+                        print("[Oto-Scroll] UYARI: Yeni ekran görüntüsü bir öncekinden anlamlı derecede farklı değil. Scroll algılanamadı.")
                     else:
-                        print("[Oto-Scroll] HATA: ADB scroll + screenshot başarısız ve fallback görüntü yok. Parça atlanıyor.")
-                        continue
+                        last_successful_ss_path = new_ss_path
+                        last_successful_ss_image = new_ss_image
 
-                # Görüntü gerçekten farklı mı diye kontrol et (opsiyonel)
-                if not _images_are_different(last_successful_ss_path, new_ss_path):
-                    print("[Oto-Scroll] UYARI: Yeni ekran görüntüsü bir öncekinden anlamlı derecede farklı değil. Scroll algılanamadı.")
-                else:
-                    last_successful_ss_path = new_ss_path
+                    app_ss_path_for_report = new_ss_path
 
-                app_ss_path_for_report = new_ss_path
+                # Otomatik modda XML dump arka planda sürüyor; kırpma ve AI analizi beklemeden devam eder,
+                # XML ancak karşılaştırmadan hemen önce beklenir (bkz. _resolve_layout_dump)
+                if restored:
+                    # Cihaz bu parçanın ekranına kaydırıldı (sonraki parçalar için); dump gerekmez
+                    if pending_dump:
+                        pending_dump.cancel()
+                    pending_dump = None
+                    previous_dump = (None, None)
+                    _restore_part(pipeline, restored)
+                    continue
 
-            # Otomatik modda XML dump al
-            app_xml_path_for_analysis = adb_client.dump_layout_xml()
-            if not app_xml_path_for_analysis:
-                fallback_xml = "app_layout_dump.xml"
-                if os.path.exists(fallback_xml):
-                    print(f"[Oto-Mod] ADB XML dump başarısız, fakat yerelde '{fallback_xml}' bulundu ve kullanılacak.")
-                    app_xml_path_for_analysis = fallback_xml
-                else:
-                    print("[Oto-Mod] HATA: Ne ADB XML dump ne de yerel fallback XML bulundu. Bu parça için layout analizi yapılamayacak.")
+                if stitch_app_page:
+                    # Kaydırmadan önce dump bitmeli (sayfanın başını yansıtsın)
+                    app_xml_path_for_analysis = _resolve_layout_dump(pending_dump, part_index, output_dir)
+                    pending_dump = None
+                    # XML dump sayfanın başındayken alındı; şimdi sonuna kadar kaydırıp birleştir
+                    stitched_path = _capture_stitched_page(
+                        device, last_successful_ss_image, final_report,
+                        app_crop_top, app_crop_bottom, output_dir
+                    )
+                    if stitched_path:
+                        app_ss_path_for_report = stitched_path
 
-        # 2. Adım: Görüntüleri Kırp (Opsiyonel veya Otomatik)
+            # 2. Adım: Görüntüleri Kırp (Opsiyonel veya Otomatik)
         
-        # --- OTO-CROP MANTIĞI ---
-        # Eğer değerler -1 ise (Auto), AI ile tespit etmeye çalış
-        if figma_crop_top == -1 and figma_crop_bottom == -1:
-            print(f"[Auto-Crop] Figma parçası '{figma_part_path}' için bar tespiti yapılıyor...")
-            bars = image_analyzer.detect_system_bars(figma_part_path)
-            if bars['status_bar_height'] > 0 or bars['nav_bar_height'] > 0:
-                print(f"   -> Tespit edildi: Top={bars['status_bar_height']}px, Bottom={bars['nav_bar_height']}px")
-                figma_crop_top = bars['status_bar_height']
-                figma_crop_bottom = bars['nav_bar_height']
-            else:
-                # Tespit edilemezse 0 yap
-                figma_crop_top = 0
-                figma_crop_bottom = 0
-        elif figma_crop_top == -1: figma_crop_top = 0
-        elif figma_crop_bottom == -1: figma_crop_bottom = 0
-
-
-        if app_crop_top == -1 and app_crop_bottom == -1 and app_ss_path_for_report:
-            print(f"[Auto-Crop] App parçası '{app_ss_path_for_report}' için bar tespiti yapılıyor...")
-            bars = image_analyzer.detect_system_bars(app_ss_path_for_report)
-            if bars['status_bar_height'] > 0 or bars['nav_bar_height'] > 0:
-                print(f"   -> Tespit edildi: Top={bars['status_bar_height']}px, Bottom={bars['nav_bar_height']}px")
-                app_crop_top = bars['status_bar_height']
-                app_crop_bottom = bars['nav_bar_height']
-            else:
-                app_crop_top = 0
-                app_crop_bottom = 0
-        elif app_crop_top == -1: app_crop_top = 0
-        elif app_crop_bottom == -1: app_crop_bottom = 0
-        # ------------------------
-
-        # SADECE AI'ye gidecek olan FIGMA görüntüsünü kırp
-        figma_cropped_path = figma_part_path
-        if figma_crop_top > 0 or figma_crop_bottom > 0:
-            figma_cropped_path = _crop_image(
-                figma_part_path, figma_crop_top, figma_crop_bottom,
-                f"figma_cropped_part_{part_index}.png"
-            )
-        else:
-            print("[Crop] Figma için kırpma atlanıyor (değerler 0).")
-
-        # App SS'ini SADECE RAPORLAMA için kırp
-        app_cropped_path_for_report = app_ss_path_for_report
-        if app_ss_path_for_report and (app_crop_top > 0 or app_crop_bottom > 0):
-            app_cropped_path_for_report = _crop_image(
-                app_ss_path_for_report, app_crop_top, app_crop_bottom,
-                f"app_cropped_part_{part_index}.png"
+            # --- OTO-CROP MANTIĞI ---
+            # Eğer değerler -1 ise (Auto), AI ile tespit etmeye çalış
+            bars = None
+            if _wants_bar_detection(figma_crop_top, figma_crop_bottom, figma_part_path, required=False):
+                print(f"[Auto-Crop] Figma parçası '{figma_part_path}' için bar tespiti yapılıyor...")
+                bars = image_analyzer.detect_system_bars(figma_part_path)
+            figma_crop_top, figma_crop_bottom = _resolve_auto_crop(figma_crop_top, figma_crop_bottom, bars)
+
+            bars = None
+            if _wants_bar_detection(app_crop_top, app_crop_bottom, app_ss_path_for_report):
+                print(f"[Auto-Crop] App parçası '{app_ss_path_for_report}' için bar tespiti yapılıyor...")
+                bars = image_analyzer.detect_system_bars(app_ss_path_for_report)
+            app_crop_top, app_crop_bottom = _resolve_auto_crop(app_crop_top, app_crop_bottom, bars)
+            # ------------------------
+
+            crops = [figma_crop_top, figma_crop_bottom, app_crop_top, app_crop_bottom]
+            figma_cropped_path, app_cropped_path_for_report = _crop_part_images(
+                figma_part_path, app_ss_path_for_report, crops, figma_render_scale, figma_crop_is_design_px,
+                part_index, output_dir
             )
 
-        if not figma_cropped_path or not app_xml_path_for_analysis:
-            print("HATA: Gerekli Figma veya App verisi yok. Bu parça atlanıyor.")
-            continue
+            if not figma_cropped_path or not (app_xml_path_for_analysis or pending_dump):
+                print("HATA: Gerekli Figma veya App verisi yok. Bu parça atlanıyor.")
+                continue
 
-        # 3. Adım: AI Analizi (SADECE FIGMA - Eğer API kullanılmıyorsa)
+            # 3-5. Adımlar (AI analizi + karşılaştırma) pipeline'da arka planda çalışır;
+            # bu sırada döngü bir sonraki parçanın Figma / App verisini toplar.
+            previous_dump = (pending_dump, part_index)
+            pipeline.submit({
+                "loop_index": i,
+                "part_index": part_index,
+                "item": item,
+                "crops": crops,
+                "figma_path": figma_cropped_path,
+                "app_path": app_cropped_path_for_report,
+                "figma_data": figma_data_json,
+                "app_xml_path": app_xml_path_for_analysis,
+                "pending_dump": pending_dump,
+            })
+            pending_dump = None  # Artık pipeline'ın sorumluluğunda
+
+        # Karşılaştırma sonuçlarını PARÇA SIRASINA göre topla (seri yol ile aynı sonuç)
+        for pending, results_part in pipeline.close():
+            if pending["mode"] == "xml" and app_analysis_mode != "ai":
+                print(f"[Debug] compare_layouts tamamlandı. Sonuç özeti: {results_part.get('summary')}")
+            _add_part_to_report(final_report, pending, results_part)
+    finally:
+        pipeline.close(abort=True)
+        if pending_dump:
+            pending_dump.cancel()
+        if owns_device and device is not adb_client:
+            device.close()
+        if compare_executor:
+            compare_executor.shutdown(cancel_futures=True)
+        if figma_prefetch:
+            figma_prefetch["executor"].shutdown(cancel_futures=True)
+            if figma_prefetch["cache"]:
+                # Yeni indirilen render'lar sonrası boyut sınırını koru
+                figma_prefetch["cache"].evict()
+
+    _finalize_summary(final_report)
+    return final_report
+
+
+def _run_mode(app_parts):
+    if app_parts:
+        print("[Mod] 'Manuel Mod' aktif. Sağlanan App dosyaları kullanılacak.")
+        return "manual"
+    print("[Mod] 'Otomatik Mod' (ADB) aktif. ADB başarısız olursa yerel dosyalara bakılacak.")
+    return "auto"
+
+
+def _new_final_report():
+    return {
+        "summary": {"error_count": 0, "layout_success_count": 0, "style_success_count": 0, "warning_count": 0,
+                    "audit_count": 0, "total_matched": 0},
+        "parts": [],
+        "all_warnings": []
+    }
+
+
+def _figma_source(figma_file_key, figma_node_ids, figma_parts):
+    """Returns: (using_figma_api, döngü elemanları) veya kaynak yoksa (False, None)"""
+    if figma_file_key and figma_node_ids:
+        print(f"[Mod] Figma API Modu aktif. {len(figma_node_ids)} parça (Node ID) işlenecek.")
+        return True, figma_node_ids
+    if figma_parts:
+        print(f"[Mod] Figma PNG Modu aktif. {len(figma_parts)} parça (PNG) işlenecek.")
+        return False, figma_parts
+    print("HATA: Ne Figma PNG'leri ne de Figma API bilgileri sağlandı.")
+    return False, None
+
+
+def _stitch_enabled(stitch_app_page, run_mode, loop_range, app_analysis_mode, first_image):
+    """Sayfa birleştirme bu denetimde kullanılabilir mi?"""
+    if not stitch_app_page or run_mode != "auto":
+        return False
+    if len(loop_range) != 1:
+        print("[Stitch] UYARI: Birleştirme tek bir (uzun) Figma parçası gerektirir; parça bazlı scroll kullanılacak.")
+        return False
+    if app_analysis_mode != "ai":
+        print("[Stitch] UYARI: XML dump sadece görünen ekranı kapsar, birleştirme sadece 'ai' modunda kullanılır.")
+        return False
+    if first_image is None:
+        print("[Stitch] UYARI: Başlangıç ekran görüntüsü bellekte yok, birleştirme atlanıyor.")
+        return False
+    return True
+
+
+def _audit_checkpoint(output_dir, figma_parts, app_parts, app_analysis_mode, figma_crop_top, figma_crop_bottom,
+                      app_crop_top, app_crop_bottom, figma_file_key, figma_node_ids, stitch_app_page):
+    # Tamamlanan her parça checkpoint'e yazılır; resume'da bitmiş parçalar tekrar işlenmez
+    return checkpoint.AuditCheckpoint(output_dir, {
+        "figma_parts": figma_parts, "app_parts": app_parts, "app_analysis_mode": app_analysis_mode,
+        "figma_crop": [figma_crop_top, figma_crop_bottom], "app_crop": [app_crop_top, app_crop_bottom],
+        "figma_file_key": figma_file_key, "figma_node_ids": figma_node_ids, "stitch_app_page": stitch_app_page,
+    })
+
+
+def _wants_bar_detection(crop_top, crop_bottom, image_path, required=True):
+    """Oto-crop: iki değer de -1 ise bar yükseklikleri AI ile tespit edilir."""
+    return crop_top == -1 and crop_bottom == -1 and (bool(image_path) or not required)
+
+
+def _resolve_auto_crop(crop_top, crop_bottom, bars=None):
+    """
+    Oto-crop (-1) değerlerini çözer. bars: detect_system_bars sonucu (bkz. _wants_bar_detection).
+    Returns: (crop_top, crop_bottom)
+    """
+    if bars is not None:
+        if bars['status_bar_height'] > 0 or bars['nav_bar_height'] > 0:
+            print(f"   -> Tespit edildi: Top={bars['status_bar_height']}px, Bottom={bars['nav_bar_height']}px")
+            return bars['status_bar_height'], bars['nav_bar_height']
+        # Tespit edilemezse 0 yap
+        return 0, 0
+    if crop_top == -1:
+        return 0, crop_bottom
+    if crop_bottom == -1:
+        return crop_top, 0
+    return crop_top, crop_bottom
+
+
+def _crop_part_images(figma_part_path, app_ss_path, crops, figma_render_scale, figma_crop_is_design_px,
+                      part_index, output_dir="."):
+    """Returns: (kırpılmış Figma yolu, rapor için kırpılmış App yolu)"""
+    figma_crop_top, figma_crop_bottom, app_crop_top, app_crop_bottom = crops
+
+    # SADECE AI'ye gidecek olan FIGMA görüntüsünü kırp
+    figma_cropped_path = figma_part_path
+    render_crop_top = round(figma_crop_top * figma_render_scale) if figma_crop_is_design_px[0] else figma_crop_top
+    render_crop_bottom = round(figma_crop_bottom * figma_render_scale) if figma_crop_is_design_px[1] else figma_crop_bottom
+    if render_crop_top > 0 or render_crop_bottom > 0:
+        if figma_render_scale != 1.0:
+            print(f"[Crop] Figma kırpması render ölçeğine ({figma_render_scale}x) çevrildi: "
+                  f"Top={render_crop_top}px, Bottom={render_crop_bottom}px")
+        figma_cropped_path = _crop_image(
+            figma_part_path, render_crop_top, render_crop_bottom,
+            os.path.join(output_dir, f"figma_cropped_part_{part_index}.png")
+        )
+    else:
+        print("[Crop] Figma için kırpma atlanıyor (değerler 0).")
+
+    # App SS'ini SADECE RAPORLAMA için kırp
+    app_cropped_path = app_ss_path
+    if app_ss_path and (app_crop_top > 0 or app_crop_bottom > 0):
+        app_cropped_path = _crop_image(
+            app_ss_path, app_crop_top, app_crop_bottom,
+            os.path.join(output_dir, f"app_cropped_part_{part_index}.png")
+        )
+    return figma_cropped_path, app_cropped_path
+
+
+def _finalize_summary(final_report):
+    # 7. Adım: Global yüzde uyum hesapları
+    summary = final_report.get("summary", {})
+    total = summary.get("total_matched", 0) or 0
+    if total > 0:
+        summary["layout_match_pct"] = round((summary.get("layout_success_count", 0) / total) * 100.0, 1)
+        summary["style_match_pct"] = round((summary.get("style_success_count", 0) / total) * 100.0, 1)
+        summary["overall_match_pct"] = round(
+            ((summary.get("layout_success_count", 0) + summary.get("style_success_count", 0)) / (2 * total)) * 100.0,
+            1,
+        )
+    else:
+        summary["layout_match_pct"] = 0.0
+        summary["style_match_pct"] = 0.0
+        summary["overall_match_pct"] = 0.0
+
+
+# --- asyncio API (web server) ---
+#
+# Denetimin asyncio sürümü: Figma istekleri / indirmeleri aiohttp (figma_client.AsyncFigmaClient),
+# cihaz komutları asyncio subprocess'leri (adb_client.AsyncDeviceSession), Gemini çağrıları
+# generate_content_async ile await edilir. Akış senkron denetimle aynıdır; _PartPipeline'ın
+# thread'leri yerine her parçanın analiz + karşılaştırması bir task'tır ve task'lar gather edilir.
+# Sadece CPU işleri (karşılaştırma, kırpma, görüntü kaydetme) executor / thread'de çalışır.
+
+_AUDIT_SLOTS = weakref.WeakKeyDictionary()  # event loop -> asyncio.Semaphore(AUDIT_MAX_CONCURRENT)
+
+
+def _audit_slots():
+    loop = asyncio.get_running_loop()
+    slots = _AUDIT_SLOTS.get(loop)
+    if slots is None:
+        slots = _AUDIT_SLOTS[loop] = asyncio.Semaphore(max(1, config.AUDIT_MAX_CONCURRENT))
+    return slots
+
+
+def _ready_future(value):
+    """_completed_future'ın asyncio karşılığı (await edilebilir hazır değer)."""
+    future = asyncio.get_running_loop().create_future()
+    future.set_result(value)
+    return future
+
+
+async def _capture_app_screenshot_async(part_index, final_report, device, output_dir="."):
+    """_capture_app_screenshot'ın async sürümü. Returns: (dosya yolu, PIL.Image) veya (None, None)"""
+    with tracing.span("adb.capture", part=part_index) as span:
+        capture = await device.capture_screenshot()
+        if not capture:
+            span.set(ok=False)
+            return None, None
+        span.add(bytes=_capture_size(capture))
+    final_report.setdefault("capture_latency_ms", []).append(
+        {"part_index": part_index, "screenshot": round(capture["latency_ms"], 1)}
+    )
+    with tracing.span("image.save", part=part_index):
+        path = await asyncio.to_thread(adb_client.save_screenshot, capture, part_index, output_dir)
+    return path, capture["image"]
+
+
+async def _resolve_layout_dump_async(pending_dump, part_index, output_dir="."):
+    xml_path = None
+    if pending_dump:
+        xml_path = await pending_dump.result(output_dir, filename=f"app_layout_dump_part_{part_index}.xml")
+    return xml_path or _local_layout_fallback(output_dir)
+
+
+async def _capture_stitched_page_async(device, first_image, final_report, crop_top, crop_bottom, output_dir="."):
+    """_capture_stitched_page'in async sürümü."""
+    page = stitcher.ScrollStitcher(header=crop_top, footer=crop_bottom)
+    await asyncio.to_thread(page.add, first_image)
+    for scroll_index in range(1, config.STITCH_MAX_SCROLLS + 1):
+        print(f"[Stitch] Kaydırma {scroll_index}/{config.STITCH_MAX_SCROLLS}...")
+        with tracing.span("adb.scroll"):
+            scrolled = await device.scroll_down(crop_top, crop_bottom)
+        if not scrolled:
+            break
+        with tracing.span("adb.capture", part=0, scroll=scroll_index) as span:
+            capture = await device.capture_screenshot()
+            if capture:
+                span.add(bytes=_capture_size(capture))
+        if not capture:
+            break
+        final_report.setdefault("capture_latency_ms", []).append(
+            {"part_index": 0, "scroll_index": scroll_index, "screenshot": round(capture["latency_ms"], 1)}
+        )
+        added = await asyncio.to_thread(page.add, capture["image"])
+        if added == 0:
+            print("[Stitch] Sayfa sonuna ulaşıldı.")
+            break
+    else:
+        print(f"[Stitch] UYARI: {config.STITCH_MAX_SCROLLS} kaydırmada sayfa sonu bulunamadı.")
+    return await asyncio.to_thread(_save_stitched_page, page, output_dir)
+
+
+async def _analyze_part_async(part, app_analysis_mode, using_figma_api, output_dir="."):
+    """
+    _analyze_part'ın async sürümü. AI modunda App analizi (Gemini) ile XML dump'ının
+    beklenmesi eşzamanlı yürür. Returns: karşılaştırma işi (dict) veya parça atlanacaksa None
+    """
+    part_index = part["part_index"]
+    figma_cropped_path = part["figma_path"]
+    app_cropped_path_for_report = part["app_path"]
+    figma_data_json = part["figma_data"]
+    app_xml_path_for_analysis = part["app_xml_path"]
+    pending_dump = part["pending_dump"]
+
+    try:
         if not using_figma_api:
-            figma_data_json = image_analyzer.analyze_image(figma_cropped_path)
-    
+            figma_data_json = await image_analyzer.analyze_image_async(figma_cropped_path, debug_dir=output_dir)
             if not figma_data_json:
                 print("HATA: AI Figma analizi başarısız. Bu parça atlanıyor.")
-                continue
+                return None
+            part["figma_data"] = figma_data_json
         else:
             print(f"[Figma API] {len(figma_data_json)} bileşen (Ground Truth) kullanılıyor.")
 
-        # 4. Adım: En-boy oranlarına göre scale factor hesapla
-        try:
-            with PIL.Image.open(figma_cropped_path) as img:
-                figma_width = img.width
-            # App genişliğini XML'den (root node) veya SS'ten almamız lazım
-            # Şimdilik SS'ten alalım
-            with PIL.Image.open(app_cropped_path_for_report) as img:
-                app_width = img.width
-        except Exception as e:
-            print(f"HATA: Kırpılmış görüntü boyutları okunurken hata: {e}. Parça atlanıyor.")
-            continue
+        widths = await asyncio.to_thread(_part_widths, figma_cropped_path, app_cropped_path_for_report)
+        if widths is None:
+            return None
+        figma_width, app_width = widths
+
+        if pending_dump:
+            dump = asyncio.create_task(_resolve_layout_dump_async(pending_dump, part_index, output_dir))
+        else:
+            dump = _ready_future(app_xml_path_for_analysis)
 
         if app_analysis_mode == "ai":
-            # --- HYBRID MODE LOGIC ---
             expected_components_for_ai = None
             if using_figma_api and figma_data_json:
-                 expected_components_for_ai = figma_data_json
-                 print(f"   [INFO] Hybrid Mode: {len(figma_data_json)} Figma bileşeni AI'ya rehberlik edecek.")
-            
-            app_data_json = image_analyzer.analyze_image(app_cropped_path_for_report, expected_components=expected_components_for_ai)
-            
+                expected_components_for_ai = figma_data_json
+                print(f"   [INFO] Hybrid Mode: {len(figma_data_json)} Figma bileşeni AI'ya rehberlik edecek.")
+            try:
+                app_data_json, app_xml_path_for_analysis = await asyncio.gather(
+                    image_analyzer.analyze_image_async(
+                        app_cropped_path_for_report, expected_components=expected_components_for_ai,
+                        debug_dir=output_dir
+                    ),
+                    dump,
+                )
+            finally:
+                dump.cancel()
+            pending_dump = None
+            if not app_xml_path_for_analysis and part["pending_dump"]:
+                print("HATA: Gerekli App XML verisi yok. Bu parça atlanıyor.")
+                return None
+
             if not app_data_json:
                 print("UYARI: AI App analizi başarısız, XML moduna düşülüyor.")
                 if not app_xml_path_for_analysis:
                     print("HATA: Ne App SS ne de XML mevcut, bu parça atlanıyor.")
-                    continue
-                
-                # Fallback to XML comparison
-                results_part = comparator.compare_layouts(
-                    figma_data_json,
-                    app_xml_path_for_analysis,
-                    figma_width,
-                    app_width,
-                    config.DEFAULT_TOLERANCE_PX
-                )
+                    return None
+                compare_job = {"mode": "xml", "app_source": app_xml_path_for_analysis}
             else:
-                # --- DEBUG: JSON'ları kaydet ---
-                import json
-                with open(f"debug_figma_part_{part_index}.json", "w") as f:
-                    json.dump(figma_data_json, f, indent=2)
-                with open(f"debug_app_part_{part_index}.json", "w") as f:
-                    json.dump(app_data_json, f, indent=2)
-                print(f"[Debug] JSON verileri 'debug_figma_part_{part_index}.json' ve 'debug_app_part_{part_index}.json' dosyalarına kaydedildi.")
-
-                results_part = comparator.compare_layouts_ai(
-                    figma_data_json,
-                    app_data_json,
-                    figma_width,
-                    app_width,
-                    config.DEFAULT_TOLERANCE_PX
-                )
+                await asyncio.to_thread(_save_debug_json, figma_data_json, app_data_json, part_index, output_dir)
+                compare_job = {"mode": "ai", "app_source": app_data_json}
         else:
+            app_xml_path_for_analysis = await dump
+            pending_dump = None
+            if not app_xml_path_for_analysis:
+                print("HATA: Gerekli App XML verisi yok. Bu parça atlanıyor.")
+                return None
             print(f"[Debug] XML Modu: compare_layouts çağrılıyor... XML: {app_xml_path_for_analysis}")
-            results_part = comparator.compare_layouts(
-                figma_data_json,
-                app_xml_path_for_analysis,
-                figma_width,
-                app_width,
-                config.DEFAULT_TOLERANCE_PX
+            compare_job = {"mode": "xml", "app_source": app_xml_path_for_analysis}
+    finally:
+        if pending_dump:
+            pending_dump.cancel()
+
+    compare_job.update(figma_data=figma_data_json, figma_width=figma_width, app_width=app_width)
+    return compare_job
+
+
+async def _download_render_to_cache_async(client, cache, url, cache_path, workspace_path):
+    path = await client.download_image(url, cache_path)
+    if not path:
+        return None
+    cache.note_written(path)
+    return cache.link_into(path, workspace_path)
+
+
+async def _prefetch_figma_parts_async(client, file_key, node_ids, target_width=None, density=None, output_dir="."):
+    """
+    _prefetch_figma_parts'ın async sürümü (client: figma_client.AsyncFigmaClient).
+    Farklı ölçeklerin /images istekleri de eşzamanlı gönderilir; 'downloads' değerleri
+    await edilebilir (task veya hazır future).
+    """
+    print(f"[Figma API] {len(node_ids)} node için veri ve görseller toplu çekiliyor...")
+
+    version = None
+    if config.FIGMA_CACHE_ENABLED:
+        try:
+            version = await client.get_file_version(file_key)
+        except Exception as e:
+            print(f"[FigmaCache] Versiyon kontrolü başarısız, cache kullanılmayacak: {e}")
+    cache = figma_cache.FigmaCache() if version else None
+
+    nodes = _cached_nodes(cache, file_key, version, node_ids)
+    missing_nodes = [node_id for node_id in node_ids if node_id not in nodes]
+    if missing_nodes:
+        node_data = await client.get_file_nodes_batched(file_key, missing_nodes) or {}
+        _store_fetched_nodes(client, cache, file_key, version, node_data, nodes)
+
+    components, scales = _scaled_components(nodes, target_width, density)
+
+    _, downloads = client.start_downloads({})
+    workspace_paths, cached_paths, missing_by_scale = _split_cached_renders(
+        cache, file_key, version, node_ids, scales, output_dir
+    )
+    for node_id, path in cached_paths.items():
+        downloads[node_id] = _ready_future(path)
+
+    scale_groups = list(missing_by_scale.items())
+    url_batches = await asyncio.gather(*(
+        client.get_images_batched(file_key, scale_node_ids, scale=scale) for scale, scale_node_ids in scale_groups
+    ))
+    for (scale, _), image_urls in zip(scale_groups, url_batches):
+        for node_id, img_url in image_urls.items():
+            if not img_url:
+                continue
+            if cache:
+                cache_path = cache.prepare_render_path(file_key, version, node_id, scale)
+                downloads[node_id] = asyncio.create_task(_download_render_to_cache_async(
+                    client, cache, img_url, cache_path, workspace_paths[node_id]
+                ))
+            else:
+                downloads[node_id] = asyncio.create_task(client.download_image(img_url, workspace_paths[node_id]))
+
+    _log_prefetch(cache, version, node_ids, missing_nodes, missing_by_scale, components, downloads)
+    return {"components": components, "scales": scales, "downloads": downloads, "cache": cache}
+
+
+async def run_audit_process_async(device_pool=None, device_serial=None, **audit_kwargs):
+    """
+    run_audit_process'in asyncio sürümü (aynı argümanlar ve rapor). Figma, ADB ve Gemini I/O'su
+    event loop'ta await edilir; aynı loop'ta birden fazla denetim thread gerektirmeden yürür.
+
+    device_pool verilirse ve Otomatik (ADB) moddaysa havuzdan bir cihaz kiralanır (lease_async)
+    ve denetim o cihaza açılan bir AsyncDeviceSession ile yapılır; aksi halde denetim sayısı
+    config.AUDIT_MAX_CONCURRENT ile sınırlıdır.
+    """
+    if device_pool is not None and audit_kwargs.get("app_parts") is None \
+            and any(d["healthy"] for d in device_pool.status()):
+        async with device_pool.lease_async(device_serial or None) as device:
+            os.makedirs(device.work_dir, exist_ok=True)
+            audit_kwargs.setdefault("output_dir", device.work_dir)
+            print(f"[DevicePool] Denetim {device.serial} cihazında başlıyor (çıktılar: {audit_kwargs['output_dir']})")
+            async with adb_client.AsyncDeviceSession(device.serial) as session:
+                if not session.is_open:
+                    raise RuntimeError(f"Cihaz oturumu açılamadı ({device.serial}).")
+                report = await _audit_async(device=session, **audit_kwargs)
+            report["device_serial"] = device.serial
+            return report
+    async with _audit_slots():
+        return await _audit_async(**audit_kwargs)
+
+
+async def _audit_async(
+    figma_parts=None,
+    app_parts=None,
+    app_analysis_mode=config.APP_ANALYSIS_MODE,
+    figma_crop_top=0,
+    figma_crop_bottom=0,
+    app_crop_top=0,
+    app_crop_bottom=0,
+    figma_file_key=None,
+    figma_node_ids=None,
+    device=None,
+    output_dir=None,
+    stitch_app_page=False,
+    tracer=None,
+    trace_file=None,
+    resume=False
+):
+    ws, output_dir = _open_workspace(output_dir, resume)
+    tracer = tracer or tracing.Tracer()
+    try:
+        with tracer.activate(), tracing.span("audit"):
+            final_report = await _run_audit_process_async(
+                figma_parts, app_parts, app_analysis_mode, figma_crop_top, figma_crop_bottom,
+                app_crop_top, app_crop_bottom, figma_file_key, figma_node_ids, device, output_dir,
+                stitch_app_page, resume
             )
-            print(f"[Debug] compare_layouts tamamlandı. Sonuç özeti: {results_part.get('summary')}")
-
-        # 5. Adım: Sonuçları Ana Rapora Ekle
-        final_report["parts"].append({
-            "part_index": part_index,
-            "image_pair": {
-                "figma": figma_cropped_path,
-                "app": app_cropped_path_for_report  # Kırpılmış SS'i rapora yolla
-            },
-            "figma_spec": figma_data_json,
-            "comparison_results": results_part
-        })
-
-        # 6. Adım: Global Özeti Güncelle
-        part_summary = results_part.get("summary", {})
-        final_report["summary"]["error_count"] += part_summary.get("error_count", 0)
-        final_report["summary"]["audit_count"] += part_summary.get("audit_count", 0)
-        final_report["summary"]["layout_success_count"] += part_summary.get("layout_success_count", 0)
-        final_report["summary"]["style_success_count"] += part_summary.get("style_success_count", 0)
-        final_report["summary"]["warning_count"] += part_summary.get("warning_count", 0)
-        final_report["summary"]["total_matched"] += part_summary.get("total_matched", 0)
-
-        if i == 0:
-            final_report["scale_factor"] = results_part.get("scale_factor", 0.0)
+    finally:
+        if ws:
+            ws.release()
+    return _finish_report(final_report, output_dir, tracer, trace_file)
 
-    # 7. Adım: Global yüzde uyum hesapları
-    summary = final_report.get("summary", {})
-    total = summary.get("total_matched", 0) or 0
-    if total > 0:
-        summary["layout_match_pct"] = round((summary.get("layout_success_count", 0) / total) * 100.0, 1)
-        summary["style_match_pct"] = round((summary.get("style_success_count", 0) / total) * 100.0, 1)
-        summary["overall_match_pct"] = round(
-            ((summary.get("layout_success_count", 0) + summary.get("style_success_count", 0)) / (2 * total)) * 100.0,
-            1,
+
+async def _run_audit_process_async(
+    figma_parts=None,
+    app_parts=None,
+    app_analysis_mode=config.APP_ANALYSIS_MODE,
+    figma_crop_top=0,
+    figma_crop_bottom=0,
+    app_crop_top=0,
+    app_crop_bottom=0,
+    figma_file_key=None,
+    figma_node_ids=None,
+    device=None,
+    output_dir=".",
+    stitch_app_page=False,
+    resume=False
+):
+    """
+    _run_audit_process'in async sürümü. Toplama (Figma görseli, capture, scroll, kırpma) sıralıdır;
+    her toplanan parçanın analizi + karşılaştırması bir task olur. Aynı anda en fazla
+    PIPELINE_ANALYSIS_WORKERS parça analiz edilir ve toplama analizden en fazla PIPELINE_QUEUE_SIZE
+    parça öndedir (_PartPipeline ile aynı sınırlar). Bir parçada hata olursa yeni parça toplanmaz,
+    analizi başlamamış parçalar atlanır; karşılaştırması başlamış olanlar checkpoint'e yazılır.
+    """
+    run_mode = _run_mode(app_parts)
+    final_report = _new_final_report()
+
+    using_figma_api, loop_range = _figma_source(figma_file_key, figma_node_ids, figma_parts)
+    if loop_range is None:
+        return final_report
+
+    last_successful_ss_path = None
+    last_successful_ss_image = None
+    pending_dump = None  # adb_client.AsyncLayoutDump
+    owns_device = device is None
+    os.makedirs(output_dir, exist_ok=True)
+
+    if run_mode == "auto":
+        if owns_device:
+            device = adb_client.AsyncDeviceSession()
+            if not await device.open():
+                print("[ADB] Kalıcı oturum açılamadı, yerel dosyalara bakılacak.")
+        print("\n[Oto-Mod] Başlangıç ekran görüntüsü (Base) alınıyor...")
+        pending_dump = device.start_layout_dump()
+        last_successful_ss_path, last_successful_ss_image = await _capture_app_screenshot_async(
+            0, final_report, device, output_dir
         )
-    else:
-        summary["layout_match_pct"] = 0.0
-        summary["style_match_pct"] = 0.0
-        summary["overall_match_pct"] = 0.0
+        if not last_successful_ss_path:
+            fallback_path = _find_local_fallback("app_screenshot_part_0.png", output_dir)
+            if fallback_path:
+                print(f"[Oto-Mod] ADB başarısız oldu, fakat yerelde '{fallback_path}' bulundu ve kullanılacak.")
+                last_successful_ss_path = fallback_path
+            else:
+                print("[Oto-Mod] HATA: Ne ADB ne de yerel fallback ekran görüntüsü alınabildi.")
+                final_report["error"] = "ADB ve yerel ekran görüntüsü alınamadı."
+                pending_dump.cancel()
+                if owns_device:
+                    await device.close()
+                return final_report
+
+    stitch_app_page = _stitch_enabled(stitch_app_page, run_mode, loop_range, app_analysis_mode, last_successful_ss_image)
+
+    part_checkpoint = _audit_checkpoint(
+        output_dir, figma_parts, app_parts, app_analysis_mode, figma_crop_top, figma_crop_bottom,
+        app_crop_top, app_crop_bottom, figma_file_key, figma_node_ids, stitch_app_page
+    )
+    completed_parts = part_checkpoint.start(resume)
+    if completed_parts:
+        final_report["resumed_parts"] = sorted(completed_parts)
+
+    loop = asyncio.get_running_loop()
+    compare_executor = _create_compare_executor(len(loop_range) - len(completed_parts))
+    analysis_slots = asyncio.Semaphore(max(1, config.PIPELINE_ANALYSIS_WORKERS))
+    # Toplama, analizden en fazla PIPELINE_QUEUE_SIZE parça önde olabilir
+    collect_slots = asyncio.Semaphore(max(1, config.PIPELINE_ANALYSIS_WORKERS) + config.PIPELINE_QUEUE_SIZE)
+    failed = asyncio.Event()
+    tasks = []
+    part_dumps = []  # Başlamadan iptal edilen task'ların dump'ları da durdurulsun
+    results = []
+    figma_client_instance = figma_client.AsyncFigmaClient() if using_figma_api else None
+    figma_prefetch = None
+    previous_dump = (None, None)
+    figma_crop_is_design_px = (figma_crop_top != -1, figma_crop_bottom != -1)
+
+    async def process_part(part):
+        try:
+            async with analysis_slots:
+                if failed.is_set():
+                    _PartPipeline._discard(part)
+                    return
+                with tracing.span("part.analyze", part=part["part_index"]):
+                    compare_job = await _analyze_part_async(part, app_analysis_mode, using_figma_api, output_dir)
+            if compare_job is None:
+                return
+            with tracing.span("part.wait_compare", part=part["part_index"]):
+                results_part = await loop.run_in_executor(compare_executor, _compare_part, compare_job)
+            tracing.merge(results_part.pop("trace_spans", None))
+            pending = _pending_part(part, compare_job, None)
+            results.append((pending, results_part))
+            part_checkpoint.save(_checkpoint_record(pending, results_part))
+        except BaseException:
+            failed.set()
+            _PartPipeline._discard(part)
+            raise
+        finally:
+            collect_slots.release()
+
+    def restore(record):
+        results.append(({key: value for key, value in record.items() if key != "results"}, record["results"]))
+
+    try:
+        pending_node_ids = [node_id for i, node_id in enumerate(figma_node_ids or [])
+                            if not _restorable(completed_parts, i, node_id)]
+        if using_figma_api and pending_node_ids:
+            target_width, density = _detect_app_render_target(run_mode, app_parts, last_successful_ss_path, device)
+            with tracing.span("figma.prefetch", nodes=len(pending_node_ids)):
+                figma_prefetch = await _prefetch_figma_parts_async(
+                    figma_client_instance, figma_file_key, pending_node_ids,
+                    target_width=target_width, density=density, output_dir=output_dir
+                )
+
+        for i, item in enumerate(loop_range):
+            if failed.is_set():
+                break
+            part_index = i
+            print(f"\n--- Parça {part_index} işleniyor ---")
+
+            figma_part_path = None
+            figma_data_json = None
+            figma_render_scale = 1.0
+            restored = completed_parts.get(i) if _restorable(completed_parts, i, item) else None
+
+            if restored:
+                print("[Checkpoint] Parça daha önce tamamlanmış, sonuç checkpoint'ten alınacak.")
+            elif using_figma_api:
+                node_id = item
+                print(f"[Figma API] Node {node_id} verisi (ön-yüklemeden) alınıyor...")
+                if node_id not in figma_prefetch["components"]:
+                    print(f"HATA: Node {node_id} verisi çekilemedi.")
+                    continue
+                figma_data_json = figma_prefetch["components"][node_id]
+                figma_render_scale = figma_prefetch["scales"].get(node_id, 1.0)
+                download = figma_prefetch["downloads"].get(node_id)
+                with tracing.span("figma.wait_download", part=part_index):
+                    figma_part_path = await download if download else None
+                if figma_part_path:
+                    print(f"[Figma API] Referans görsel indirildi: {figma_part_path}")
+                else:
+                    print("UYARI: Referans görsel indirilemedi.")
+            else:
+                figma_part_path = item
+                if not os.path.exists(figma_part_path):
+                    print(f"HATA: Figma parçası '{figma_part_path}' bulunamadı. Atlanıyor.")
+                    continue
+
+            app_xml_path_for_analysis = None
+            app_ss_path_for_report = None
 
+            if restored:
+                figma_crop_top, figma_crop_bottom, app_crop_top, app_crop_bottom = restored["crops"]
+                if run_mode == "manual":
+                    restore(restored)
+                    continue
+
+            if run_mode == "manual":
+                app_xml_path = app_parts[i]
+                print(f"   App XML (Manuel): '{app_xml_path}'")
+                if not os.path.exists(app_xml_path):
+                    print(f"HATA: App XML parçası '{app_xml_path}' bulunamadı. Atlanıyor.")
+                    continue
+                app_xml_path_for_analysis = app_xml_path
+                app_ss_path_for_report = _find_report_image(app_xml_path)
+                if not app_ss_path_for_report:
+                    print(f"UYARI: Rapor için görsel dosyası (png/jpg) bulunamadı: {os.path.splitext(app_xml_path)[0]}.*")
+
+            else:  # run_mode == "auto"
+                if i == 0:
+                    app_ss_path_for_report = last_successful_ss_path
+                else:
+                    # Önceki parçanın dump'ı scroll'dan önce bitmeli (sonucu saklanır, task tekrar beklemez)
+                    previous, previous_index = previous_dump
+                    if previous:
+                        await previous.result(output_dir, filename=f"app_layout_dump_part_{previous_index}.xml")
+                    print("[Oto-Scroll] Kaydırma deneniyor...")
+                    with tracing.span("adb.scroll", part=part_index):
+                        scroll_success = await device.scroll_down(app_crop_top, app_crop_bottom)
+                    if pending_dump:
+                        pending_dump.cancel()
+                    pending_dump = device.start_layout_dump()
+                    new_ss_path, new_ss_image = await _capture_app_screenshot_async(
+                        part_index, final_report, device, output_dir
+                    )
+
+                    if not scroll_success or not new_ss_path:
+                        fallback_path = _find_local_fallback(f"app_screenshot_part_{part_index}.png", output_dir)
+                        if fallback_path:
+                            print(f"[Oto-Scroll] ADB başarısız, fakat '{fallback_path}' bulundu ve kullanılacak.")
+                            new_ss_path = fallback_path
+                            new_ss_image = None
+                        else:
+                            print("[Oto-Scroll] HATA: ADB scroll + screenshot başarısız ve fallback görüntü yok. Parça atlanıyor.")
+                            continue
+
+                    changed = await asyncio.to_thread(
+                        _images_are_different, last_successful_ss_image or last_successful_ss_path,
+                        new_ss_image or new_ss_path
+                    )
+                    if not changed:
+                        print("[Oto-Scroll] UYARI: Yeni ekran görüntüsü bir öncekinden anlamlı derecede farklı değil. Scroll algılanamadı.")
+                    else:
+                        last_successful_ss_path = new_ss_path
+                        last_successful_ss_image = new_ss_image
+
+                    app_ss_path_for_report = new_ss_path
+
+                if restored:
+                    if pending_dump:
+                        pending_dump.cancel()
+                    pending_dump = None
+                    previous_dump = (None, None)
+                    restore(restored)
+                    continue
+
+                if stitch_app_page:
+                    app_xml_path_for_analysis = await _resolve_layout_dump_async(pending_dump, part_index, output_dir)
+                    pending_dump = None
+                    stitched_path = await _capture_stitched_page_async(
+                        device, last_successful_ss_image, final_report,
+                        app_crop_top, app_crop_bottom, output_dir
+                    )
+                    if stitched_path:
+                        app_ss_path_for_report = stitched_path
+
+            # --- OTO-CROP MANTIĞI ---
+            bars = None
+            if _wants_bar_detection(figma_crop_top, figma_crop_bottom, figma_part_path, required=False):
+                print(f"[Auto-Crop] Figma parçası '{figma_part_path}' için bar tespiti yapılıyor...")
+                bars = await image_analyzer.detect_system_bars_async(figma_part_path)
+            figma_crop_top, figma_crop_bottom = _resolve_auto_crop(figma_crop_top, figma_crop_bottom, bars)
+
+            bars = None
+            if _wants_bar_detection(app_crop_top, app_crop_bottom, app_ss_path_for_report):
+                print(f"[Auto-Crop] App parçası '{app_ss_path_for_report}' için bar tespiti yapılıyor...")
+                bars = await image_analyzer.detect_system_bars_async(app_ss_path_for_report)
+            app_crop_top, app_crop_bottom = _resolve_auto_crop(app_crop_top, app_crop_bottom, bars)
+
+            crops = [figma_crop_top, figma_crop_bottom, app_crop_top, app_crop_bottom]
+            figma_cropped_path, app_cropped_path_for_report = await asyncio.to_thread(
+                _crop_part_images, figma_part_path, app_ss_path_for_report, crops, figma_render_scale,
+                figma_crop_is_design_px, part_index, output_dir
+            )
+
+            if not figma_cropped_path or not (app_xml_path_for_analysis or pending_dump):
+                print("HATA: Gerekli Figma veya App verisi yok. Bu parça atlanıyor.")
+                continue
+
+            await collect_slots.acquire()
+            if pending_dump:
+                part_dumps.append(pending_dump)
+            previous_dump = (pending_dump, part_index)
+            tasks.append(asyncio.create_task(process_part({
+                "loop_index": i,
+                "part_index": part_index,
+                "item": item,
+                "crops": crops,
+                "figma_path": figma_cropped_path,
+                "app_path": app_cropped_path_for_report,
+                "figma_data": figma_data_json,
+                "app_xml_path": app_xml_path_for_analysis,
+                "pending_dump": pending_dump,
+            })))
+            pending_dump = None  # Artık parça task'ının sorumluluğunda
+
+        outcomes = await asyncio.gather(*tasks, return_exceptions=True)
+        for outcome in outcomes:
+            if isinstance(outcome, BaseException):
+                raise outcome
+
+        for pending, results_part in sorted(results, key=lambda r: r[0]["loop_index"]):
+            if pending["mode"] == "xml" and app_analysis_mode != "ai":
+                print(f"[Debug] compare_layouts tamamlandı. Sonuç özeti: {results_part.get('summary')}")
+            _add_part_to_report(final_report, pending, results_part)
+    finally:
+        # Hata / iptal (istemci bağlantıyı kapattı): bekleyen parçalar durdurulur
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for dump in part_dumps + [pending_dump]:
+            if dump:
+                dump.cancel()
+        if owns_device and device is not None:
+            await device.close()
+        if compare_executor:
+            compare_executor.shutdown(wait=False, cancel_futures=True)
+        if figma_prefetch:
+            for download in figma_prefetch["downloads"].values():
+                download.cancel()
+            if figma_prefetch["cache"]:
+                await asyncio.to_thread(figma_prefetch["cache"].evict)
+        if figma_client_instance:
+            await figma_client_instance.aclose()
+
+    _finalize_summary(final_report)
     return final_report
 
 
@@ -428,28 +1863,72 @@ def main():
         help="App tarafını XML (uiautomator) veya AI (görüntü analizi) ile çözümle."
     )
 
-    parser.add_argument("--figma-crop-top", type=int, default=0, help="Figma PNG'lerinden üstten kırpılacak piksel.")
-    parser.add_argument("--figma-crop-bottom", type=int, default=0, help="Figma PNG'lerinden alttan kırpılacak piksel.")
+    parser.add_argument("--figma-crop-top", type=int, default=0, help="Figma PNG'lerinden üstten kırpılacak piksel (API modunda 1x tasarım pikseli).")
+    parser.add_argument("--figma-crop-bottom", type=int, default=0, help="Figma PNG'lerinden alttan kırpılacak piksel (API modunda 1x tasarım pikseli).")
     parser.add_argument("--app-crop-top", type=int, default=0,
                         help="TÜM App SS'lerinden üstten kırpılacak piksel (örn: status bar).")
     parser.add_argument("--app-crop-bottom", type=int, default=0,
                         help="TÜM App SS'lerinden alttan kırpılacak piksel (örn: nav bar).")
 
+    parser.add_argument("--app-stitch", action="store_true",
+                        help="(Otomatik + AI modu) Sayfayı sonuna kadar kaydırıp tek uzun ekran görüntüsü olarak denetle.")
+    parser.add_argument("--device-serial", help="Otomatik modda kullanılacak cihazın seri numarası (adb -s).")
+    parser.add_argument("--workspace", choices=["disk", "memory"], default=config.WORKSPACE_BACKEND,
+                        help="Ara dosyaların (kırpılmış görseller, dump'lar, debug) yazılacağı yer. "
+                             "'memory' ise rapor üretildikten sonra silinir.")
+    parser.add_argument("--resume", metavar="RUN_ID",
+                        help="Yarıda kalan çalışmaya devam et: tamamlanmış parçalar checkpoint'ten alınır "
+                             "(aynı argümanlarla çalıştırılmalı).")
+    parser.add_argument("--trace-file", default=config.TRACE_FILE or None,
+                        help="Aşama sürelerini Chrome trace formatında yaz (chrome://tracing, ui.perfetto.dev).")
+
     args = parser.parse_args()
 
-    final_report = run_audit_process(
-        figma_parts=args.figma_parts,
-        app_parts=args.app_parts,
-        app_analysis_mode=args.app_analysis_mode,
-        figma_crop_top=args.figma_crop_top,
-        figma_crop_bottom=args.figma_crop_bottom,
-        app_crop_top=args.app_crop_top,
-        app_crop_bottom=args.app_crop_bottom,
-        figma_file_key=args.figma_file_key,
-        figma_node_ids=args.figma_node_ids
-    )
+    device = None
+    if args.device_serial and not args.app_parts:
+        device = adb_client.DeviceSession(args.device_serial)
+        if not device.open():
+            print(f"HATA: '{args.device_serial}' cihazına bağlanılamadı.")
+            return
 
-    report_generator.create_html_report(final_report)
+    ws = workspace.reopen(args.resume, args.workspace) if args.resume else workspace.create(args.workspace)
+    tracer = tracing.Tracer()
+    try:
+        final_report = run_audit_process(
+            figma_parts=args.figma_parts,
+            app_parts=args.app_parts,
+            app_analysis_mode=args.app_analysis_mode,
+            figma_crop_top=args.figma_crop_top,
+            figma_crop_bottom=args.figma_crop_bottom,
+            app_crop_top=args.app_crop_top,
+            app_crop_bottom=args.app_crop_bottom,
+            figma_file_key=args.figma_file_key,
+            figma_node_ids=args.figma_node_ids,
+            device=device,
+            output_dir=ws.dir,
+            stitch_app_page=args.app_stitch,
+            tracer=tracer,
+            trace_file="",  # Rapor üretimi de dahil olsun diye aşağıda yazılır
+            resume=bool(args.resume)
+        )
+    except Exception:
+        ws.release()
+        if device:
+            device.close()
+        print(f"\nDenetim yarıda kaldı. Tamamlanan parçalar kaydedildi; devam etmek için aynı argümanlarla "
+              f"'--resume {ws.run_id}' ekleyerek çalıştırın.")
+        raise
+    if device:
+        device.close()
+
+    with tracer.activate(), tracing.span("report.html"):
+        report_generator.create_html_report(final_report)
+    if ws.backend == "memory":
+        ws.cleanup()  # HTML rapordaki görseller gömülü (base64), ara dosyalara gerek yok
+    else:
+        ws.release()
+    if args.trace_file:
+        tracer.export(args.trace_file)
 
     print("-----------------------------------------------------")
 
@@ -1,5 +1,7 @@
+import asyncio
 import os
 import shutil
+from contextlib import asynccontextmanager
 from typing import List, Optional
 from fastapi import FastAPI, File, UploadFile, Form, Request
 from fastapi.responses import HTMLResponse, JSONResponse
@@ -9,70 +11,72 @@ import uvicorn
 import run_audit
 import adb_client
 import config
+import figma_client
+import device_pool
+import workspace
 
-app = FastAPI()
 
-def parse_figma_link(link: str):
-    """
-    Extracts file_key and node_id from a Figma URL.
-    Example: https://www.figma.com/design/KEY/Title?node-id=1-2...
-    """
-    try:
-        from urllib.parse import urlparse, parse_qs
-        parsed = urlparse(link)
-        path_parts = parsed.path.split('/')
-        
-        # File Key is usually the 3rd or 4th part depending on URL structure
-        # /file/KEY/Title or /design/KEY/Title
-        file_key = None
-        for part in path_parts:
-            if len(part) > 20: # Heuristic for ID
-                file_key = part
-                break
-        
-        if not file_key:
-            return None, None
-            
-        query_params = parse_qs(parsed.query)
-        node_id = query_params.get('node-id', [None])[0]
-        
-        if node_id:
-            node_id = node_id.replace('-', ':')
-            
-        return file_key, node_id
-    except:
-        return None, None
-
-
-# Create directories for uploads if they don't exist
-UPLOAD_DIR = "web_uploads"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Figma HTTP (aiohttp) session'ı tüm istekler boyunca paylaşılır (keep-alive + connection pool)
+    figma_client.open_async_session()
+    # Bağlı tüm cihazlar havuza alınır; ADB denetimleri cihazlar arasında paralel çalışır
+    app.state.device_pool = device_pool.DevicePool()
+    app.state.device_pool.start()
+    yield
+    app.state.device_pool.shutdown(wait=False)
+    await figma_client.close_async_session()
+
+
+app = FastAPI(lifespan=lifespan)
+
+# Her denetimin yüklemeleri ve ara dosyaları kendi workspace'inde (bkz. workspace.py)
+WORKSPACE_ROOT = workspace.root_dir()
+os.makedirs(WORKSPACE_ROOT, exist_ok=True)
 
 # Mount static files
 app.mount("/static", StaticFiles(directory="static"), name="static")
+# Workspace dosyaları (rapor görselleri) '/files/runs/<run_id>/...' altında; '/files'dan önce eşleşmeli
+app.mount("/files/runs", StaticFiles(directory=WORKSPACE_ROOT), name="runs")
 app.mount("/files", StaticFiles(directory="."), name="files")
 
 templates = Jinja2Templates(directory="templates")
 
+def _discard_workspace(ws, keep=False):
+    """Denetim başlamadan dönülen istekte workspace'i bırakır (keep=False ise siler)."""
+    if keep:
+        ws.release()
+    else:
+        ws.cleanup()
+
+
 @app.get("/", response_class=HTMLResponse)
 async def read_root(request: Request):
     return templates.TemplateResponse("index.html", {"request": request})
 
 @app.get("/adb/check")
-async def check_adb():
+async def check_adb(request: Request):
     """Check if ADB is connected and a device is found."""
     try:
-        # Simple check: list devices
-        import subprocess
-        result = subprocess.run(["adb", "devices"], capture_output=True, text=True)
-        if "device" in result.stdout and len(result.stdout.strip().split('\n')) > 1:
-             return JSONResponse(content={"status": "connected", "details": result.stdout})
-        return JSONResponse(content={"status": "disconnected", "details": result.stdout})
+        # Simple check: list devices (adb ve sağlık kontrolü event loop'u bloklamasın)
+        proc = await asyncio.create_subprocess_exec(
+            *config.ADB_COMMAND, "devices",
+            stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+        )
+        stdout, _ = await proc.communicate()
+        result_stdout = stdout.decode(errors="replace")
+        pool = request.app.state.device_pool
+        await asyncio.to_thread(pool.refresh)  # Sonradan takılan cihazları da havuza al
+        devices = pool.status()
+        if "device" in result_stdout and len(result_stdout.strip().split('\n')) > 1:
+             return JSONResponse(content={"status": "connected", "details": result_stdout, "devices": devices})
+        return JSONResponse(content={"status": "disconnected", "details": result_stdout, "devices": devices})
     except Exception as e:
         return JSONResponse(content={"status": "error", "details": str(e)})
 
 @app.post("/analyze")
 async def analyze(
+    request: Request,
     figma_files: Optional[List[UploadFile]] = File(None),
     app_files: Optional[List[UploadFile]] = File(None),
     figma_link: str = Form(None),
@@ -82,24 +86,31 @@ async def analyze(
     figma_crop_bottom: int = Form(-1),
     app_crop_top: int = Form(-1),
     app_crop_bottom: int = Form(-1),
+    device_serial: str = Form(None),
+    stitch_app_page: bool = Form(False),
+    resume_run_id: str = Form(None),
 ):
     # 1. Save Uploaded Files (if any)
+    # Her istek kendi workspace'ini alır: aynı anda çalışan denetimler aynı isimli dosyaların
+    # (yükleme, kırpılmış görsel, dump) üzerine yazmaz. resume_run_id verilirse yarıda kalan
+    # çalışmanın klasörü açılır ve tamamlanmış parçalar checkpoint'ten alınır.
+    try:
+        ws = workspace.reopen(resume_run_id) if resume_run_id else workspace.create()
+    except (ValueError, FileNotFoundError) as e:
+        return JSONResponse(content={"error": str(e)}, status_code=400)
     saved_figma_paths = []
     saved_app_paths = []
 
-    # Clean upload dir for this run (optional, or use unique subdirs)
-    # For simplicity, we just append timestamp or use unique names
-    
     if figma_files:
         for file in figma_files:
-            file_path = os.path.join(UPLOAD_DIR, file.filename)
+            file_path = ws.path("uploads", "figma", os.path.basename(file.filename))
             with open(file_path, "wb") as buffer:
                 shutil.copyfileobj(file.file, buffer)
             saved_figma_paths.append(file_path)
 
     if app_files:
         for file in app_files:
-            file_path = os.path.join(UPLOAD_DIR, file.filename)
+            file_path = ws.path("uploads", "app", os.path.basename(file.filename))
             with open(file_path, "wb") as buffer:
                 shutil.copyfileobj(file.file, buffer)
             saved_app_paths.append(file_path)
@@ -117,34 +128,54 @@ async def analyze(
     figma_node_ids = None
     
     if figma_link:
-        key, node = parse_figma_link(figma_link)
+        key, node = figma_client.parse_figma_link(figma_link)
         if key and node:
             figma_file_key = key
             figma_node_ids = [node]
             print(f"[Server] Using Figma Link: Key={key}, Node={node}")
         else:
+            _discard_workspace(ws, keep=bool(resume_run_id))
             return JSONResponse(content={"error": "Invalid Figma Link format."}, status_code=400)
     elif not saved_figma_paths:
+         _discard_workspace(ws, keep=bool(resume_run_id))
          return JSONResponse(content={"error": "Please provide either Figma Files or a Figma Link."}, status_code=400)
 
+    audit_kwargs = dict(
+        app_parts=final_app_parts,
+        figma_parts=saved_figma_paths if not figma_file_key else None,
+        app_analysis_mode=app_analysis_mode,
+        figma_crop_top=figma_crop_top,
+        figma_crop_bottom=figma_crop_bottom,
+        app_crop_top=app_crop_top,
+        app_crop_bottom=app_crop_bottom,
+        figma_file_key=figma_file_key,
+        figma_node_ids=figma_node_ids,
+        stitch_app_page=stitch_app_page,
+        output_dir=ws.dir,
+        resume=bool(resume_run_id)
+    )
+
     # 4. Run Audit
     try:
-        report = run_audit.run_audit_process(
-            figma_parts=saved_figma_paths if not figma_file_key else None,
-            app_parts=final_app_parts,
-            app_analysis_mode=app_analysis_mode,
-            figma_crop_top=figma_crop_top,
-            figma_crop_bottom=figma_crop_bottom,
-            app_crop_top=app_crop_top,
-            app_crop_bottom=app_crop_bottom,
-            figma_file_key=figma_file_key,
-            figma_node_ids=figma_node_ids
+        # ADB modunda boştaki bir cihaz kiralanır; denetimin I/O'su event loop'ta await edildiği için
+        # diğer istekler (/adb/check, statik dosyalar, diğer denetimler) bloklanmaz
+        report = await run_audit.run_audit_process_async(
+            device_pool=request.app.state.device_pool, device_serial=device_serial, **audit_kwargs
         )
+        # Rapor görselleri '/files/<yol>' ile yüklenir; workspace dosyaları '/files/runs/...' altında
+        for part in report.get("parts", []):
+            pair = part.get("image_pair", {})
+            for key in ("figma", "app"):
+                pair[key] = ws.relative_url(pair.get(key))
+        report["run_id"] = ws.run_id
         return JSONResponse(content=report)
     except Exception as e:
         import traceback
         traceback.print_exc()
-        return JSONResponse(content={"error": str(e)}, status_code=500)
+        # run_id ile (resume_run_id) tamamlanan parçalar tekrar işlenmeden devam edilebilir
+        return JSONResponse(content={"error": str(e), "run_id": ws.run_id}, status_code=500)
+    finally:
+        ws.release()  # Dosyalar saklama politikasına göre sonraki çalışmalarda silinir
 
 if __name__ == "__main__":
     port = int(os.getenv("PORT", 8000))
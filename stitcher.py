@@ -0,0 +1,184 @@
+# stitcher.py
+"""
+Kaydırılarak alınan ekran görüntülerini tek bir uzun sayfa görüntüsünde birleştirir.
+
+Ardışık iki kare arasındaki dikey kayma satır hash'leri eşleştirilerek bulunur; sabit üst
+(status bar + toolbar) ve alt (nav bar, bottom navigation) bölgeler maskelenir, böylece
+her karenin sadece yeni gelen içeriği eklenir ve örtüşen kısım tekrar edilmez.
+
+Kullanım:
+    stitcher = ScrollStitcher(header=80, footer=140)
+    stitcher.add(first_image)
+    stitcher.add(next_image)   # -> eklenen yeni satır sayısı (0 = sayfa sonu)
+    long_image = stitcher.image()
+"""
+import PIL.Image
+
+import config
+
+# Satır hash'i için küçültülmüş genişlik (eşleştirme maliyeti ekran genişliğinden bağımsız)
+HASH_WIDTH = 128
+
+
+def row_hashes(image):
+    """Her piksel satırı için (küçültülmüş, gri tonlamalı, 64 seviyeye indirgenmiş) bir hash."""
+    gray = image.convert("L").resize((HASH_WIDTH, image.height), PIL.Image.BILINEAR).point(lambda v: v >> 2)
+    data = gray.tobytes()
+    hashes = []
+    uniform = []
+    for y in range(image.height):
+        row = data[y * HASH_WIDTH:(y + 1) * HASH_WIDTH]
+        hashes.append(hash(row))
+        # Düz renk satırlar (boşluklar) her yerle eşleşir, anchor olarak kullanılmaz
+        uniform.append(row.count(row[0]) == HASH_WIDTH)
+    return hashes, uniform
+
+
+def _fixed_prefix(hashes_a, hashes_b, limit, min_ratio=0.9):
+    """
+    Baştan itibaren iki karede aynı kalan bölgenin yüksekliği. Birkaç satırlık farklar
+    (status bar saati, bildirim ikonları) bölgeyi bölmesin diye, eşleşme oranı min_ratio'nun
+    üstünde kaldığı sürece en son eşleşen satıra kadar uzatılır.
+    """
+    fixed = 0
+    matches = 0
+    for y in range(limit):
+        if hashes_a[y] == hashes_b[y]:
+            matches += 1
+            if matches >= min_ratio * (y + 1):
+                fixed = y + 1
+    return fixed
+
+
+def detect_fixed_regions(hashes_a, hashes_b, min_header=0, min_footer=0):
+    """İki karede aynı kalan üst/alt bölgeleri (sabit header/footer) bulur."""
+    height = min(len(hashes_a), len(hashes_b))
+    if hashes_a[:height] == hashes_b[:height]:
+        # Kareler tamamen aynı: sabit bölge tespit edilemez
+        return min_header, min_footer
+    header = _fixed_prefix(hashes_a, hashes_b, height)
+    footer = _fixed_prefix(hashes_a[::-1], hashes_b[::-1], height - header)
+    return max(header, min_header), max(footer, min_footer)
+
+
+def find_scroll_offset(prev, new, header, footer, min_overlap=None, match_ratio=None, max_anchors=8):
+    """
+    İçerik bölgesinde (header/footer hariç) yeni karenin önceki kareye göre kaç satır kaydığını bulur.
+    prev / new: row_hashes() çıktısı.
+    Returns: kayma (satır, 0 = hiç kaymamış) veya örtüşme bulunamazsa None
+    """
+    min_overlap = config.STITCH_MIN_OVERLAP if min_overlap is None else min_overlap
+    match_ratio = config.STITCH_MATCH_RATIO if match_ratio is None else match_ratio
+    prev_hashes, _ = prev
+    new_hashes, new_uniform = new
+    prev_content = prev_hashes[header:len(prev_hashes) - footer]
+    new_content = new_hashes[header:len(new_hashes) - footer]
+    new_uniform = new_uniform[header:len(new_uniform) - footer]
+    content_height = min(len(prev_content), len(new_content))
+    if content_height <= min_overlap:
+        return None
+
+    positions = {}
+    for y, h in enumerate(prev_content):
+        positions.setdefault(h, []).append(y)
+
+    # Yeni karenin üstünden, düz renk olmayan satırları anchor al; her anchor kayma adayları üretir
+    candidates = set()
+    anchors = 0
+    for y, h in enumerate(new_content[:content_height - min_overlap]):
+        if new_uniform[y]:
+            continue
+        for p in positions.get(h, ()):
+            if p >= y:
+                candidates.add(p - y)
+        anchors += 1
+        if anchors >= max_anchors:
+            break
+    if not anchors:
+        # Tamamen düz içerik: aynıysa kaymamış say
+        return 0 if prev_content[:content_height] == new_content[:content_height] else None
+
+    best = None
+    for shift in sorted(candidates):
+        overlap = content_height - shift
+        if overlap < min_overlap:
+            continue
+        matches = sum(1 for a, b in zip(prev_content[shift:shift + overlap], new_content[:overlap]) if a == b)
+        ratio = matches / overlap
+        # En yüksek eşleşme; eşitlikte en küçük kayma (en büyük örtüşme)
+        if ratio >= match_ratio and (best is None or ratio > best[0]):
+            best = (ratio, shift)
+    return best[1] if best else None
+
+
+class ScrollStitcher:
+    """
+    Kareleri sırayla alıp uzun sayfa görüntüsünü oluşturur.
+    header / footer: en az maskelenecek sabit bölge yükseklikleri (örn. app crop değerleri);
+    ilk iki kareden daha büyük sabit bölgeler (sticky toolbar vb.) otomatik tespit edilir.
+    """
+
+    def __init__(self, header=0, footer=0):
+        self.min_header = max(0, header)
+        self.min_footer = max(0, footer)
+        self.header = None
+        self.footer = None
+        self.frames = []  # (image, eklenen içerik satırı başlangıcı)
+        self._first_hashes = None
+        self._last_hashes = None
+        self.offsets = []
+
+    def add(self, image):
+        """
+        Yeni kareyi ekler.
+        Returns: sayfaya eklenen yeni satır sayısı; 0 = kaymamış (sayfa sonu), None = örtüşme bulunamadı
+        """
+        image = image.convert("RGB")
+        hashes = row_hashes(image)
+        if not self.frames:
+            self.frames.append((image, 0))
+            self._first_hashes = self._last_hashes = hashes
+            return image.height
+
+        if image.size != self.frames[0][0].size:
+            print(f"[Stitch] UYARI: Kare boyutu değişti ({image.size}), kare atlanıyor.")
+            return None
+        if self.header is None:
+            self.header, self.footer = detect_fixed_regions(
+                self._first_hashes[0], hashes[0], self.min_header, self.min_footer
+            )
+            print(f"[Stitch] Sabit bölgeler: üst={self.header}px, alt={self.footer}px")
+
+        shift = find_scroll_offset(self._last_hashes, hashes, self.header, self.footer)
+        if shift is None:
+            print("[Stitch] UYARI: Önceki kareyle örtüşme bulunamadı, kare atlanıyor.")
+            return None
+        if shift == 0:
+            return 0
+        content_bottom = image.height - self.footer
+        # Sadece örtüşmeyen (yeni) alt kısım eklenir
+        self.frames.append((image, content_bottom - shift))
+        self.offsets.append(shift)
+        self._last_hashes = hashes
+        return shift
+
+    def image(self):
+        """Birleştirilmiş uzun görüntü: ilk karenin header+içeriği, yeni içerik dilimleri, son karenin footer'ı."""
+        if not self.frames:
+            return None
+        first = self.frames[0][0]
+        if len(self.frames) == 1:
+            return first.copy()
+        width, height = first.size
+        content_bottom = height - self.footer
+        total_height = height + sum(self.offsets)
+        page = PIL.Image.new("RGB", (width, total_height))
+        page.paste(first.crop((0, 0, width, content_bottom)), (0, 0))
+        y = content_bottom
+        for frame, start in self.frames[1:]:
+            piece = frame.crop((0, start, width, content_bottom))
+            page.paste(piece, (0, y))
+            y += piece.height
+        last = self.frames[-1][0]
+        page.paste(last.crop((0, content_bottom, width, height)), (0, y))
+        return page
@@ -0,0 +1,58 @@
+import os
+
+import checkpoint
+
+PARAMS = {"figma_file_key": "KEY", "figma_node_ids": ["1:2", "1:4"], "tolerance": 18}
+
+
+def test_fingerprint_is_order_independent_and_param_sensitive():
+    shuffled = {"tolerance": 18, "figma_node_ids": ["1:2", "1:4"], "figma_file_key": "KEY"}
+    assert checkpoint.fingerprint(PARAMS) == checkpoint.fingerprint(shuffled)
+    assert checkpoint.fingerprint(PARAMS) != checkpoint.fingerprint(dict(PARAMS, tolerance=20))
+
+
+def test_resume_returns_saved_parts(tmp_path):
+    cp = checkpoint.AuditCheckpoint(str(tmp_path), PARAMS)
+    assert cp.start() == {}
+    cp.save({"loop_index": 0, "results": [{"status": "PASS"}]})
+    cp.save({"loop_index": 1, "results": []})
+
+    records = checkpoint.AuditCheckpoint(str(tmp_path), PARAMS).start(resume=True)
+    assert sorted(records) == [0, 1]
+    assert records[0]["results"] == [{"status": "PASS"}]
+
+
+def test_resume_skips_truncated_last_line(tmp_path):
+    cp = checkpoint.AuditCheckpoint(str(tmp_path), PARAMS)
+    cp.start()
+    cp.save({"loop_index": 0})
+    with open(os.path.join(str(tmp_path), checkpoint.FILENAME), "a", encoding="utf-8") as f:
+        f.write('{"loop_index": 1, "resu')  # Process yazarken öldürüldü
+
+    assert list(checkpoint.AuditCheckpoint(str(tmp_path), PARAMS).start(resume=True)) == [0]
+
+
+def test_changed_params_start_fresh(tmp_path):
+    cp = checkpoint.AuditCheckpoint(str(tmp_path), PARAMS)
+    cp.start()
+    cp.save({"loop_index": 0})
+
+    changed = checkpoint.AuditCheckpoint(str(tmp_path), dict(PARAMS, tolerance=20))
+    assert changed.load() is None
+    assert changed.start(resume=True) == {}
+    # Yeni checkpoint eski kayıtların üstüne yazıldı
+    assert checkpoint.AuditCheckpoint(str(tmp_path), PARAMS).load() is None
+
+
+def test_start_without_resume_discards_records(tmp_path):
+    cp = checkpoint.AuditCheckpoint(str(tmp_path), PARAMS)
+    cp.start()
+    cp.save({"loop_index": 0})
+    assert cp.start() == {}
+    assert cp.load() == {}
+
+
+def test_missing_checkpoint(tmp_path):
+    cp = checkpoint.AuditCheckpoint(str(tmp_path), PARAMS)
+    assert cp.load() is None
+    assert cp.start(resume=True) == {}
@@ -0,0 +1,53 @@
+import comparator
+
+
+def _node(text, x, y, w, h):
+    return {"text_content": text, "text": text, "bounds": {"x": x, "y": y, "w": w, "h": h}}
+
+
+def test_robust_fit_ignores_outliers():
+    values = [2.0, 2.01, 1.99, 2.02, 1.98, 2.0, 9.5, -4.0]
+    estimate, inliers = comparator._robust_fit(values, 0.02)
+    assert abs(estimate - 2.0) < 0.01
+    assert inliers == 6
+
+
+def test_robust_fit_min_spread_keeps_identical_values():
+    # MAD = 0 iken min_spread kadar sapan değerler inlier kalmalı
+    estimate, inliers = comparator._robust_fit([10.0, 10.0, 10.0, 13.0, 40.0], 5.0)
+    assert estimate == 10.0
+    assert inliers == 4
+
+
+def test_robust_fit_empty():
+    assert comparator._robust_fit([], 1.0) == (None, 0)
+
+
+def test_estimate_alignment_recovers_scale_and_offset_with_bad_anchor():
+    scale, off_x, off_y = 3.0, 12, 40
+    texts = ["Hesabım", "Siparişlerim", "Favorilerim", "Kampanyalar", "Ayarlar ve gizlilik", "Yardım merkezi"]
+    figma, app = [], []
+    for i, text in enumerate(texts):
+        f = _node(text, 16, 100 + i * 60, 200, 24)
+        figma.append(f)
+        b = f["bounds"]
+        app.append(_node(text, b["x"] * scale + off_x, b["y"] * scale + off_y, b["w"] * scale, b["h"] * scale))
+    # Aynı metnin ekranın başka yerindeki kopyası (hatalı anchor)
+    app.append(_node("Kampanyalar", 700, 2100, 600, 72))
+
+    alignment = comparator._estimate_alignment(figma, app, 2.625)
+
+    assert alignment["scale_detected"]
+    assert abs(alignment["scale_x"] - scale) < 1e-6
+    assert abs(alignment["scale_y"] - scale) < 1e-6
+    assert abs(alignment["offset_x"] - off_x) < 1e-6
+    assert abs(alignment["offset_y"] - off_y) < 1e-6
+    assert alignment["anchor_count"] == len(texts) + 1
+    assert alignment["confidence"]["offset_y"] < 1.0
+
+
+def test_estimate_alignment_without_anchors_keeps_given_scale():
+    alignment = comparator._estimate_alignment([_node("Başlık", 0, 0, 100, 20)], [], 2.5)
+    assert (alignment["scale_x"], alignment["scale_y"]) == (2.5, 2.5)
+    assert (alignment["offset_x"], alignment["offset_y"]) == (0, 0)
+    assert not alignment["scale_detected"]
@@ -0,0 +1,114 @@
+import asyncio
+import threading
+import time
+from email.utils import formatdate
+
+import figma_client
+
+
+class _Response:
+    def __init__(self, headers):
+        self.headers = headers
+
+
+def test_rate_limiter_burst_then_rate():
+    limiter = figma_client.RateLimiter(600, 3)  # 10 istek/sn
+    start = time.monotonic()
+    for _ in range(3):
+        limiter.acquire()
+    assert time.monotonic() - start < 0.05
+    limiter.acquire()
+    assert time.monotonic() - start >= 0.08
+
+
+def test_rate_limiter_pause_blocks_all_requests():
+    limiter = figma_client.RateLimiter(0, 1)  # Bütçe yok, sadece Retry-After
+    limiter.pause(0.2)
+    start = time.monotonic()
+    limiter.acquire()
+    assert time.monotonic() - start >= 0.18
+    start = time.monotonic()
+    for _ in range(50):
+        limiter.acquire()
+    assert time.monotonic() - start < 0.05
+
+
+def test_rate_limiter_serves_waiters_in_order():
+    limiter = figma_client.RateLimiter(1200, 1)  # 20 istek/sn
+    limiter.acquire()
+    served = []
+    threads = []
+    for i in range(5):
+        t = threading.Thread(target=lambda i=i: (limiter.acquire(), served.append(i)))
+        t.start()
+        threads.append(t)
+        time.sleep(0.005)  # Bilet sırası = başlatma sırası
+    for t in threads:
+        t.join(timeout=5)
+    assert served == [0, 1, 2, 3, 4]
+
+
+def test_rate_limiter_async_shares_budget_and_survives_cancel():
+    limiter = figma_client.RateLimiter(1200, 1)  # 20 istek/sn
+
+    async def run():
+        await limiter.acquire_async()
+        waiter = asyncio.create_task(limiter.acquire_async())
+        await asyncio.sleep(0.01)
+        waiter.cancel()  # Sıradaki bilet iptal edildi; sonraki istekler takılmamalı
+        start = time.monotonic()
+        await asyncio.wait_for(limiter.acquire_async(), 1)
+        return time.monotonic() - start
+
+    assert 0.02 <= asyncio.run(run()) < 0.2
+    start = time.monotonic()
+    limiter.acquire()  # Sync istekler aynı bütçeden
+    assert time.monotonic() - start >= 0.03
+
+
+def test_retry_after_seconds_header():
+    wait = figma_client._retry_after_seconds(_Response({"Retry-After": "3"}), 0)
+    assert 3.0 <= wait <= 3.3
+
+
+def test_retry_after_seconds_http_date():
+    header = formatdate(time.time() + 10, usegmt=True)
+    wait = figma_client._retry_after_seconds(_Response({"Retry-After": header}), 0)
+    assert 8.0 <= wait <= 12.0
+
+
+def test_retry_after_seconds_backoff():
+    assert 4.0 <= figma_client._retry_after_seconds(_Response({}), 2) <= 4.4
+    assert 1.0 <= figma_client._retry_after_seconds(None, 0) <= 1.1
+    past = formatdate(time.time() - 60, usegmt=True)
+    assert 2.0 <= figma_client._retry_after_seconds(_Response({"Retry-After": past}), 1) <= 2.2
+
+
+def _chunk_url_length(prefix, ids, suffix):
+    return len(prefix) + len("%2C".join(i.replace(":", "%3A") for i in ids)) + len(suffix)
+
+
+def test_chunk_ids_respects_url_limit(monkeypatch):
+    monkeypatch.setattr(figma_client.config, "FIGMA_MAX_URL_LENGTH", 120)
+    client = figma_client.FigmaClient()
+    prefix, suffix = "https://api.figma.com/v1/images/KEY?ids=", "&format=png&scale=3"
+    node_ids = [f"{i}:{i * 7}" for i in range(1, 40)]
+
+    chunks = client._chunk_ids(prefix, node_ids, suffix)
+
+    assert len(chunks) > 1
+    assert [i for chunk in chunks for i in chunk] == node_ids
+    for chunk in chunks:
+        assert _chunk_url_length(prefix, chunk, suffix) <= 120
+    # Gruplar gereksiz yere küçük değil: sonraki ID'yi eklemek sınırı aşardı
+    for chunk, following in zip(chunks, chunks[1:]):
+        assert _chunk_url_length(prefix, chunk + following[:1], suffix) > 120
+
+
+def test_chunk_ids_single_chunk_and_oversized_id(monkeypatch):
+    monkeypatch.setattr(figma_client.config, "FIGMA_MAX_URL_LENGTH", 60)
+    client = figma_client.FigmaClient()
+    assert client._chunk_ids("p?ids=", ["1:2", "1:3"]) == [["1:2", "1:3"]]
+    long_id = "9" * 80 + ":1"
+    assert client._chunk_ids("p?ids=", ["1:2", long_id, "1:3"]) == [["1:2"], [long_id], ["1:3"]]
+    assert client._chunk_ids("p?ids=", []) == []
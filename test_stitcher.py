@@ -0,0 +1,56 @@
+import random
+
+import PIL.Image
+
+import stitcher
+
+WIDTH, HEIGHT, HEADER, FOOTER = 200, 400, 50, 40
+
+
+def _page(height, seed=1):
+    rng = random.Random(seed)
+    return PIL.Image.frombytes("L", (WIDTH, height), rng.randbytes(WIDTH * height)).convert("RGB")
+
+
+def _frame(page, top):
+    """Sabit header/footer arasında sayfanın 'top' satırından başlayan görünümü."""
+    frame = PIL.Image.new("RGB", (WIDTH, HEIGHT), "#1a237e")
+    frame.paste(page.crop((0, top, WIDTH, top + HEIGHT - HEADER - FOOTER)), (0, HEADER))
+    frame.paste(PIL.Image.new("RGB", (WIDTH, FOOTER), "#eeeeee"), (0, HEIGHT - FOOTER))
+    return frame
+
+
+def test_detect_fixed_regions():
+    page = _page(1000)
+    first, second = stitcher.row_hashes(_frame(page, 0)), stitcher.row_hashes(_frame(page, 90))
+    assert stitcher.detect_fixed_regions(first[0], second[0]) == (HEADER, FOOTER)
+    assert stitcher.detect_fixed_regions(first[0], second[0], min_header=60) == (60, FOOTER)
+
+
+def test_find_scroll_offset_known_shifts():
+    page = _page(1000)
+    first = stitcher.row_hashes(_frame(page, 0))
+    for shift in (1, 37, 120, 250):
+        new = stitcher.row_hashes(_frame(page, shift))
+        assert stitcher.find_scroll_offset(first, new, HEADER, FOOTER, min_overlap=40, match_ratio=0.9) == shift
+    assert stitcher.find_scroll_offset(first, first, HEADER, FOOTER, min_overlap=40, match_ratio=0.9) == 0
+
+
+def test_find_scroll_offset_without_overlap():
+    page = _page(1000)
+    first = stitcher.row_hashes(_frame(page, 0))
+    unrelated = stitcher.row_hashes(_frame(_page(1000, seed=2), 0))
+    assert stitcher.find_scroll_offset(first, unrelated, HEADER, FOOTER, min_overlap=40, match_ratio=0.9) is None
+
+
+def test_scroll_stitcher_rebuilds_page():
+    content = HEIGHT - HEADER - FOOTER
+    page = _page(content + 300)
+    tops = [0, 120, 240, 300, 300]  # son kare tekrar: sayfa sonu
+    s = stitcher.ScrollStitcher()
+    added = [s.add(_frame(page, top)) for top in tops]
+    assert added == [HEIGHT, 120, 120, 60, 0]
+
+    long_image = s.image()
+    assert long_image.size == (WIDTH, HEIGHT + 300)
+    assert long_image.crop((0, HEADER, WIDTH, HEADER + page.height)).tobytes() == page.tobytes()
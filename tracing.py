@@ -0,0 +1,199 @@
+# tracing.py
+"""
+Denetim aşamaları için hafif süre / kaynak ölçümü (tracing span'leri).
+
+Her span; süreyi, çalıştığı thread'i, isteğe bağlı sayaçları (bytes, tokens...) ve span
+sonundaki process tepe belleğini (peak RSS) kaydeder. Aktif tracer bir ContextVar'da tutulur:
+server'da aynı anda çalışan denetimlerin span'leri birbirine karışmaz, tracer yoksa span()
+hiçbir şey kaydetmez.
+
+Kullanım:
+    tracer = Tracer()
+    with tracer.activate():
+        with span("figma.download", node="1:2") as s:
+            ...
+            s.add(bytes=len(data))
+    report["trace"] = tracer.to_dict()
+    tracer.export("trace.json")  # chrome://tracing, ui.perfetto.dev veya speedscope ile açılır
+
+Thread / executor'a verilen işler bind(fn) ile sarılmalıdır (context thread'lere kendiliğinden
+geçmez). Başka process'te toplanan span'ler (Tracer.spans) merge() ile aktif tracer'a eklenir.
+"""
+import contextlib
+import contextvars
+import json
+import os
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # Windows: tepe bellek ölçülmez
+    resource = None
+
+_CURRENT = contextvars.ContextVar("audit_tracer", default=None)
+
+
+def peak_rss_mb():
+    """Process'in şimdiye kadarki tepe bellek kullanımı (MB) veya ölçülemiyorsa None."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux KB, macOS byte döndürür
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+class Span:
+    """Süren bir ölçüm; set() ile etiket, add() ile sayaç eklenir."""
+
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = attrs
+        self.start = time.time()
+        self._t0 = time.perf_counter()
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def add(self, **counters):
+        """Sayaçları artırır (örn. s.add(bytes=..., tokens=...))."""
+        for key, value in counters.items():
+            if value:
+                self.attrs[key] = self.attrs.get(key, 0) + value
+
+    def finish(self):
+        return {
+            "name": self.name,
+            "start": self.start,
+            "duration_ms": round((time.perf_counter() - self._t0) * 1000.0, 2),
+            "thread": threading.current_thread().name,
+            "pid": os.getpid(),
+            "peak_rss_mb": peak_rss_mb(),
+            "attrs": self.attrs,
+        }
+
+
+class _NullSpan:
+    def set(self, **attrs):
+        pass
+
+    def add(self, **counters):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Tracer:
+    """Bir denetimin span'lerini toplar (thread-safe)."""
+
+    def __init__(self):
+        self.start = time.time()
+        self.spans = []
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def activate(self):
+        """Bu blok (ve bind() ile sarılan işler) içindeki span'ler bu tracer'a yazılır."""
+        token = _CURRENT.set(self)
+        try:
+            yield self
+        finally:
+            _CURRENT.reset(token)
+
+    def record(self, span_dict):
+        with self._lock:
+            self.spans.append(span_dict)
+
+    def extend(self, span_dicts):
+        with self._lock:
+            self.spans.extend(span_dicts)
+
+    def to_dict(self):
+        """Rapora eklenecek özet: aşama bazında toplamlar + tüm span'ler (başlangıç, tracer'a göre ms)."""
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s["start"])
+        stages = {}
+        for s in spans:
+            stage = stages.setdefault(s["name"], {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+            stage["count"] += 1
+            stage["total_ms"] = round(stage["total_ms"] + s["duration_ms"], 2)
+            stage["max_ms"] = max(stage["max_ms"], s["duration_ms"])
+            for key, value in s["attrs"].items():
+                if key in ("bytes", "tokens", "prompt_tokens", "output_tokens"):
+                    stage[key] = stage.get(key, 0) + value
+        end = max((s["start"] + s["duration_ms"] / 1000.0 for s in spans), default=self.start)
+        return {
+            "total_ms": round((end - self.start) * 1000.0, 1),
+            "peak_rss_mb": peak_rss_mb(),
+            "stages": stages,
+            "spans": [
+                dict(s, start_ms=round((s["start"] - self.start) * 1000.0, 2))
+                for s in spans
+            ],
+        }
+
+    def export(self, path):
+        """Span'leri Chrome trace-event formatında (flame chart) yazar."""
+        with self._lock:
+            spans = list(self.spans)
+        thread_ids = {}
+        events = []
+        for s in spans:
+            tid = thread_ids.setdefault((s["pid"], s["thread"]), len(thread_ids) + 1)
+            events.append({
+                "name": s["name"], "ph": "X", "pid": s["pid"], "tid": tid,
+                "ts": round((s["start"] - self.start) * 1e6),
+                "dur": round(s["duration_ms"] * 1000),
+                "args": dict(s["attrs"], peak_rss_mb=s["peak_rss_mb"]),
+            })
+        for (pid, thread), tid in thread_ids.items():
+            events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": thread}})
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        print(f"[Trace] {len(spans)} span '{path}' dosyasına yazıldı.")
+        return path
+
+
+def current():
+    """Aktif tracer veya None."""
+    return _CURRENT.get()
+
+
+@contextlib.contextmanager
+def span(name, **attrs):
+    """Aktif tracer varsa bloğun süresini kaydeder; hata olursa span'e 'error' eklenir."""
+    tracer = _CURRENT.get()
+    if tracer is None:
+        yield _NULL_SPAN
+        return
+    s = Span(name, attrs)
+    try:
+        yield s
+    except BaseException as e:
+        s.attrs["error"] = type(e).__name__
+        raise
+    finally:
+        tracer.record(s.finish())
+
+
+def bind(fn):
+    """fn'i çağıranın context'inde (aktif tracer ile) çalışacak şekilde sarar; thread hedefleri için."""
+    ctx = contextvars.copy_context()
+
+    def run(*args, **kwargs):
+        # Aynı Context aynı anda iki thread'de çalışamaz, her çağrı kendi kopyasını alır
+        return ctx.copy().run(fn, *args, **kwargs)
+
+    return run
+
+
+def merge(span_dicts):
+    """Başka bir process'te toplanan span'leri aktif tracer'a ekler."""
+    tracer = _CURRENT.get()
+    if tracer is not None and span_dicts:
+        tracer.extend(span_dicts)
@@ -0,0 +1,149 @@
+# workspace.py
+"""
+Her denetim çalışması için ayrı çıktı klasörü (workspace).
+
+Kırpılmış görseller, ADB ekran görüntüleri / XML dump'ları, debug JSON'ları ve AI debug
+görselleri çalışmaya özel bir klasöre yazılır; aynı anda çalışan (server) denetimler birbirinin
+dosyalarının üzerine yazmaz. Eski çalışmalar saklama politikasına göre (son N çalışma ve/veya
+en fazla X saat) yeni bir workspace açılırken silinir.
+
+Backend'ler:
+  - disk:   config.WORKSPACE_ROOT altında (varsayılan ./audit_runs/<run_id>/)
+  - memory: RAM'de (Linux'ta /dev/shm tmpfs) tutulan klasör; diske I/O yapılmaz. Görseller PIL,
+            comparator ve rapor tarafından dosya yolu ile okunduğu için bellek içi backend de
+            bir dosya sistemi klasörüdür. /dev/shm yoksa sistemin temp klasörü kullanılır.
+
+Kullanım:
+    with workspace.create() as ws:
+        report = run_audit.run_audit_process(..., output_dir=ws.dir)
+    ws.cleanup()  # Sonuç dosyaları artık gerekmiyorsa (örn. HTML rapor görselleri gömülü)
+"""
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+
+import config
+
+# Çalışması süren workspace'ler saklama politikası ile silinmez
+_ACTIVE = set()
+_ACTIVE_LOCK = threading.Lock()
+
+_MEMORY_DIR_NAME = "ai-design-auditor-runs"
+
+
+def root_dir(backend=None):
+    """Backend'e göre çalışma klasörlerinin kökü."""
+    backend = backend or config.WORKSPACE_BACKEND
+    if backend == "memory":
+        base = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+        return os.path.join(base, _MEMORY_DIR_NAME)
+    if backend != "disk":
+        raise ValueError(f"Bilinmeyen workspace backend: {backend}")
+    return config.WORKSPACE_ROOT
+
+
+class Workspace:
+    """Tek bir denetim çalışmasının klasörü."""
+
+    def __init__(self, run_id, root, backend):
+        self.run_id = run_id
+        self.root = root
+        self.backend = backend
+        self.dir = os.path.join(root, run_id)
+
+    def path(self, *names):
+        """Workspace içindeki bir dosyanın yolu (ara klasörler oluşturulur)."""
+        path = os.path.join(self.dir, *names)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return path
+
+    def relative_url(self, path):
+        """Workspace içindeki dosyanın 'runs/<run_id>/...' biçiminde yolu; dışındaysa path aynen döner."""
+        if not path:
+            return path
+        rel = os.path.relpath(os.path.abspath(path), os.path.abspath(self.dir))
+        if rel.startswith(os.pardir):
+            return path
+        return "/".join(["runs", self.run_id] + rel.split(os.sep))
+
+    def release(self):
+        """Çalışma bitti: dosyalar kalır, fakat artık saklama politikasıyla silinebilir."""
+        with _ACTIVE_LOCK:
+            _ACTIVE.discard(os.path.abspath(self.dir))
+
+    def cleanup(self):
+        """Workspace'i tüm dosyalarıyla siler."""
+        self.release()
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+
+
+def create(backend=None, run_id=None):
+    """
+    Yeni, benzersiz bir workspace açar ve eski çalışmalara saklama politikasını uygular.
+    run_id verilmezse zaman damgası + rastgele ek ile üretilir (sıralanabilir).
+    """
+    backend = backend or config.WORKSPACE_BACKEND
+    root = root_dir(backend)
+    run_id = run_id or f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    ws = Workspace(run_id, root, backend)
+    os.makedirs(ws.dir)
+    with _ACTIVE_LOCK:
+        _ACTIVE.add(os.path.abspath(ws.dir))
+    removed = prune(root)
+    print(f"[Workspace] Çalışma klasörü: {ws.dir} ({backend})"
+          + (f", {removed} eski çalışma silindi" if removed else ""))
+    return ws
+
+
+def reopen(run_id, backend=None):
+    """
+    Var olan bir çalışmanın workspace'ini tekrar açar (örn. yarıda kalan denetime devam etmek için).
+    Geçersiz run_id ValueError, bulunamayan çalışma FileNotFoundError fırlatır.
+    """
+    backend = backend or config.WORKSPACE_BACKEND
+    if not run_id or os.path.basename(run_id) != run_id or run_id.startswith("."):
+        raise ValueError(f"Geçersiz çalışma kimliği: {run_id!r}")
+    ws = Workspace(run_id, root_dir(backend), backend)
+    if not os.path.isdir(ws.dir):
+        raise FileNotFoundError(f"Çalışma bulunamadı: {ws.dir}")
+    os.utime(ws.dir)  # Saklama politikası açısından en yeni çalışma sayılsın
+    with _ACTIVE_LOCK:
+        _ACTIVE.add(os.path.abspath(ws.dir))
+    print(f"[Workspace] Mevcut çalışma klasörü açıldı: {ws.dir} ({backend})")
+    return ws
+
+
+def prune(root, keep_runs=None, max_age_hours=None):
+    """
+    Saklama politikası: en yeni keep_runs çalışmadan fazlasını ve max_age_hours'tan eskileri siler
+    (0 = sınır yok). Devam eden çalışmalara dokunulmaz. Returns: silinen klasör sayısı
+    """
+    keep_runs = config.WORKSPACE_KEEP_RUNS if keep_runs is None else keep_runs
+    max_age_hours = config.WORKSPACE_MAX_AGE_HOURS if max_age_hours is None else max_age_hours
+    try:
+        entries = [e for e in os.scandir(root) if e.is_dir(follow_symlinks=False)]
+    except FileNotFoundError:
+        return 0
+    entries.sort(key=lambda e: e.stat().st_mtime, reverse=True)
+    now = time.time()
+    with _ACTIVE_LOCK:
+        active = set(_ACTIVE)
+    removed = 0
+    for index, entry in enumerate(entries):
+        if os.path.abspath(entry.path) in active:
+            continue
+        too_many = keep_runs and index >= keep_runs
+        too_old = max_age_hours and now - entry.stat().st_mtime > max_age_hours * 3600
+        if too_many or too_old:
+            shutil.rmtree(entry.path, ignore_errors=True)
+            removed += 1
+    return removed